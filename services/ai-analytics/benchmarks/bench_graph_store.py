@@ -0,0 +1,93 @@
+"""
+Graph Store Benchmark
+Stateless /scm/pagerank + /scm/toxic-nodes (parse and rank the whole
+payload per call) vs the graph store after a small edge delta (apply the
+delta, warm-started PageRank, incremental degrees) and on a repeat read
+(cached result). Payload transfer is not included, so the stateless
+numbers are a lower bound.
+
+The edge list has parallel edges of differing cost; after every delta the
+store's PageRank, degrees and route costs are checked against the
+stateless endpoints on the same list.
+
+Usage (from services/ai-analytics):
+    python benchmarks/bench_graph_store.py [edges] [delta_edges]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines import scm_ai  # noqa: E402
+from engines.graph_store import GraphStore  # noqa: E402
+
+
+def _edges(rng, n: int, m: int) -> list[dict]:
+    edges = [{"from_node_id": f"N{a}", "to_node_id": f"N{b}", "weight": float(w)}
+             for a, b, w in zip(rng.integers(n, size=m).tolist(), rng.integers(n, size=m).tolist(),
+                                rng.integers(1, 4, size=m).tolist())]
+    # Parallel copies at another cost
+    return edges + [{**e, "weight": e["weight"] + 1} for e in edges[:m // 20]]
+
+
+def _check_parity(store: GraphStore, nodes: list[dict], edges: list[dict], rng) -> None:
+    ranks = store.page_rank("bench", "g")["ranks"]
+    expected = scm_ai.page_rank(nodes, edges)
+    assert max(abs(ranks[k] - v) for k, v in expected.items()) < 1e-5, "pagerank"
+    toxic = {t["id"]: t for t in store.toxic_nodes("bench", "g")["nodes"]}
+    for t in scm_ai.detect_toxic_nodes(nodes, edges, []):
+        got = toxic[t["id"]]
+        assert (got["in_degree"], got["out_degree"], got["centrality"]) == \
+               (t["in_degree"], t["out_degree"], t["centrality"]), t["id"]
+    for e in rng.choice(edges, size=5).tolist():
+        a, b = e["from_node_id"], f"N{int(rng.integers(len(nodes)))}"
+        assert store.optimize_route("bench", "g", a, b)["cost"] == scm_ai.optimize_route(edges, a, b)["cost"], (a, b)
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main(m: int = 200_000, delta: int = 20) -> None:
+    rng = np.random.default_rng(42)
+    n = m // 4
+    nodes = [{"id": f"N{i}", "trust_score": int(rng.integers(20, 100))} for i in range(n)]
+    edges = _edges(rng, n, m)
+    store = GraphStore()
+    _, t_put = _timed(lambda: store.put("bench", "g", nodes, edges, []))
+    store.page_rank("bench", "g")
+    _check_parity(store, nodes, edges, rng)
+
+    print(f"{n} nodes, {m} edges, {delta}-edge deltas (put took {t_put * 1000:.0f}ms)")
+    print(f"{'call':<14} {'stateless':>10} {'delta':>9} {'warm':>9} {'iters':>6} {'cold_iters':>10} {'cached':>9}")
+    for call in ("pagerank", "toxic-nodes"):
+        stateless = (lambda: scm_ai.page_rank(nodes, edges)) if call == "pagerank" else \
+                    (lambda: scm_ai.detect_toxic_nodes(nodes, edges, []))
+        _, t_stateless = _timed(stateless)
+        read = (lambda: store.page_rank("bench", "g")) if call == "pagerank" else \
+               (lambda: store.toxic_nodes("bench", "g"))
+
+        removed = edges[:delta]
+        added = _edges(rng, n, delta)
+        _, t_delta = _timed(lambda: store.update("bench", "g", {"remove_edges": removed, "add_edges": added}))
+        edges[:delta] = added
+        _, t_warm = _timed(read)
+        _, t_cached = _timed(read)
+        iters = store.page_rank("bench", "g")["iterations"]
+
+        ids = [nd["id"] for nd in nodes]
+        src, dst = scm_ai.edge_index(ids, edges)
+        _, cold_iters = scm_ai.pagerank_vector(src, dst, n)
+        print(f"{call:<14} {t_stateless * 1000:>8.1f}ms {t_delta * 1000:>7.2f}ms {t_warm * 1000:>7.1f}ms "
+              f"{iters:>6} {cold_iters:>10} {t_cached * 1000:>7.1f}ms")
+        _check_parity(store, nodes, edges, rng)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
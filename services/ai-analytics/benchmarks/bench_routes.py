@@ -0,0 +1,50 @@
+"""
+Batch Routing Benchmark
+One /scm/optimize-route call per (from, to) pair (rebuild the adjacency and
+run a fresh Dijkstra each time) vs routing.optimize_routes (one CSR index,
+one Dijkstra tree per distinct origin) on a random supply graph.
+
+Usage (from services/ai-analytics):
+    python benchmarks/bench_routes.py [edges] [pairs] [origins]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines import routing, scm_ai  # noqa: E402
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main(m: int = 50_000, n_pairs: int = 200, n_origins: int = 10) -> None:
+    rng = np.random.default_rng(42)
+    n = m // 4
+    graph = [{"from_node_id": f"N{a}", "to_node_id": f"N{b}", "weight": float(w), "risk_score": float(r)}
+             for a, b, w, r in zip(rng.integers(n, size=m).tolist(), rng.integers(n, size=m).tolist(),
+                                   rng.integers(1, 20, size=m).tolist(), rng.random(m).round(2).tolist())]
+    origins = rng.integers(n, size=n_origins).tolist()
+    pairs = [(f"N{origins[i % n_origins]}", f"N{t}") for i, t in enumerate(rng.integers(n, size=n_pairs).tolist())]
+
+    per_pair, t_single = _timed(lambda: [scm_ai.optimize_route(graph, f, t) for f, t in pairs])
+    batch, t_batch = _timed(lambda: routing.optimize_routes(graph, pairs))
+    _, t_k3 = _timed(lambda: routing.optimize_routes(graph, pairs[:20], k=3))
+    assert [r["cost"] for r in per_pair] == [r["cost"] for r in batch["routes"]]
+
+    print(f"{n} nodes, {m} edges, {n_pairs} pairs from {n_origins} origins")
+    print(f"per-pair optimize_route  {t_single * 1000:>9.1f}ms")
+    print(f"optimize_routes          {t_batch * 1000:>9.1f}ms  ({t_single / t_batch:.1f}x)")
+    print(f"optimize_routes k=3 (20) {t_k3 * 1000:>9.1f}ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    main(*args)
@@ -0,0 +1,87 @@
+"""
+Response Serialization Benchmark
+FastAPI's default rendering (jsonable_encoder walk + json.dumps) vs
+responses.render (orjson, NumPy-aware) on representative engine output
+for each endpoint. Engine time is excluded: each result is computed
+once, then only its serialization is timed.
+
+Usage (from services/ai-analytics):
+    python benchmarks/bench_serialization.py [scale]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines import carbon, demand_sensing, scm_ai  # noqa: E402
+from responses import NumpyJSONResponse  # noqa: E402
+from schemas import Event, InventoryItem, Partner, Product, Shipment, records  # noqa: E402
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _graph(rng, n: int, degree: int = 4) -> tuple[list[dict], list[dict]]:
+    nodes = [{"id": f"N{i}", "name": f"Node {i}", "type": "partner", "trust_score": int(rng.integers(20, 100))}
+             for i in range(n)]
+    src = rng.integers(n, size=n * degree)
+    dst = rng.integers(n, size=n * degree)
+    edges = [{"from_node_id": f"N{a}", "to_node_id": f"N{b}", "weight": float(rng.uniform(1, 10)),
+              "risk_score": float(rng.uniform(0, 0.5))} for a, b in zip(src.tolist(), dst.tolist())]
+    return nodes, edges
+
+
+def _shipments(rng, n: int, partners: int) -> list[Shipment]:
+    return records(Shipment, [{"id": f"S{i}", "product_id": f"P{rng.integers(partners * 4)}", "partner_id": f"PT{rng.integers(partners)}",
+             "status": "delivered", "transport_mode": ["road", "sea", "air", "rail"][i % 4],
+             "distance_km": float(rng.uniform(50, 5000)), "weight_kg": float(rng.uniform(1, 500)),
+             "estimated_delivery": f"2026-01-{1 + i % 28:02d}", "actual_delivery": f"2026-01-{1 + (i + 1) % 28:02d}"}
+            for i in range(n)])
+
+
+def cases(scale: float):
+    rng = np.random.default_rng(42)
+    n = lambda k: max(1, int(k * scale))  # noqa: E731
+    nodes, edges = _graph(rng, n(5000))
+    shipments = _shipments(rng, n(10000), n(200))
+    products = records(Product, [{"id": f"P{i}", "name": f"Product {i}", "category": "tea", "weight_kg": 1.0} for i in range(n(800))])
+    partners = records(Partner, [{"id": f"PT{i}", "name": f"Partner {i}", "country": "VN", "kyc_status": "verified"} for i in range(n(200))])
+    events = records(Event, [{"partner_id": f"PT{rng.integers(n(200))}", "event_type": ["scan", "delay", "hold"][i % 3]}
+                             for i in range(n(20000))])
+    history = records(InventoryItem, [{"date": f"2025-{1 + i // 28 % 12:02d}-{1 + i % 28:02d}", "quantity": int(rng.integers(50, 150))}
+                                      for i in range(n(365))])
+    sales = [float(x) for x in rng.poisson(100, n(2000))]
+    yield "/scm/pagerank", lambda: scm_ai.page_rank(nodes, edges, 20, 0.85)
+    yield "/scm/toxic-nodes", lambda: scm_ai.detect_toxic_nodes(nodes, edges, [])
+    yield "/scm/predict-delay", lambda: scm_ai.predict_delay(shipments)
+    yield "/scm/bottlenecks", lambda: scm_ai.detect_bottlenecks(events, partners)
+    yield "/scm/forecast-inventory", lambda: scm_ai.forecast_inventory(history, 30)
+    yield "/carbon/aggregate", lambda: carbon.aggregate_by_scope(products, shipments, [])
+    yield "/carbon/leaderboard", lambda: carbon.partner_leaderboard(partners, shipments, [])
+    yield "/demand/detect", lambda: demand_sensing.detect(sales, 2.0)
+
+
+def main(scale: float = 1.0) -> None:
+    print(f"{'endpoint':<26} {'bytes':>10} {'default':>10} {'orjson':>10} {'speedup':>8}")
+    for endpoint, compute in cases(scale):
+        result = compute()
+        size = len(NumpyJSONResponse(result).body)
+        t_default = _best_of(lambda: JSONResponse(jsonable_encoder(result)).body)
+        t_orjson = _best_of(lambda: NumpyJSONResponse(result).body)
+        print(f"{endpoint:<26} {size:>10} {t_default * 1000:>8.2f}ms {t_orjson * 1000:>8.2f}ms {t_default / t_orjson:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
@@ -6,10 +6,14 @@ Ported from server/engines/carbon-engine.js
 
 from __future__ import annotations
 
-import math
 from collections import defaultdict
 from datetime import datetime, timezone, timedelta
-from typing import Any
+
+from engines.geo import haversine_km
+from schemas import Event, Partner, Product, Shipment, Violation
+
+# Bump when results change for the same input (invalidates cached responses)
+ENGINE_VERSION = "1"
 
 # ─── Emission factors ─────────────────────────────────────────
 TRANSPORT_EMISSION_FACTORS = {
@@ -28,18 +32,23 @@ MANUFACTURING_FACTORS = {
 }
 
 
-def _estimate_distance(shipment: dict) -> int:
-    lat = shipment.get("current_lat")
-    lng = shipment.get("current_lng")
-    if lat and lng:
-        R = 6371
-        lat1 = math.radians(10.8)
-        lat2 = math.radians(lat)
-        d_lat = lat2 - lat1
-        d_lon = math.radians(lng - 106.6)
-        a = math.sin(d_lat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(d_lon / 2) ** 2
-        return round(R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)))
-    return 500
+ORIGIN_LAT, ORIGIN_LNG = 10.8, 106.6  # Default origin hub (Ho Chi Minh City)
+
+
+def _estimate_distances(shipments: list[Shipment]) -> list[int]:
+    """Great-circle km from the origin hub for each shipment, in one
+    vectorized haversine call; 500 km when a shipment has no position."""
+    dists = [500] * len(shipments)
+    idx = [i for i, s in enumerate(shipments) if s.current_lat and s.current_lng]
+    if idx:
+        km = haversine_km(
+            ORIGIN_LAT, ORIGIN_LNG,
+            [shipments[i].current_lat for i in idx],
+            [shipments[i].current_lng for i in idx],
+        )
+        for i, d in zip(idx, km.tolist()):
+            dists[i] = round(d)
+    return dists
 
 
 def _carbon_grade(kg: float) -> str:
@@ -60,11 +69,15 @@ def _overall_esg_grade(scope_data: dict | None, leaderboard: list | None) -> str
     return "A" if combined >= 80 else ("B" if combined >= 60 else ("C" if combined >= 40 else "D"))
 
 
-def calculate_footprint(product: dict, shipments: list | None = None, events: list | None = None, partner: dict | None = None) -> dict:
-    """Calculate product carbon footprint (cradle-to-gate)."""
+def calculate_footprint(product: Product, shipments: list[Shipment] | None = None, events: list[Event] | None = None, partner: Partner | None = None,
+                        distances: list[int] | None = None) -> dict:
+    """Calculate product carbon footprint (cradle-to-gate).
+    ``distances`` may carry precomputed per-shipment km (see aggregate_by_scope)."""
     shipments = shipments or []
     events = events or []
-    category = product.get("category", "General")
+    if distances is None:
+        distances = _estimate_distances(shipments)
+    category = product.category if product.category is not None else "General"
 
     scope1 = {
         "type": "scope_1", "label": "Direct Emissions (Manufacturing)",
@@ -73,7 +86,7 @@ def calculate_footprint(product: dict, shipments: list | None = None, events: li
     }
 
     wh_type = "cold_storage" if category in ("Healthcare", "F&B") else "ambient"
-    storage_days = sum(1 for e in events if e.get("event_type") in ("store", "receive")) * 3
+    storage_days = sum(1 for e in events if e.event_type in ("store", "receive")) * 3
     wh_emissions = WAREHOUSE_FACTORS[wh_type] * storage_days * 0.5
     scope2 = {
         "type": "scope_2", "label": "Indirect Emissions (Energy/Warehousing)",
@@ -83,8 +96,8 @@ def calculate_footprint(product: dict, shipments: list | None = None, events: li
 
     transport_total = 0.0
     breakdown = []
-    for s in shipments:
-        carrier = (s.get("carrier") or "").lower()
+    for s, dist in zip(shipments, distances):
+        carrier = (s.carrier or "").lower()
         mode = "road"
         if "fedex" in carrier or "dhl" in carrier:
             mode = "air"
@@ -92,17 +105,16 @@ def calculate_footprint(product: dict, shipments: list | None = None, events: li
             mode = "sea"
         elif "rail" in carrier or "train" in carrier:
             mode = "rail"
-        dist = _estimate_distance(s)
         emissions = TRANSPORT_EMISSION_FACTORS.get(mode, 0.062) * dist * 0.05
         transport_total += emissions
-        breakdown.append({"shipment_id": s.get("id"), "carrier": s.get("carrier"), "mode": mode, "distance_km": dist, "emissions_kgCO2e": round(emissions, 2)})
+        breakdown.append({"shipment_id": s.id, "carrier": s.carrier, "mode": mode, "distance_km": dist, "emissions_kgCO2e": round(emissions, 2)})
 
     scope3 = {"type": "scope_3", "label": "Value Chain Emissions (Transport/Distribution)", "value": round(transport_total, 2), "unit": "kgCO2e", "transport_breakdown": breakdown}
 
     total = scope1["value"] + scope2["value"] + scope3["value"]
 
     return {
-        "product_id": product.get("id"), "product_name": product.get("name"),
+        "product_id": product.id, "product_name": product.name,
         "total_footprint_kgCO2e": round(total, 2), "grade": _carbon_grade(total),
         "scopes": [scope1, scope2, scope3],
         "scope_breakdown": {
@@ -120,7 +132,7 @@ def calculate_footprint(product: dict, shipments: list | None = None, events: li
     }
 
 
-def aggregate_by_scope(products: list, shipments: list, events: list) -> dict:
+def aggregate_by_scope(products: list[Product], shipments: list[Shipment], events: list[Event]) -> dict:
     """Scope 1/2/3 aggregation across supply chain (optimized: pre-built lookups)."""
     s1 = s2 = s3 = 0.0
     rankings = []
@@ -128,29 +140,32 @@ def aggregate_by_scope(products: list, shipments: list, events: list) -> dict:
     # Pre-index events by product_id: O(events) once instead of O(products × events)
     events_by_product: dict[str, list] = defaultdict(list)
     for e in events:
-        pid = e.get("product_id")
+        pid = e.product_id
         if pid:
             events_by_product[pid].append(e)
 
     # Pre-index shipments by batch_id: O(shipments) once
     ships_by_batch: dict[str, list] = defaultdict(list)
     for s in shipments:
-        bid = s.get("batch_id")
+        bid = s.batch_id
         if bid:
             ships_by_batch[bid].append(s)
 
+    # All transport distances in one vectorized pass
+    dist_by_ship = dict(zip(map(id, shipments), _estimate_distances(shipments)))
+
     for p in products:
-        pid = p.get("id")
+        pid = p.id
         p_events = events_by_product.get(pid, [])
-        batch_ids = {e.get("batch_id") for e in p_events if e.get("batch_id")}
+        batch_ids = {e.batch_id for e in p_events if e.batch_id}
         p_ships = []
         for bid in batch_ids:
             p_ships.extend(ships_by_batch.get(bid, []))
-        fp = calculate_footprint(p, p_ships, p_events)
+        fp = calculate_footprint(p, p_ships, p_events, distances=[dist_by_ship[id(s)] for s in p_ships])
         s1 += fp["scopes"][0]["value"]
         s2 += fp["scopes"][1]["value"]
         s3 += fp["scopes"][2]["value"]
-        rankings.append({"product_id": pid, "name": p.get("name"), "category": p.get("category"), "total": fp["total_footprint_kgCO2e"], "grade": fp["grade"]})
+        rankings.append({"product_id": pid, "name": p.name, "category": p.category, "total": fp["total_footprint_kgCO2e"], "grade": fp["grade"]})
 
     total = s1 + s2 + s3
     rankings.sort(key=lambda x: x["total"], reverse=True)
@@ -167,15 +182,15 @@ def aggregate_by_scope(products: list, shipments: list, events: list) -> dict:
     }
 
 
-def partner_leaderboard(partners: list, shipments: list, violations: list) -> list[dict]:
+def partner_leaderboard(partners: list[Partner], shipments: list[Shipment], violations: list[Violation]) -> list[dict]:
     """Partner ESG leaderboard (optimized: pre-indexed lookups)."""
     result = []
 
     # Pre-index shipments by partner_id (both from/to): O(shipments) once
     ships_by_partner: dict[str, list] = defaultdict(list)
     for s in shipments:
-        fp = s.get("from_partner_id")
-        tp = s.get("to_partner_id")
+        fp = s.from_partner_id
+        tp = s.to_partner_id
         if fp:
             ships_by_partner[fp].append(s)
         if tp and tp != fp:
@@ -184,28 +199,28 @@ def partner_leaderboard(partners: list, shipments: list, violations: list) -> li
     # Pre-index violations by partner_id: O(violations) once
     viols_by_partner: dict[str, int] = defaultdict(int)
     for v in violations:
-        pid = v.get("partner_id")
+        pid = v.partner_id
         if pid:
             viols_by_partner[pid] += 1
 
     for p in partners:
-        pid = p.get("id")
+        pid = p.id
         p_ships = ships_by_partner.get(pid, [])
-        late = sum(1 for s in p_ships if s.get("actual_delivery") and s.get("estimated_delivery") and s["actual_delivery"] > s["estimated_delivery"])
+        late = sum(1 for s in p_ships if s.actual_delivery and s.estimated_delivery and s.actual_delivery > s.estimated_delivery)
         viols = viols_by_partner[pid]
 
-        tw = (p.get("trust_score", 50)) / 100 * 40
+        tw = p.trust_score / 100 * 40
         rw = (1 - late / len(p_ships)) * 30 if p_ships else 15
         cw = max(0, 30 - viols * 10)
         esg = round(min(100, tw + rw + cw))
 
         result.append({
-            "partner_id": pid, "name": p.get("name"), "country": p.get("country"), "type": p.get("type"),
+            "partner_id": pid, "name": p.name, "country": p.country, "type": p.type,
             "esg_score": esg, "grade": "A" if esg >= 80 else ("B" if esg >= 60 else ("C" if esg >= 40 else "D")),
             "metrics": {
-                "trust_score": p.get("trust_score", 50),
+                "trust_score": p.trust_score,
                 "shipment_reliability": f"{round((1 - late / len(p_ships)) * 100)}%" if p_ships else "N/A",
-                "sla_violations": viols, "kyc_status": p.get("kyc_status"),
+                "sla_violations": viols, "kyc_status": p.kyc_status,
             },
         })
     result.sort(key=lambda x: x["esg_score"], reverse=True)
@@ -0,0 +1,527 @@
+"""
+Supply Graph Store
+Named, versioned supply graphs per tenant, held in memory and updated by
+deltas, so repeated graph analytics neither resend nor rebuild the graph.
+
+Each graph keeps, incrementally:
+  - node slots (id ↔ int index) with their attributes
+  - out/in adjacency keyed by node id, one edge slot per (from, to) pair
+  - per slot, the costs of its parallel edges: routes take the cheapest
+    (as routing.route_graph does) and degrees and PageRank count every
+    copy, so results match the stateless endpoints fed the same edge list
+  - in/out degree per node slot, parallel copies included, adjusted on
+    every edge change (O(1) each)
+  - edge src/dst/multiplicity slot arrays for the PageRank power iteration
+  - alert counts per node id
+  - the last PageRank vector, reused as-is while the version is unchanged
+    and as the warm start after an update
+
+A put (create/replace) or a delta bumps the version by one. Each
+``remove_edges`` entry drops one edge of its pair (the one with the same
+cost if any, else the latest added), like removing it from the list. Writes may
+carry ``base_version`` and reads ``version``; a mismatch raises
+VersionConflict (HTTP 409), an unknown graph GraphNotFound (HTTP 404).
+
+Every gunicorn worker has its own memory. With a Redis URL, writes go to
+a per-graph op log in Redis and each worker replays only the ops it
+hasn't seen before serving a request: O(delta) per call, and every
+worker agrees on the version. Once the log holds GRAPH_STORE_COMPACT_OPS
+ops, the writer folds them into a snapshot (a put of the current graph),
+so a cold worker replays at most a snapshot and that many ops. Shared
+graphs expire GRAPH_STORE_TTL_S after their last read or write. Without
+a URL the store is process-local, only suitable for a single worker, and
+a graph evicted from the LRU is gone.
+
+Environment:
+  GRAPH_STORE_MAX_GRAPHS   graphs kept in memory per worker, default 256
+  GRAPH_STORE_REDIS_URL    shared op log (default: REDIS_URL; unset = memory only)
+  GRAPH_STORE_COMPACT_OPS  log length that triggers a snapshot, default 500
+  GRAPH_STORE_TTL_S        idle expiry of shared graphs, 0 = never (default 2592000, 30 days)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any
+
+import numpy as np
+
+from engines.scm_ai import (
+    PAGERANK_MAX_ITER, PAGERANK_TOL, _dijkstra, _route_result, _toxic_node, edge_cost, pagerank_vector,
+)
+
+
+class GraphNotFound(KeyError):
+    pass
+
+
+class VersionConflict(Exception):
+    def __init__(self, current: int) -> None:
+        super().__init__(f"graph is at version {current}")
+        self.current = current
+
+
+class SupplyGraph:
+    """One tenant graph. Not thread-safe on its own; GraphStore locks it."""
+
+    def __init__(self, graph_id: str, version: int = 0) -> None:
+        self.graph_id = graph_id
+        self.version = version
+        self.base = version  # version at the start of the shared op log
+        self._reset()
+
+    def _reset(self) -> None:
+        self.attrs: dict[Any, dict] = {}           # node id → attributes
+        self.slot: dict[Any, int] = {}             # node id → index
+        self.slot_ids: list = []                   # index → node id (None when free)
+        self.free_slots: list[int] = []
+        self.in_deg: list[int] = []                # index → in-degree
+        self.out_deg: list[int] = []               # index → out-degree
+        self.out: dict[Any, dict[Any, int]] = {}   # from id → {to id: edge slot}
+        self.inn: dict[Any, dict[Any, int]] = {}   # to id → {from id: edge slot}
+        self.cost = np.zeros(0)                    # edge slot → cheapest traversal cost
+        self.mult = np.zeros(0, dtype=np.int64)    # edge slot → parallel edge count
+        self.costs: list[list[float] | None] = []  # edge slot → costs of its parallel edges
+        self.src = np.zeros(0, dtype=np.int64)     # edge slot → node index (-1 when free)
+        self.dst = np.zeros(0, dtype=np.int64)
+        self.free_edges: list[int] = []
+        self.edge_count = 0                        # edges, parallel copies included
+        self.alerts: Counter = Counter()
+        self._ranks: np.ndarray | None = None      # by node index, NaN for new slots
+        self._rank_key: tuple | None = None
+        self._rank_map: dict = {}
+        self._rank_iters = 0
+        self._toxic: tuple[int, list[dict]] | None = None   # (version, result)
+
+    # ─── Ops ──────────────────────────────────────────────────
+    def apply(self, op: dict) -> dict:
+        """Apply a put or delta op and bump the version."""
+        if op.get("op") == "put":
+            self._reset()
+            op = {"add_nodes": op.get("nodes", []), "add_edges": op.get("edges", []), "add_alerts": op.get("alerts", [])}
+        skipped = 0
+        for e in op.get("remove_edges", []):
+            self._remove_edge(e.get("from_node_id"), e.get("to_node_id"), edge_cost(e))
+        for nid in op.get("remove_nodes", []):
+            self._remove_node(nid)
+        for nd in op.get("add_nodes", []):
+            self._add_node(nd)
+        for e in op.get("add_edges", []):
+            skipped += not self._add_edge(e)
+        for a in op.get("add_alerts", []):
+            k = a.get("partner_id") or a.get("product_id")
+            if k:
+                self.alerts[k] += 1
+        for a in op.get("remove_alerts", []):
+            k = a.get("partner_id") or a.get("product_id")
+            if self.alerts.get(k, 0) > 1:
+                self.alerts[k] -= 1
+            else:
+                self.alerts.pop(k, None)
+        self.version += 1
+        return {"skipped_edges": skipped}
+
+    def _add_node(self, nd: dict) -> None:
+        nid = nd.get("id")
+        if nid in self.attrs:
+            self.attrs[nid].update(nd)
+            return
+        self.attrs[nid] = dict(nd)
+        if self.free_slots:
+            i = self.free_slots.pop()
+            self.slot_ids[i] = nid
+        else:
+            i = len(self.slot_ids)
+            self.slot_ids.append(nid)
+            self.in_deg.append(0)
+            self.out_deg.append(0)
+        self.slot[nid] = i
+        if self._ranks is not None:
+            if i >= len(self._ranks):
+                self._ranks = np.concatenate([self._ranks, np.full(max(len(self._ranks), 16), np.nan)])
+            self._ranks[i] = np.nan
+        self.out[nid] = {}
+        self.inn[nid] = {}
+
+    def _remove_node(self, nid) -> None:
+        if nid not in self.attrs:
+            return
+        for t in list(self.out[nid]):
+            self._remove_edge(nid, t)
+        for f in list(self.inn[nid]):
+            self._remove_edge(f, nid)
+        del self.attrs[nid], self.out[nid], self.inn[nid]
+        i = self.slot.pop(nid)
+        self.slot_ids[i] = None
+        self.free_slots.append(i)
+
+    def _add_edge(self, e: dict) -> bool:
+        f, t = e.get("from_node_id"), e.get("to_node_id")
+        if f not in self.attrs or t not in self.attrs:
+            return False
+        c = edge_cost(e)
+        k = self.out[f].get(t)
+        if k is None:
+            if not self.free_edges:
+                self._grow_edges()
+            k = self.free_edges.pop()
+            self.out[f][t] = k
+            self.inn[t][f] = k
+            self.src[k] = self.slot[f]
+            self.dst[k] = self.slot[t]
+            self.costs[k] = [c]
+            self.cost[k] = c
+        else:
+            self.costs[k].append(c)
+            self.cost[k] = min(self.cost[k], c)
+        self.mult[k] += 1
+        self.edge_count += 1
+        self.out_deg[self.slot[f]] += 1
+        self.in_deg[self.slot[t]] += 1
+        return True
+
+    def _remove_edge(self, f, t, cost: float | None = None) -> None:
+        """Drop one (f, t) edge — the one costing ``cost`` if any, else the
+        latest added — or every parallel copy when ``cost`` is None."""
+        k = self.out.get(f, {}).get(t)
+        if k is None:
+            return
+        costs = self.costs[k]
+        if cost is not None and len(costs) > 1:
+            costs.pop(costs.index(cost) if cost in costs else -1)
+            self.cost[k] = min(costs)
+            removed = 1
+        else:
+            del self.out[f][t], self.inn[t][f]
+            self.src[k] = self.dst[k] = -1
+            self.costs[k] = None
+            self.free_edges.append(k)
+            removed = int(self.mult[k])
+        self.mult[k] -= removed
+        self.edge_count -= removed
+        self.out_deg[self.slot[f]] -= removed
+        self.in_deg[self.slot[t]] -= removed
+
+    def _grow_edges(self) -> None:
+        old = len(self.src)
+        extra = max(old, 64)
+        self.src = np.concatenate([self.src, np.full(extra, -1, dtype=np.int64)])
+        self.dst = np.concatenate([self.dst, np.full(extra, -1, dtype=np.int64)])
+        self.cost = np.concatenate([self.cost, np.zeros(extra)])
+        self.mult = np.concatenate([self.mult, np.zeros(extra, dtype=np.int64)])
+        self.costs.extend([None] * extra)
+        self.free_edges.extend(range(old + extra - 1, old - 1, -1))
+
+    # ─── Analytics ────────────────────────────────────────────
+    def page_rank(self, damping: float = 0.85, tol: float = PAGERANK_TOL,
+                  max_iter: int = PAGERANK_MAX_ITER) -> tuple[dict, int]:
+        """Ranks by node id and the iterations the last solve took. Served
+        from the cached vector while nothing changed; otherwise warm-started
+        from it."""
+        key = (self.version, damping, tol, max_iter)
+        if self._rank_key != key:
+            self._solve(damping, tol, max_iter)
+            ranks = self._ranks.tolist()
+            self._rank_map = {nid: ranks[i] for nid, i in self.slot.items()}
+            self._rank_key = key
+        return self._rank_map, self._rank_iters
+
+    def _solve(self, damping: float, tol: float, max_iter: int) -> None:
+        slots = len(self.slot_ids)
+        live_edges = self.src >= 0
+        # One entry per parallel copy, as scm_ai.edge_index gives for an edge list
+        mult = self.mult[live_edges]
+        src, dst = np.repeat(self.src[live_edges], mult), np.repeat(self.dst[live_edges], mult)
+        if self._ranks is None:
+            self._ranks = np.full(slots, np.nan)
+        start = self._ranks[:slots]
+        alive = np.fromiter((nid is not None for nid in self.slot_ids), dtype=bool, count=slots)
+        n = int(alive.sum())
+        if n == 0:
+            self._rank_iters = 0
+            return
+        start = np.where(np.isnan(start), 1 / n, start)
+        if n < slots:
+            # Free slots carry no edges; compact them out so they hold no rank
+            index = np.cumsum(alive) - 1
+            ranks, self._rank_iters = pagerank_vector(index[src], index[dst], n, damping, max_iter, tol, start[alive])
+            self._ranks[:slots] = np.nan
+            self._ranks[np.flatnonzero(alive)] = ranks
+        else:
+            ranks, self._rank_iters = pagerank_vector(src, dst, n, damping, max_iter, tol, start)
+            self._ranks[:slots] = ranks
+
+    def toxic_nodes(self) -> list[dict]:
+        if self._toxic is not None and self._toxic[0] == self.version:
+            return self._toxic[1]
+        ranks, _ = self.page_rank()
+        n = max(len(self.attrs) - 1, 1)
+        slot, in_deg, out_deg = self.slot, self.in_deg, self.out_deg
+        result = [
+            _toxic_node(nd, ranks[nid], in_deg[slot[nid]], out_deg[slot[nid]], self.alerts[nid], n)
+            for nid, nd in self.attrs.items()
+        ]
+        result.sort(key=lambda x: x["toxicity_score"], reverse=True)
+        self._toxic = (self.version, result)
+        return result
+
+    def optimize_route(self, from_id, to_id) -> dict:
+        cost = self.cost
+        out = self.out
+
+        def neighbors(node):
+            return ((t, cost[k]) for t, k in out.get(node, {}).items())
+
+        dist, prev, expanded = _dijkstra(neighbors, from_id, to_id)
+        return _route_result(dist, prev, from_id, to_id, to_id in self.attrs, expanded)
+
+    def info(self) -> dict:
+        return {
+            "version": self.version, "nodes": len(self.attrs), "edges": self.edge_count,
+            "alerts": sum(self.alerts.values()),
+        }
+
+    def snapshot(self) -> dict:
+        """A put op that rebuilds this graph, parallel edges and alert counts included."""
+        costs = self.costs
+        return {
+            "op": "put",
+            "nodes": list(self.attrs.values()),
+            # edge_cost({"weight": c}) == c, so every copy keeps its exact cost
+            "edges": [{"from_node_id": f, "to_node_id": t, "weight": c}
+                      for f, outs in self.out.items() for t, k in outs.items() for c in costs[k]],
+            "alerts": [{"partner_id": k} for k, count in self.alerts.items() for _ in range(count)],
+        }
+
+
+# KEYS = meta, log, snap; ARGV = local graph id ("" if none), local version,
+# ttl ms. Returns nil for an unknown graph, else {id, base, full, snap, ops}:
+# the ops after the local version, or (full = 1) the snapshot and whole log
+# when the local copy is another graph or older than the log's start.
+_SYNC = """
+local m = redis.call('HMGET', KEYS[1], 'id', 'base')
+if not m[1] then return false end
+local ttl = tonumber(ARGV[3])
+if ttl > 0 then
+  for _, k in ipairs(KEYS) do redis.call('PEXPIRE', k, ttl) end
+end
+local base, v = tonumber(m[2]), tonumber(ARGV[2])
+if m[1] ~= ARGV[1] or v < base then
+  return {m[1], m[2], 1, redis.call('GET', KEYS[3]), redis.call('LRANGE', KEYS[2], 0, -1)}
+end
+return {m[1], m[2], 0, false, redis.call('LRANGE', KEYS[2], v - base, -1)}
+"""
+
+# Per-key locks are striped so the lock table stays bounded however many
+# graphs come and go
+_LOCK_STRIPES = 64
+
+
+class GraphStore:
+    """Per-tenant SupplyGraphs, LRU-bounded, optionally backed by a Redis op log."""
+
+    def __init__(self, max_graphs: int | None = None, redis_url: str | None = None) -> None:
+        self.max_graphs = max_graphs or int(os.getenv("GRAPH_STORE_MAX_GRAPHS", "256"))
+        self.compact_ops = max(1, int(os.getenv("GRAPH_STORE_COMPACT_OPS", "500")))
+        self.ttl_s = int(os.getenv("GRAPH_STORE_TTL_S", str(30 * 24 * 3600)))
+        self._graphs: OrderedDict[tuple, SupplyGraph] = OrderedDict()
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._lock = threading.Lock()
+        self._redis = None
+        url = redis_url or os.getenv("GRAPH_STORE_REDIS_URL") or os.getenv("REDIS_URL")
+        if url:
+            import redis
+            self._redis = redis.from_url(url)
+            self._sync_script = self._redis.register_script(_SYNC)
+
+    # ─── Public API ───────────────────────────────────────────
+    def put(self, tenant: str, name: str, nodes: list[dict], edges: list[dict], alerts: list[dict],
+            base_version: int | None = None) -> dict:
+        """Create or replace a graph."""
+        op = {"op": "put", "nodes": nodes, "edges": edges, "alerts": alerts}
+        return self._write(tenant, name, op, base_version, create=True)
+
+    def update(self, tenant: str, name: str, delta: dict, base_version: int | None = None) -> dict:
+        """Apply an add/remove delta to an existing graph."""
+        return self._write(tenant, name, {"op": "delta", **delta}, base_version, create=False)
+
+    def delete(self, tenant: str, name: str) -> None:
+        key = (tenant, name)
+        with self._lock_for(key):
+            if self._redis is not None:
+                if not self._redis.delete(*self._redis_keys(key)):
+                    raise GraphNotFound(key)
+            elif key not in self._graphs:
+                raise GraphNotFound(key)
+            with self._lock:
+                self._graphs.pop(key, None)
+
+    def info(self, tenant: str, name: str, version: int | None = None) -> dict:
+        return self._read(tenant, name, version, lambda g: g.info())
+
+    def page_rank(self, tenant: str, name: str, version: int | None = None, damping: float = 0.85,
+                  tol: float = PAGERANK_TOL, iterations: int = PAGERANK_MAX_ITER) -> dict:
+        def run(g: SupplyGraph) -> dict:
+            ranks, iters = g.page_rank(damping, tol, iterations)
+            return {"version": g.version, "iterations": iters, "ranks": ranks}
+        return self._read(tenant, name, version, run)
+
+    def toxic_nodes(self, tenant: str, name: str, version: int | None = None) -> dict:
+        return self._read(tenant, name, version, lambda g: {"version": g.version, "nodes": g.toxic_nodes()})
+
+    def optimize_route(self, tenant: str, name: str, from_id: str, to_id: str, version: int | None = None) -> dict:
+        return self._read(tenant, name, version, lambda g: {"version": g.version, **g.optimize_route(from_id, to_id)})
+
+    def stats(self) -> dict:
+        return {"graphs": len(self._graphs), "max_graphs": self.max_graphs, "shared": self._redis is not None}
+
+    # ─── Internals ────────────────────────────────────────────
+    def _lock_for(self, key: tuple) -> threading.Lock:
+        return self._locks[hash(key) % _LOCK_STRIPES]
+
+    def _read(self, tenant: str, name: str, version: int | None, fn) -> dict:
+        key = (tenant, name)
+        with self._lock_for(key):
+            g = self._sync(key)
+            if version is not None and version != g.version:
+                raise VersionConflict(g.version)
+            return fn(g)
+
+    def _write(self, tenant: str, name: str, op: dict, base_version: int | None, create: bool) -> dict:
+        key = (tenant, name)
+        with self._lock_for(key):
+            if self._redis is not None:
+                version = self._append(key, op, base_version, create)
+                results: dict[int, dict] = {}
+                g = self._sync(key, results)
+                if g.version - g.base >= self.compact_ops:
+                    self._compact(key, g)
+                # Missing only if another worker compacted our op away first
+                applied = results.get(version, {})
+            else:
+                g = self._graphs.get(key)
+                if g is None and not create:
+                    raise GraphNotFound(key)
+                current = g.version if g else 0
+                if base_version is not None and base_version != current:
+                    raise VersionConflict(current)
+                if g is None:
+                    g = SupplyGraph(uuid.uuid4().hex)
+                    self._remember(key, g)
+                applied = g.apply(op)
+            return {"tenant": tenant, "name": name, **g.info(), **applied}
+
+    def _remember(self, key: tuple, g: SupplyGraph) -> None:
+        with self._lock:
+            self._graphs[key] = g
+            self._graphs.move_to_end(key)
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+
+    # ─── Redis op log ─────────────────────────────────────────
+    # graph:{tenant}:{name}:meta  hash {id, base}: id changes on every put,
+    #                             base is the version at the start of the log
+    # graph:{tenant}:{name}:snap  put op rebuilding the graph at version base
+    #                             (absent until the first compaction)
+    # graph:{tenant}:{name}:log   list of JSON ops after base;
+    #                             version = base + LLEN
+    @staticmethod
+    def _redis_keys(key: tuple) -> tuple[str, str, str]:
+        prefix = f"graph:{key[0]}:{key[1]}"
+        return f"{prefix}:meta", f"{prefix}:log", f"{prefix}:snap"
+
+    def _expire(self, pipe, keys: tuple) -> None:
+        if self.ttl_s > 0:
+            for k in keys:
+                pipe.expire(k, self.ttl_s)
+
+    def _append(self, key: tuple, op: dict, base_version: int | None, create: bool) -> int:
+        """Append ``op`` to the shared log; return the version it creates."""
+        import redis
+
+        keys = meta, log, snap = self._redis_keys(key)
+        body = json.dumps(op, separators=(",", ":"), default=str)
+        with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(meta, log)
+                    gid, base = pipe.hmget(meta, "id", "base")
+                    current = int(base) + pipe.llen(log) if gid is not None else 0
+                    if gid is None and not create:
+                        raise GraphNotFound(key)
+                    if base_version is not None and base_version != current:
+                        raise VersionConflict(current)
+                    pipe.multi()
+                    if create:
+                        pipe.delete(log, snap)
+                        pipe.hset(meta, mapping={"id": uuid.uuid4().hex, "base": current})
+                    pipe.rpush(log, body)
+                    self._expire(pipe, keys)
+                    pipe.execute()
+                    return current + 1
+                except redis.WatchError:
+                    continue
+
+    def _compact(self, key: tuple, g: SupplyGraph) -> None:
+        """Fold the log up to ``g.version`` into a snapshot. Best effort: a
+        concurrent put, delete or compaction wins and this one is dropped."""
+        import redis
+
+        keys = meta, log, snap = self._redis_keys(key)
+        folded = g.version - g.base
+        body = json.dumps(g.snapshot(), separators=(",", ":"), default=str)
+        with self._redis.pipeline() as pipe:
+            try:
+                # Appends only push to the tail, so watching meta is enough
+                pipe.watch(meta)
+                gid, base = pipe.hmget(meta, "id", "base")
+                if gid is None or gid.decode() != g.graph_id or int(base) != g.base:
+                    return
+                pipe.multi()
+                pipe.set(snap, body)
+                pipe.ltrim(log, folded, -1)
+                pipe.hset(meta, "base", g.version)
+                self._expire(pipe, keys)
+                pipe.execute()
+            except redis.WatchError:
+                return
+        g.base = g.version
+
+    def _sync(self, key: tuple, results: dict[int, dict] | None = None) -> SupplyGraph:
+        """Local graph for ``key``, caught up with the shared log if any;
+        ``results`` collects what each replayed op reported, by version."""
+        g = self._graphs.get(key)
+        if self._redis is None:
+            if g is None:
+                raise GraphNotFound(key)
+            with self._lock:
+                self._graphs.move_to_end(key)
+            return g
+
+        # One round trip: just the tail this worker hasn't applied, or the
+        # snapshot and whole log when its copy is missing or too old
+        res = self._sync_script(keys=list(self._redis_keys(key)),
+                                args=[g.graph_id if g else "", g.version if g else 0, self.ttl_s * 1000])
+        if not res:
+            with self._lock:
+                self._graphs.pop(key, None)
+            raise GraphNotFound(key)
+        gid, base, full, snap, ops = res
+        base = int(base)
+        if full:
+            g = SupplyGraph(gid.decode(), base)
+            if snap:
+                g.version = base - 1  # the snapshot is a put: applying it lands on base
+                g.apply(json.loads(snap))
+        # Every sync counts as a use, so the LRU drops the coldest graph
+        self._remember(key, g)
+        g.base = base
+        for raw in ops:
+            applied = g.apply(json.loads(raw))
+            if results is not None:
+                results[g.version] = applied
+        return g
@@ -0,0 +1,379 @@
+"""
+Route Optimization
+Many-to-many risk-weighted routing on one supply graph, with optional
+k-shortest alternatives (Yen), and goal-directed point-to-point search
+(A* on node coordinates, bidirectional Dijkstra).
+
+The graph is indexed once per request into CSR form: node ids → ints,
+out-edges of node i at indices[indptr[i]:indptr[i + 1]]. Edge cost
+``weight * (1 + risk_score)`` is computed once, vectorized, and parallel
+edges collapse to their cheapest. Pairs are grouped by origin so each
+origin grows a single Dijkstra tree that stops once all of its
+destinations are settled. Yen's spur searches are goal-directed by the
+exact distance-to-target from one reverse Dijkstra tree per destination,
+shared by every pair that ends there.
+
+The A* heuristic is κ·great-circle(v, target) with κ the smallest cost per
+km over all edges. Any path is at least as long as the great circle, and
+costs at least κ per km of it, so the heuristic never overestimates and is
+consistent: settled nodes are final and the result equals Dijkstra's.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections import defaultdict
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from engines.geo import haversine_km
+
+# Bump when results change for the same input (invalidates cached responses)
+ENGINE_VERSION = "1"
+
+INF = float("inf")
+
+ALGORITHMS = ("dijkstra", "astar", "bidirectional")
+
+# Request bounds, shared by the HTTP schema and the queue handler
+MAX_PAIRS = 1000
+MAX_K = 10
+
+# κ is shaved so haversine rounding can't make the heuristic overestimate
+_KAPPA_SLACK = 1 - 1e-9
+
+
+class RouteGraph(NamedTuple):
+    """CSR adjacency. Arrays are kept as Python lists: the Dijkstra loop is
+    scalar, and list indexing beats NumPy item access there."""
+    ids: list                # index → node id
+    pos: dict[Any, int]      # node id → index
+    indptr: list[int]
+    indices: list[int]
+    cost: list[float]
+
+
+def route_graph(graph: list[dict]) -> RouteGraph:
+    """Index an edge list (from_node_id, to_node_id, weight, risk_score)."""
+    pos: dict[Any, int] = {}
+    m = len(graph)
+    src = np.empty(m, dtype=np.int64)
+    dst = np.empty(m, dtype=np.int64)
+    for k, e in enumerate(graph):
+        src[k] = pos.setdefault(e.get("from_node_id", ""), len(pos))
+        dst[k] = pos.setdefault(e.get("to_node_id", ""), len(pos))
+    weight = np.fromiter((e.get("weight", 1) for e in graph), dtype=np.float64, count=m)
+    risk = np.fromiter((e.get("risk_score", 0) for e in graph), dtype=np.float64, count=m)
+    cost = weight * (1 + risk)
+
+    # Sort by (src, dst, cost) and keep the first, i.e. cheapest, parallel edge
+    order = np.lexsort((cost, dst, src))
+    src, dst, cost = src[order], dst[order], cost[order]
+    keep = np.ones(m, dtype=bool)
+    keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    src, dst, cost = src[keep], dst[keep], cost[keep]
+
+    n = len(pos)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return RouteGraph(list(pos), pos, indptr.tolist(), dst.tolist(), cost.tolist())
+
+
+def shortest_tree(g: RouteGraph, source: int, targets: set[int] | None = None) -> tuple[list[float], list[int]]:
+    """Dijkstra from ``source``; stops once every node in ``targets`` is
+    settled (None = whole reachable graph). Returns (dist, prev) by index."""
+    indptr, indices, cost = g.indptr, g.indices, g.cost
+    n = len(g.ids)
+    dist = [INF] * n
+    prev = [-1] * n
+    settled = [False] * n
+    dist[source] = 0.0
+    remaining = set(targets) if targets is not None else None
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if settled[u]:
+            continue
+        settled[u] = True
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        for j in range(indptr[u], indptr[u + 1]):
+            v = indices[j]
+            nd = d + cost[j]
+            if nd < dist[v]:
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(heap, (nd, v))
+    return dist, prev
+
+
+def reverse_graph(g: RouteGraph) -> RouteGraph:
+    """The same graph with every edge reversed (CSR over in-edges)."""
+    n = len(g.ids)
+    src = np.repeat(np.arange(n, dtype=np.int64), np.diff(g.indptr))
+    dst = np.asarray(g.indices, dtype=np.int64)
+    order = np.argsort(dst, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dst, minlength=n), out=indptr[1:])
+    return RouteGraph(g.ids, g.pos, indptr.tolist(), src[order].tolist(), np.asarray(g.cost)[order].tolist())
+
+
+def _search(g: RouteGraph, source: int, target: int, h: list[float], banned_nodes: set[int],
+            banned_edges: set[tuple[int, int]]) -> tuple[float, list[int]] | None:
+    """Point-to-point search avoiding some nodes/edges (Yen spur search).
+    ``h`` is the unrestricted distance to ``target``; banning only makes
+    paths longer, so it is a consistent A* potential."""
+    indptr, indices, cost = g.indptr, g.indices, g.cost
+    dist = {source: 0.0}
+    prev: dict[int, int] = {}
+    done: set[int] = set()
+    heap = [(h[source], source)]
+    while heap:
+        _, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        if u == target:
+            path = [u]
+            while u != source:
+                u = prev[u]
+                path.append(u)
+            path.reverse()
+            return dist[target], path
+        done.add(u)
+        d = dist[u]
+        for j in range(indptr[u], indptr[u + 1]):
+            v = indices[j]
+            if h[v] == INF or v in banned_nodes or (u, v) in banned_edges:
+                continue
+            nd = d + cost[j]
+            if nd < dist.get(v, INF):
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(heap, (nd + h[v], v))
+    return None
+
+
+def _edge_cost(g: RouteGraph, u: int, v: int) -> float:
+    for j in range(g.indptr[u], g.indptr[u + 1]):
+        if g.indices[j] == v:
+            return g.cost[j]
+    return INF
+
+
+def k_shortest(g: RouteGraph, first: tuple[float, list[int]], k: int,
+               h: list[float] | None = None) -> list[tuple[float, list[int]]]:
+    """Yen's algorithm: up to ``k`` loopless paths, cheapest first, given the
+    shortest one. ``h`` is the distance of every node to the target (the
+    reverse shortest-path tree), if already computed."""
+    found = [first]
+    candidates: list[tuple[float, list[int]]] = []
+    seen = {tuple(first[1])}
+    target = first[1][-1]
+    if h is None:
+        h, _ = shortest_tree(reverse_graph(g), target)
+    while len(found) < k:
+        _, last = found[-1]
+        root_cost = 0.0
+        for i in range(len(last) - 1):
+            spur, root = last[i], last[:i + 1]
+            banned_edges = {(p[i], p[i + 1]) for _, p in found if len(p) > i + 1 and p[:i + 1] == root}
+            spur_path = _search(g, spur, target, h, set(root[:-1]), banned_edges)
+            if spur_path is not None:
+                path = root[:-1] + spur_path[1]
+                if tuple(path) not in seen:
+                    seen.add(tuple(path))
+                    heapq.heappush(candidates, (root_cost + spur_path[0], path))
+            root_cost += _edge_cost(g, last[i], last[i + 1])
+        if not candidates:
+            break
+        found.append(heapq.heappop(candidates))
+    return found
+
+
+def _path(prev: list[int], source: int, target: int) -> list[int]:
+    path = [target]
+    while target != source:
+        target = prev[target]
+        path.append(target)
+    path.reverse()
+    return path
+
+
+def _route_result(g: RouteGraph, from_id, to_id, found: tuple[float, list[int]] | None) -> dict:
+    """Shape one route like scm_ai.optimize_route, incl. its unknown-node and
+    unreachable cases; ``found`` is (cost, index path) or None."""
+    if not g.ids:
+        return {"path": [], "cost": 0, "optimized": False, "hops": 0}
+    if from_id == to_id:
+        return {"path": [from_id], "cost": 0, "optimized": True, "hops": 0}
+    if found is None:
+        return {"path": [to_id], "cost": INF if to_id in g.pos else 0, "optimized": False, "hops": 0}
+    cost, path = found
+    return {"path": [g.ids[i] for i in path], "cost": round(cost, 2), "optimized": True, "hops": len(path) - 1}
+
+
+def optimize_routes(graph: list[dict], pairs: list[tuple[str, str]], k: int = 1) -> dict:
+    """Shortest risk-weighted route for each (from_id, to_id) pair, plus up
+    to k-1 alternatives per pair when k > 1. Each route has the same shape
+    as scm_ai.optimize_route. At most MAX_PAIRS pairs; k is clamped to
+    1..MAX_K."""
+    if len(pairs) > MAX_PAIRS:
+        return {"error": f"{len(pairs)} pairs; the limit is {MAX_PAIRS}"}
+    k = min(max(int(k), 1), MAX_K)
+    g = route_graph(graph)
+    by_source: dict[int, set[int]] = defaultdict(set)
+    for f, t in pairs:
+        if f in g.pos and t in g.pos:
+            by_source[g.pos[f]].add(g.pos[t])
+    trees = {s: shortest_tree(g, s, targets) for s, targets in by_source.items()}
+    rg = reverse_graph(g) if k > 1 else None
+    to_target: dict[int, list[float]] = {}  # destination → distance-to-target, for Yen
+
+    routes = []
+    for f, t in pairs:
+        found = None
+        if g.ids and f != t and f in g.pos and t in g.pos:
+            s, d = g.pos[f], g.pos[t]
+            dist, prev = trees[s]
+            if dist[d] < INF:
+                found = (dist[d], _path(prev, s, d))
+        route = {"from_id": f, "to_id": t, **_route_result(g, f, t, found)}
+        if k > 1:
+            alternatives = []
+            if found:
+                if d not in to_target:
+                    to_target[d] = shortest_tree(rg, d)[0]
+                alternatives = [
+                    {"path": [g.ids[i] for i in p], "cost": round(c, 2), "hops": len(p) - 1}
+                    for c, p in k_shortest(g, found, k, to_target[d])[1:]
+                ]
+            route["alternatives"] = alternatives
+        routes.append(route)
+
+    return {"routes": routes, "origins": len(trees), "nodes": len(g.ids), "edges": len(g.indices)}
+
+
+# ─── Point-to-point search ────────────────────────────────────
+
+def node_coords(g: RouteGraph, nodes: list[dict]) -> tuple[np.ndarray, np.ndarray] | None:
+    """(lat, lng) arrays by index, or None unless every graph node has both."""
+    lat = np.full(len(g.ids), np.nan)
+    lng = np.full(len(g.ids), np.nan)
+    for nd in nodes:
+        i = g.pos.get(nd.get("id"))
+        if i is not None and nd.get("latitude") is not None and nd.get("longitude") is not None:
+            lat[i], lng[i] = nd["latitude"], nd["longitude"]
+    if np.isnan(lat).any():
+        return None
+    return lat, lng
+
+
+def distance_heuristic(g: RouteGraph, lat: np.ndarray, lng: np.ndarray, target: int) -> list[float]:
+    """Admissible, consistent A* potential: κ·great-circle km to ``target``."""
+    indptr = np.asarray(g.indptr)
+    src = np.repeat(np.arange(len(g.ids)), np.diff(indptr))
+    dst = np.asarray(g.indices, dtype=np.int64)
+    km = haversine_km(lat[src], lng[src], lat[dst], lng[dst])
+    moving = km > 0
+    kappa = float((np.asarray(g.cost)[moving] / km[moving]).min()) * _KAPPA_SLACK if moving.any() else 0.0
+    return (max(kappa, 0.0) * haversine_km(lat, lng, lat[target], lng[target])).tolist()
+
+
+def astar(g: RouteGraph, source: int, target: int, h: list[float]) -> tuple[tuple[float, list[int]] | None, int]:
+    """A* from ``source`` to ``target`` under potential ``h``.
+    Returns ((cost, index path) or None, nodes expanded)."""
+    indptr, indices, cost = g.indptr, g.indices, g.cost
+    dist = {source: 0.0}
+    prev: dict[int, int] = {}
+    done: set[int] = set()
+    heap = [(h[source], source)]
+    while heap:
+        _, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+        if u == target:
+            path = [u]
+            while u != source:
+                u = prev[u]
+                path.append(u)
+            path.reverse()
+            return (dist[target], path), len(done)
+        d = dist[u]
+        for j in range(indptr[u], indptr[u + 1]):
+            v = indices[j]
+            nd = d + cost[j]
+            if nd < dist.get(v, INF):
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(heap, (nd + h[v], v))
+    return None, len(done)
+
+
+def bidirectional(g: RouteGraph, rg: RouteGraph, source: int, target: int) -> tuple[tuple[float, list[int]] | None, int]:
+    """Bidirectional Dijkstra: forward on ``g``, backward on ``rg`` =
+    reverse_graph(g), always advancing the side with the smaller frontier key.
+    Stops once the two frontier minima together reach the best meeting cost."""
+    dist = ({source: 0.0}, {target: 0.0})
+    prev: tuple[dict[int, int], dict[int, int]] = ({}, {})
+    done: tuple[set[int], set[int]] = (set(), set())
+    heaps = ([(0.0, source)], [(0.0, target)])
+    adj = ((g.indptr, g.indices, g.cost), (rg.indptr, rg.indices, rg.cost))
+    best, meet = INF, -1
+    while heaps[0] and heaps[1] and heaps[0][0][0] + heaps[1][0][0] < best:
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        d, u = heapq.heappop(heaps[side])
+        if u in done[side]:
+            continue
+        done[side].add(u)
+        here, there = dist[side], dist[1 - side]
+        indptr, indices, cost = adj[side]
+        for j in range(indptr[u], indptr[u + 1]):
+            v = indices[j]
+            nd = d + cost[j]
+            if nd < here.get(v, INF):
+                here[v] = nd
+                prev[side][v] = u
+                heapq.heappush(heaps[side], (nd, v))
+            if v in there and nd + there[v] < best:
+                best, meet = nd + there[v], v
+    expanded = len(done[0] | done[1])
+    if meet < 0:
+        return None, expanded
+
+    path = [meet]
+    u = meet
+    while u != source:
+        u = prev[0][u]
+        path.append(u)
+    path.reverse()
+    u = meet
+    while u != target:
+        u = prev[1][u]
+        path.append(u)
+    return (best, path), expanded
+
+
+def point_route(graph: list[dict], from_id: str, to_id: str, nodes: list[dict], algorithm: str) -> dict:
+    """Single route via A* (``nodes`` must give latitude/longitude for every
+    graph node, otherwise plain Dijkstra, i.e. A* with a zero heuristic) or
+    bidirectional Dijkstra. Same result as scm_ai.optimize_route, plus the
+    algorithm actually used and ``expanded_nodes``."""
+    g = route_graph(graph)
+    found, expanded = None, 0
+    if from_id != to_id and from_id in g.pos and to_id in g.pos:
+        s, t = g.pos[from_id], g.pos[to_id]
+        if algorithm == "bidirectional":
+            found, expanded = bidirectional(g, reverse_graph(g), s, t)
+        else:
+            coords = node_coords(g, nodes) if algorithm == "astar" else None
+            if coords is None:
+                algorithm = "dijkstra"
+                h = [0.0] * len(g.ids)
+            else:
+                h = distance_heuristic(g, *coords, t)
+            found, expanded = astar(g, s, t, h)
+    return {**_route_result(g, from_id, to_id, found), "algorithm": algorithm, "expanded_nodes": expanded}
@@ -1,7 +1,7 @@
 """
 Supply Chain AI Engine
 Delay prediction (EWMA), inventory forecast (Holt method), bottleneck detection,
-Dijkstra route optimization, partner risk scoring, PageRank, toxic node detection.
+Dijkstra / A* route optimization, partner risk scoring, PageRank, toxic node detection.
 Ported from server/engines/scm-ai.js
 """
 
@@ -13,21 +13,32 @@ from collections import defaultdict, Counter
 from datetime import datetime, timezone
 from typing import Any
 
+import numpy as np
 
-def predict_delay(shipments: list[dict]) -> dict:
+from engines import routing
+from engines.timestamps import parse_iso
+from schemas import Alert, Event, InventoryItem, Partner, Shipment, Violation
+
+# Bump when results change for the same input (invalidates cached responses)
+ENGINE_VERSION = "3"
+
+# PageRank power iteration: cap and L1 convergence tolerance
+PAGERANK_MAX_ITER = 100
+PAGERANK_TOL = 1e-6
+
+
+def predict_delay(shipments: list[Shipment]) -> dict:
     """Predict delivery delay using exponential weighted moving average."""
     if not shipments or len(shipments) < 2:
         return {"predicted_delay_hours": 0, "confidence": 0.5, "risk": "low"}
 
     delays = []
     for s in shipments:
-        if s.get("actual_delivery") and s.get("estimated_delivery"):
-            try:
-                est = datetime.fromisoformat(str(s["estimated_delivery"]).replace("Z", "+00:00")).timestamp()
-                act = datetime.fromisoformat(str(s["actual_delivery"]).replace("Z", "+00:00")).timestamp()
-                delays.append((act - est) / 3600)
-            except Exception:
-                pass
+        if s.actual_delivery and s.estimated_delivery:
+            est = parse_iso(s.estimated_delivery)
+            act = parse_iso(s.actual_delivery)
+            if est is not None and act is not None:
+                delays.append((act.timestamp() - est.timestamp()) / 3600)
 
     if not delays:
         return {"predicted_delay_hours": 0, "confidence": 0.6, "risk": "low"}
@@ -50,12 +61,12 @@ def predict_delay(shipments: list[dict]) -> dict:
     }
 
 
-def forecast_inventory(history: list[dict], periods_ahead: int = 7) -> dict:
+def forecast_inventory(history: list[InventoryItem], periods_ahead: int = 7) -> dict:
     """Inventory forecast using double exponential smoothing (Holt)."""
     if not history or len(history) < 3:
         return {"forecast": [], "trend": "stable", "confidence": 0.4, "alert": None}
 
-    values = [h.get("quantity", 0) for h in history]
+    values = [h.quantity for h in history]
     alpha, beta = 0.4, 0.1
     level = values[0]
     trend = values[1] - values[0] if len(values) > 1 else 0
@@ -89,22 +100,22 @@ def forecast_inventory(history: list[dict], periods_ahead: int = 7) -> dict:
     }
 
 
-def detect_bottlenecks(events: list[dict], partners: list[dict]) -> dict:
+def detect_bottlenecks(events: list[Event], partners: list[Partner]) -> dict:
     """Detect supply chain bottlenecks via throughput analysis."""
     stats: dict[str, dict] = {}
     for e in events or []:
-        key = e.get("partner_id") or e.get("location") or "unknown"
+        key = e.partner_id or e.location or "unknown"
         if key not in stats:
             stats[key] = {"node": key, "events": 0, "types": defaultdict(int)}
         stats[key]["events"] += 1
-        stats[key]["types"][e.get("event_type", "other")] += 1
+        stats[key]["types"][e.event_type] += 1
 
     nodes = list(stats.values())
     if not nodes:
         return {"bottlenecks": [], "health": "healthy"}
 
     avg = sum(n["events"] for n in nodes) / len(nodes)
-    partner_map = {p.get("id"): p.get("name") for p in (partners or [])}
+    partner_map = {p.id: p.name for p in (partners or [])}
 
     bottlenecks = []
     for n in nodes:
@@ -121,23 +132,18 @@ def detect_bottlenecks(events: list[dict], partners: list[dict]) -> dict:
     return {"bottlenecks": bottlenecks, "health": "healthy" if bc == 0 else ("warning" if bc <= 2 else "critical"), "total_nodes": len(nodes), "bottleneck_count": bc}
 
 
-def optimize_route(graph: list[dict], from_id: str, to_id: str) -> dict:
-    """Dijkstra shortest path with risk-weighted edges (heapq optimized)."""
-    if not graph:
-        return {"path": [], "cost": 0, "optimized": False}
+def edge_cost(e: dict) -> float:
+    """Risk-weighted traversal cost of an edge."""
+    return e.get("weight", 1) * (1 + e.get("risk_score", 0))
 
-    adj: dict[str, list[tuple[str, float]]] = defaultdict(list)
-    all_nodes: set[str] = set()
-    for e in graph:
-        f, t = e.get("from_node_id", ""), e.get("to_node_id", "")
-        all_nodes.update((f, t))
-        w = e.get("weight", 1) * (1 + e.get("risk_score", 0))
-        adj[f].append((t, w))
 
-    dist = {n: float("inf") for n in all_nodes}
-    prev: dict[str, str | None] = {}
-    dist[from_id] = 0
-    visited: set[str] = set()
+def _dijkstra(neighbors, from_id, to_id) -> tuple[dict, dict, int]:
+    """Dijkstra from ``from_id`` with early exit at ``to_id``; ``neighbors(node)``
+    yields (neighbor, weight) pairs. Returns (dist, prev) for settled/seen nodes
+    and the number of nodes expanded (popped and settled, target included)."""
+    dist = {from_id: 0}
+    prev: dict = {}
+    visited: set = set()
     # heapq priority queue: (cost, node)
     heap = [(0.0, from_id)]
 
@@ -146,18 +152,22 @@ def optimize_route(graph: list[dict], from_id: str, to_id: str) -> dict:
         if node in visited:
             continue
         if node == to_id:
-            break  # Early exit when target reached
+            return dist, prev, len(visited) + 1  # Early exit when target reached
         visited.add(node)
-        for neighbor, weight in adj[node]:
+        for neighbor, weight in neighbors(node):
             nc = cost + weight
             if nc < dist.get(neighbor, float("inf")):
                 dist[neighbor] = nc
                 prev[neighbor] = node
                 heapq.heappush(heap, (nc, neighbor))
+    return dist, prev, len(visited)
 
+
+def _route_result(dist: dict, prev: dict, from_id, to_id, known: bool, expanded: int) -> dict:
+    """Shape a Dijkstra result; ``known`` is whether ``to_id`` is in the graph."""
     # Path reconstruction: append + reverse (O(n) vs insert(0) O(n²))
     path = []
-    cur: str | None = to_id
+    cur = to_id
     while cur and cur != from_id:
         path.append(cur)
         cur = prev.get(cur)
@@ -165,18 +175,41 @@ def optimize_route(graph: list[dict], from_id: str, to_id: str) -> dict:
         path.append(from_id)
     path.reverse()
 
+    cost = dist.get(to_id, float("inf") if known else 0)
     return {
         "path": path,
-        "cost": round(dist.get(to_id, 0), 2),
-        "optimized": len(path) > 0 and dist.get(to_id, float("inf")) != float("inf"),
+        "cost": round(cost, 2),
+        "optimized": len(path) > 0 and to_id in dist,
         "hops": len(path) - 1,
+        "expanded_nodes": expanded,
     }
 
 
-def score_partner_risk(partner: dict, alerts: list[dict], shipments: list[dict], violations: list[dict]) -> dict:
+def optimize_route(graph: list[dict], from_id: str, to_id: str, nodes: list[dict] | None = None,
+                   algorithm: str = "dijkstra") -> dict:
+    """Dijkstra shortest path with risk-weighted edges (heapq optimized).
+    ``algorithm`` "astar" (needs lat/lng ``nodes``) or "bidirectional" finds
+    the same cost with fewer expansions; see engines/routing.py."""
+    if not graph:
+        return {"path": [], "cost": 0, "optimized": False}
+    if algorithm != "dijkstra":
+        return routing.point_route(graph, from_id, to_id, nodes or [], algorithm)
+
+    adj: dict[str, list[tuple[str, float]]] = defaultdict(list)
+    all_nodes: set[str] = set()
+    for e in graph:
+        f, t = e.get("from_node_id", ""), e.get("to_node_id", "")
+        all_nodes.update((f, t))
+        adj[f].append((t, edge_cost(e)))
+
+    dist, prev, expanded = _dijkstra(adj.__getitem__, from_id, to_id)
+    return _route_result(dist, prev, from_id, to_id, to_id in all_nodes, expanded)
+
+
+def score_partner_risk(partner: Partner, alerts: list[Alert], shipments: list[Shipment], violations: list[Violation]) -> dict:
     """Composite multi-factor partner risk score."""
     score = 50
-    kyc = partner.get("kyc_status")
+    kyc = partner.kyc_status
     if kyc == "verified":
         score += 20
     elif kyc == "pending":
@@ -184,19 +217,20 @@ def score_partner_risk(partner: dict, alerts: list[dict], shipments: list[dict],
     ac = len(alerts or [])
     score -= min(30, ac * 5)
 
-    completed = [s for s in (shipments or []) if s.get("status") == "delivered"]
-    on_time = [s for s in completed if not s.get("actual_delivery") or not s.get("estimated_delivery") or s["actual_delivery"] <= s["estimated_delivery"]]
+    completed = [s for s in (shipments or []) if s.status == "delivered"]
+    on_time = [s for s in completed if not s.actual_delivery or not s.estimated_delivery or s.actual_delivery <= s.estimated_delivery]
     rel = len(on_time) / len(completed) if completed else 0.5
     score += round(rel * 15)
     score -= min(20, len(violations or []) * 10)
 
-    if partner.get("created_at"):
-        try:
-            created = datetime.fromisoformat(str(partner["created_at"]).replace("Z", "+00:00"))
-            months = (datetime.now(timezone.utc) - created).days / 30
-            score += min(10, int(months))
-        except Exception:
-            pass
+    if partner.created_at:
+        created = parse_iso(partner.created_at)
+        if created is not None:
+            try:
+                months = (datetime.now(timezone.utc) - created).days / 30
+                score += min(10, int(months))
+            except TypeError:  # naive vs aware
+                pass
 
     score = max(0, min(100, score))
     return {
@@ -207,35 +241,66 @@ def score_partner_risk(partner: dict, alerts: list[dict], shipments: list[dict],
     }
 
 
-def page_rank(nodes: list[dict], edges: list[dict], iterations: int = 20, damping: float = 0.85) -> dict[str, float]:
-    """PageRank-style graph analysis (optimized: swap refs instead of new dict per iter)."""
-    n = len(nodes)
-    if n == 0:
-        return {}
-    ids = [nd.get("id") for nd in nodes]
-    ranks = {nid: 1 / n for nid in ids}
-    outgoing: dict[str, list[str]] = {nid: [] for nid in ids}
-    incoming: dict[str, list[str]] = {nid: [] for nid in ids}
-    # Pre-compute outgoing counts for denominator
-    out_count: dict[str, int] = {nid: 0 for nid in ids}
-
+def edge_index(ids: list, edges: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """Map edge endpoints onto positions in ``ids``; edges touching an
+    unknown node are dropped. Returns (src, dst) int64 arrays."""
+    pos = {nid: i for i, nid in enumerate(ids)}
+    src, dst = [], []
     for e in edges:
-        f, t = e.get("from_node_id"), e.get("to_node_id")
-        if f in outgoing:
-            outgoing[f].append(t)
-            out_count[f] += 1
-        if t in incoming:
-            incoming[t].append(f)
-
-    new_ranks = {nid: 0.0 for nid in ids}
+        f, t = pos.get(e.get("from_node_id")), pos.get(e.get("to_node_id"))
+        if f is not None and t is not None:
+            src.append(f)
+            dst.append(t)
+    return np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64)
+
+
+def pagerank_vector(src: np.ndarray, dst: np.ndarray, n: int, damping: float = 0.85,
+                    max_iter: int = PAGERANK_MAX_ITER, tol: float = PAGERANK_TOL,
+                    start: np.ndarray | None = None) -> tuple[np.ndarray, int]:
+    """Power iteration on the edge list (src[k] → dst[k]) over ``n`` nodes.
+
+    Each step is one gather and one weighted bincount — a sparse
+    matrix–vector product without materializing the matrix. Rank held by
+    dangling nodes (no out-edges) is spread uniformly, so the vector stays
+    a distribution. Stops once the L1 change drops below ``tol``; ``start``
+    warm-starts from a previous vector. Returns (ranks, iterations run).
+    """
+    if n == 0:
+        return np.zeros(0), 0
+    out_deg = np.bincount(src, minlength=n).astype(np.float64)
+    dangling = out_deg == 0
+    inv_out = np.divide(1.0, out_deg, out=np.zeros(n), where=~dangling)
     base = (1 - damping) / n
 
-    for _ in range(iterations):
-        for nid in ids:
-            ir = sum(ranks[fid] / max(out_count[fid], 1) for fid in incoming[nid])
-            new_ranks[nid] = base + damping * ir
-        ranks, new_ranks = new_ranks, ranks  # Swap refs — zero allocation
-    return ranks
+    if start is None:
+        ranks = np.full(n, 1 / n)
+    else:
+        ranks = np.asarray(start, dtype=np.float64)
+        ranks = ranks / ranks.sum() if ranks.sum() > 0 else np.full(n, 1 / n)
+
+    it = 0
+    while it < max_iter:
+        it += 1
+        flow = np.bincount(dst, weights=(ranks * inv_out)[src], minlength=n)
+        new = damping * (flow + ranks[dangling].sum() / n) + base
+        delta = np.abs(new - ranks).sum()
+        ranks = new
+        if delta < tol:
+            break
+    return ranks, it
+
+
+def page_rank(nodes: list[dict], edges: list[dict], iterations: int = PAGERANK_MAX_ITER, damping: float = 0.85,
+              tol: float = PAGERANK_TOL) -> dict[str, float]:
+    """PageRank over the supply graph (vectorized power iteration, see
+    pagerank_vector). ``iterations`` caps the power iteration; it usually
+    stops earlier on ``tol``."""
+    if not nodes:
+        return {}
+    ids = list(dict.fromkeys(nd.get("id") for nd in nodes))
+    src, dst = edge_index(ids, edges)
+    ranks, _ = pagerank_vector(src, dst, len(ids), damping, iterations, tol)
+    return dict(zip(ids, ranks.tolist()))
 
 
 def detect_toxic_nodes(nodes: list[dict], edges: list[dict], alerts: list[dict]) -> list[dict]:
@@ -257,19 +322,23 @@ def detect_toxic_nodes(nodes: list[dict], edges: list[dict], alerts: list[dict])
             alert_map[k] += 1
 
     n = max(len(nodes) - 1, 1)
-    result = []
-    for nd in nodes:
-        nid = nd.get("id")
-        cent = (in_d[nid] + out_d[nid]) / n
-        ac = alert_map[nid]
-        tox = cent * 0.3 + (ac / 10) * 0.4 + (1 - nd.get("trust_score", 50) / 100) * 0.3
-        result.append({
-            "id": nid, "name": nd.get("name"), "type": nd.get("type"),
-            "pagerank": round(ranks.get(nid, 0), 4), "centrality": round(cent, 2),
-            "in_degree": in_d[nid], "out_degree": out_d[nid],
-            "alert_count": ac, "trust_score": nd.get("trust_score", 50),
-            "toxicity_score": round(tox, 2), "is_toxic": tox > 0.5,
-            "risk_level": "critical" if tox > 0.7 else ("high" if tox > 0.5 else ("medium" if tox > 0.3 else "low")),
-        })
+    result = [
+        _toxic_node(nd, ranks.get(nd.get("id"), 0), in_d[nd.get("id")], out_d[nd.get("id")], alert_map[nd.get("id")], n)
+        for nd in nodes
+    ]
     result.sort(key=lambda x: x["toxicity_score"], reverse=True)
     return result
+
+
+def _toxic_node(nd: dict, rank: float, in_deg: int, out_deg: int, alert_count: int, n: int) -> dict:
+    """Score one node; ``n`` is the centrality denominator (node count − 1)."""
+    cent = (in_deg + out_deg) / n
+    tox = cent * 0.3 + (alert_count / 10) * 0.4 + (1 - nd.get("trust_score", 50) / 100) * 0.3
+    return {
+        "id": nd.get("id"), "name": nd.get("name"), "type": nd.get("type"),
+        "pagerank": round(rank, 4), "centrality": round(cent, 2),
+        "in_degree": in_deg, "out_degree": out_deg,
+        "alert_count": alert_count, "trust_score": nd.get("trust_score", 50),
+        "toxicity_score": round(tox, 2), "is_toxic": tox > 0.5,
+        "risk_level": "critical" if tox > 0.7 else ("high" if tox > 0.5 else ("medium" if tox > 0.3 else "low")),
+    }
@@ -0,0 +1,93 @@
+"""
+Timestamp Parsing
+Shared ISO-8601 parsing for all engines.
+
+Payloads repeat the same timestamp strings many times (scans of one batch,
+shipments of one route), so the scalar parser memoizes on the raw string
+with a bounded LRU — repeated values cost one dict lookup instead of a
+str.replace plus a new datetime. Bulk columns go through NumPy's
+datetime64 parser in one call.
+
+Naive timestamps are read as UTC by the bulk parser, matching the
+services' containers, which run with TZ=UTC.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+CACHE_SIZE = int(os.getenv("TIMESTAMP_CACHE_SIZE", "65536"))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(text: str) -> datetime | None:
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def parse_iso(val) -> datetime | None:
+    """Parse an ISO string to a datetime; None when empty or invalid.
+    Returned datetimes are shared between callers — treat them as read-only."""
+    if not val:
+        return None
+    if isinstance(val, datetime):
+        return val
+    return _parse(str(val))
+
+
+def epoch_ms(val) -> float:
+    """Parse an ISO string to epoch ms; 0.0 when empty or invalid."""
+    dt = parse_iso(val)
+    return dt.timestamp() * 1000 if dt is not None else 0.0
+
+
+def _has_offset(s: str) -> bool:
+    return len(s) > 6 and s[-6] in "+-" and s[-3] == ":"
+
+
+def epoch_ms_array(values: list) -> np.ndarray:
+    """Vectorized parse of a list of ISO strings to an int64 epoch-ms array.
+
+    'Z' and naive YYYY-MM-DD... strings are parsed by NumPy in a single
+    call; everything else — explicit UTC offsets, numbers, digit-only
+    strings, or anything NumPy rejects — falls back to the memoized scalar
+    parser, so results always match epoch_ms. Empty or invalid values become 0.
+    """
+    n = len(values)
+    out = np.zeros(n, dtype=np.int64)
+    fast_idx: list[int] = []
+    fast_str: list[str] = []
+    slow_idx: list[int] = []
+    for i, v in enumerate(values):
+        if not v:
+            continue
+        # NumPy would also read numbers, digit strings and bare years or
+        # year-months ("1700000000", "2024-05") that fromisoformat rejects;
+        # only str shaped YYYY-MM-DD... takes the fast path
+        if type(v) is not str or len(v) < 10 or v[4] != "-" or v[7] != "-":
+            slow_idx.append(i)
+            continue
+        if v.endswith("Z"):
+            fast_idx.append(i)
+            fast_str.append(v[:-1])
+        elif _has_offset(v):
+            slow_idx.append(i)
+        else:
+            fast_idx.append(i)
+            fast_str.append(v)
+
+    if fast_idx:
+        try:
+            parsed = np.array(fast_str, dtype="datetime64[ms]")
+            out[fast_idx] = np.where(np.isnat(parsed), 0, parsed.astype(np.int64))
+        except ValueError:
+            slow_idx.extend(fast_idx)
+    for i in slow_idx:
+        out[i] = int(epoch_ms(values[i]))
+    return out
@@ -3,19 +3,51 @@ TrustChecker AI Analytics Service
 FastAPI microservice for batch analytics: Carbon/ESG, SCM AI, Demand Sensing.
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel, Field
-from typing import Any
+from typing import Any, Literal
 
 from prometheus_fastapi_instrumentator import Instrumentator
 
-from engines import carbon, scm_ai, demand_sensing
+from engines import carbon, scm_ai, demand_sensing, routing
+from engines.graph_store import GraphNotFound, GraphStore, VersionConflict
+from executor import EngineExecutor
+from cache import ResponseCache
+from responses import DirectRoute, NumpyJSONResponse
+from schemas import Alert, Event, InventoryItem, Partner, Product, Shipment, Violation
+
+# Graph algorithms and footprint loops are pure Python; demand sensing is a
+# single cheap CUSUM pass, not worth a process hop.
+engine_pool = EngineExecutor({
+    "carbon": ("process", 2),
+    "scm_ai": ("process", 2),
+    "demand_sensing": ("thread", 4),
+    # The graph store is in-process state, so it stays on threads
+    "graph_store": ("thread", 4),
+})
+
+
+# Opt-in per route: only deterministic engines go through the cache
+response_cache = ResponseCache("ai-analytics")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    engine_pool.shutdown()
+    await response_cache.close()
+
 
 app = FastAPI(
     title="TrustChecker AI Analytics",
     version="1.0.0",
     description="Batch supply chain analytics, carbon, and demand sensing engines",
+    lifespan=lifespan,
+    default_response_class=NumpyJSONResponse,
 )
+# Render engine output with orjson directly, without the jsonable_encoder pass
+app.router.route_class = DirectRoute
 
 Instrumentator().instrument(app).expose(app, endpoint="/metrics")
 
@@ -27,73 +59,91 @@ async def health():
         "service": "ai-analytics",
         "version": "1.0.0",
         "engines": ["carbon", "scm_ai", "demand_sensing"],
+        "executor": engine_pool.stats(),
+        "cache": response_cache.stats(),
+        "graph_store": graph_store.stats(),
     }
 
 
 # ─── Carbon / ESG ────────────────────────────────────────────
 class FootprintRequest(BaseModel):
-    product: dict[str, Any]
-    shipments: list[dict[str, Any]] = []
-    events: list[dict[str, Any]] = []
+    product: Product
+    shipments: list[Shipment] = []
+    events: list[Event] = []
 
 class AggregateRequest(BaseModel):
-    products: list[dict[str, Any]]
-    shipments: list[dict[str, Any]] = []
-    events: list[dict[str, Any]] = []
+    products: list[Product]
+    shipments: list[Shipment] = []
+    events: list[Event] = []
 
 class LeaderboardRequest(BaseModel):
-    partners: list[dict[str, Any]]
-    shipments: list[dict[str, Any]] = []
-    violations: list[dict[str, Any]] = []
+    partners: list[Partner]
+    shipments: list[Shipment] = []
+    violations: list[Violation] = []
 
 class GRIRequest(BaseModel):
     data: dict[str, Any]
 
 @app.post("/carbon/footprint")
 async def footprint(req: FootprintRequest):
-    return carbon.calculate_footprint(req.product, req.shipments, req.events)
+    return await engine_pool.run("carbon", carbon.calculate_footprint, req.product, req.shipments, req.events)
 
 @app.post("/carbon/aggregate")
 async def aggregate(req: AggregateRequest):
-    return carbon.aggregate_by_scope(req.products, req.shipments, req.events)
+    async def compute():
+        return await engine_pool.run("carbon", carbon.aggregate_by_scope, req.products, req.shipments, req.events)
+    return await response_cache.fetch("carbon_aggregate", req, carbon.ENGINE_VERSION, compute)
 
 @app.post("/carbon/leaderboard")
 async def leaderboard(req: LeaderboardRequest):
-    return carbon.partner_leaderboard(req.partners, req.shipments, req.violations)
+    return await engine_pool.run("carbon", carbon.partner_leaderboard, req.partners, req.shipments, req.violations)
 
 @app.post("/carbon/gri-report")
 async def gri_report(req: GRIRequest):
-    return carbon.generate_gri_report(req.data)
+    return await engine_pool.run("carbon", carbon.generate_gri_report, req.data)
 
 
 # ─── SCM AI ──────────────────────────────────────────────────
 class DelayRequest(BaseModel):
-    shipments: list[dict[str, Any]]
+    shipments: list[Shipment]
 
 class InventoryRequest(BaseModel):
-    history: list[dict[str, Any]]
+    history: list[InventoryItem]
     periods_ahead: int = 7
 
 class BottleneckRequest(BaseModel):
-    events: list[dict[str, Any]]
-    partners: list[dict[str, Any]] = []
+    events: list[Event]
+    partners: list[Partner] = []
 
 class RouteRequest(BaseModel):
     graph: list[dict[str, Any]]
     from_id: str
     to_id: str
+    # id/latitude/longitude per graph node; "astar" needs them for every node
+    nodes: list[dict[str, Any]] = []
+    algorithm: Literal["dijkstra", "astar", "bidirectional"] = "dijkstra"
+
+class RoutePair(BaseModel):
+    from_id: str
+    to_id: str
+
+class RoutesRequest(BaseModel):
+    graph: list[dict[str, Any]]
+    pairs: list[RoutePair] = Field(max_length=routing.MAX_PAIRS)
+    k: int = Field(1, ge=1, le=routing.MAX_K)  # >1 adds up to k-1 alternatives per pair
 
 class PartnerRiskRequest(BaseModel):
-    partner: dict[str, Any]
-    alerts: list[dict[str, Any]] = []
-    shipments: list[dict[str, Any]] = []
-    violations: list[dict[str, Any]] = []
+    partner: Partner
+    alerts: list[Alert] = []
+    shipments: list[Shipment] = []
+    violations: list[Violation] = []
 
 class PageRankRequest(BaseModel):
     nodes: list[dict[str, Any]]
     edges: list[dict[str, Any]]
-    iterations: int = 20
+    iterations: int = scm_ai.PAGERANK_MAX_ITER
     damping: float = 0.85
+    tol: float = scm_ai.PAGERANK_TOL
 
 class ToxicNodesRequest(BaseModel):
     nodes: list[dict[str, Any]]
@@ -102,31 +152,101 @@ class ToxicNodesRequest(BaseModel):
 
 @app.post("/scm/predict-delay")
 async def predict_delay(req: DelayRequest):
-    return scm_ai.predict_delay(req.shipments)
+    return await engine_pool.run("scm_ai", scm_ai.predict_delay, req.shipments)
 
 @app.post("/scm/forecast-inventory")
 async def forecast_inventory(req: InventoryRequest):
-    return scm_ai.forecast_inventory(req.history, req.periods_ahead)
+    return await engine_pool.run("scm_ai", scm_ai.forecast_inventory, req.history, req.periods_ahead)
 
 @app.post("/scm/bottlenecks")
 async def bottlenecks(req: BottleneckRequest):
-    return scm_ai.detect_bottlenecks(req.events, req.partners)
+    return await engine_pool.run("scm_ai", scm_ai.detect_bottlenecks, req.events, req.partners)
 
 @app.post("/scm/optimize-route")
 async def optimize_route(req: RouteRequest):
-    return scm_ai.optimize_route(req.graph, req.from_id, req.to_id)
+    async def compute():
+        return await engine_pool.run("scm_ai", scm_ai.optimize_route, req.graph, req.from_id, req.to_id, req.nodes, req.algorithm)
+    return await response_cache.fetch("optimize_route", req, scm_ai.ENGINE_VERSION, compute)
+
+@app.post("/scm/optimize-routes")
+async def optimize_routes(req: RoutesRequest):
+    pairs = [(p.from_id, p.to_id) for p in req.pairs]
+    async def compute():
+        return await engine_pool.run("scm_ai", routing.optimize_routes, req.graph, pairs, req.k)
+    return await response_cache.fetch("optimize_routes", req, routing.ENGINE_VERSION, compute)
 
 @app.post("/scm/partner-risk")
 async def partner_risk(req: PartnerRiskRequest):
-    return scm_ai.score_partner_risk(req.partner, req.alerts, req.shipments, req.violations)
+    return await engine_pool.run("scm_ai", scm_ai.score_partner_risk, req.partner, req.alerts, req.shipments, req.violations)
 
 @app.post("/scm/pagerank")
 async def pagerank(req: PageRankRequest):
-    return scm_ai.page_rank(req.nodes, req.edges, req.iterations, req.damping)
+    async def compute():
+        return await engine_pool.run("scm_ai", scm_ai.page_rank, req.nodes, req.edges, req.iterations, req.damping, req.tol)
+    return await response_cache.fetch("pagerank", req, scm_ai.ENGINE_VERSION, compute)
 
 @app.post("/scm/toxic-nodes")
 async def toxic_nodes(req: ToxicNodesRequest):
-    return scm_ai.detect_toxic_nodes(req.nodes, req.edges, req.alerts)
+    return await engine_pool.run("scm_ai", scm_ai.detect_toxic_nodes, req.nodes, req.edges, req.alerts)
+
+
+# ─── Supply Graph Store ──────────────────────────────────────
+# Named, versioned graphs per tenant, updated by deltas (engines/graph_store.py)
+graph_store = GraphStore()
+
+class GraphPutRequest(BaseModel):
+    nodes: list[dict[str, Any]] = []
+    edges: list[dict[str, Any]] = []
+    alerts: list[dict[str, Any]] = []
+    base_version: int | None = None
+
+class GraphDeltaRequest(BaseModel):
+    add_nodes: list[dict[str, Any]] = []
+    remove_nodes: list[Any] = []
+    add_edges: list[dict[str, Any]] = []
+    remove_edges: list[dict[str, Any]] = []
+    add_alerts: list[dict[str, Any]] = []
+    remove_alerts: list[dict[str, Any]] = []
+    base_version: int | None = None
+
+async def _graph_call(fn, *args, **kwargs):
+    try:
+        return await engine_pool.run("graph_store", fn, *args, **kwargs)
+    except GraphNotFound:
+        raise HTTPException(404, detail={"error": "graph not found"})
+    except VersionConflict as e:
+        raise HTTPException(409, detail={"error": "version mismatch", "current_version": e.current})
+
+@app.put("/scm/graphs/{tenant}/{name}")
+async def graph_put(tenant: str, name: str, req: GraphPutRequest):
+    return await _graph_call(graph_store.put, tenant, name, req.nodes, req.edges, req.alerts, req.base_version)
+
+@app.patch("/scm/graphs/{tenant}/{name}")
+async def graph_update(tenant: str, name: str, req: GraphDeltaRequest):
+    delta = req.model_dump(exclude={"base_version"})
+    return await _graph_call(graph_store.update, tenant, name, delta, req.base_version)
+
+@app.get("/scm/graphs/{tenant}/{name}")
+async def graph_info(tenant: str, name: str, version: int | None = None):
+    return await _graph_call(graph_store.info, tenant, name, version)
+
+@app.delete("/scm/graphs/{tenant}/{name}", status_code=204)
+async def graph_delete(tenant: str, name: str):
+    await _graph_call(graph_store.delete, tenant, name)
+    return Response(status_code=204)
+
+@app.get("/scm/graphs/{tenant}/{name}/pagerank")
+async def graph_pagerank(tenant: str, name: str, version: int | None = None, damping: float = 0.85,
+                         tol: float = scm_ai.PAGERANK_TOL, iterations: int = scm_ai.PAGERANK_MAX_ITER):
+    return await _graph_call(graph_store.page_rank, tenant, name, version, damping, tol, iterations)
+
+@app.get("/scm/graphs/{tenant}/{name}/toxic-nodes")
+async def graph_toxic_nodes(tenant: str, name: str, version: int | None = None):
+    return await _graph_call(graph_store.toxic_nodes, tenant, name, version)
+
+@app.get("/scm/graphs/{tenant}/{name}/route")
+async def graph_route(tenant: str, name: str, from_id: str, to_id: str, version: int | None = None):
+    return await _graph_call(graph_store.optimize_route, tenant, name, from_id, to_id, version)
 
 
 # ─── Demand Sensing ──────────────────────────────────────────
@@ -136,4 +256,4 @@ class DemandSensingRequest(BaseModel):
 
 @app.post("/demand/detect")
 async def demand_detect(req: DemandSensingRequest):
-    return demand_sensing.detect(req.sales_history, req.threshold)
+    return await engine_pool.run("demand_sensing", demand_sensing.detect, req.sales_history, req.threshold)
@@ -0,0 +1,219 @@
+"""
+GraphStore in memory and over a shared fakeredis op log: writes, version
+checks, 404s, replay across workers, compaction, LRU recency, and parity
+with the stateless scm_ai endpoints on the same edge list.
+
+Needs pytest and fakeredis with Lua support (fakeredis[lua]).
+
+Run from services/ai-analytics:
+    python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import redis  # noqa: E402
+from engines import scm_ai  # noqa: E402
+from engines.graph_store import GraphNotFound, GraphStore, VersionConflict  # noqa: E402
+
+NODES = [{"id": f"N{i}", "trust_score": 20 + 7 * i % 80} for i in range(12)]
+
+
+def edge(f, t, weight=1.0, **extra) -> dict:
+    return {"from_node_id": f, "to_node_id": t, "weight": weight, **extra}
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis, "from_url", lambda url, **kw: fakeredis.FakeRedis(server=server, **kw))
+    monkeypatch.delenv("GRAPH_STORE_REDIS_URL", raising=False)
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    return server
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_store(request, server):
+    """Factory for stores; in redis mode every store is another worker on the same log."""
+    def make(**kw) -> GraphStore:
+        return GraphStore(redis_url="redis://test" if request.param == "redis" else None, **kw)
+    return make
+
+
+def assert_matches_stateless(store: GraphStore, nodes: list[dict], edges: list[dict], alerts: list[dict]) -> None:
+    ranks = store.page_rank("t", "g")["ranks"]
+    for nid, rank in scm_ai.page_rank(nodes, edges).items():
+        assert ranks[nid] == pytest.approx(rank, abs=1e-5)
+    got = {t["id"]: t for t in store.toxic_nodes("t", "g")["nodes"]}
+    for t in scm_ai.detect_toxic_nodes(nodes, edges, alerts):
+        g = got[t["id"]]
+        assert (g["in_degree"], g["out_degree"], g["alert_count"], g["centrality"]) == \
+               (t["in_degree"], t["out_degree"], t["alert_count"], t["centrality"]), t["id"]
+    for a in nodes[:4]:
+        for b in nodes:
+            assert store.optimize_route("t", "g", a["id"], b["id"])["cost"] == \
+                   scm_ai.optimize_route(edges, a["id"], b["id"])["cost"], (a["id"], b["id"])
+
+
+def test_put_update_delete(make_store):
+    store = make_store()
+    out = store.put("t", "g", NODES[:3], [edge("N0", "N1"), edge("N1", "N2"), edge("N2", "N9")], [])
+    assert (out["version"], out["nodes"], out["edges"], out["skipped_edges"]) == (1, 3, 2, 1)
+
+    out = store.update("t", "g", {"add_nodes": [NODES[3]], "add_edges": [edge("N2", "N3")],
+                                  "remove_edges": [edge("N0", "N1")], "add_alerts": [{"partner_id": "N3"}]})
+    assert (out["version"], out["nodes"], out["edges"], out["alerts"]) == (2, 4, 2, 1)
+    assert store.optimize_route("t", "g", "N1", "N3")["path"] == ["N1", "N2", "N3"]
+    assert store.optimize_route("t", "g", "N0", "N3")["optimized"] is False
+
+    # A put replaces the graph and keeps counting versions
+    assert store.put("t", "g", NODES[:2], [], [])["version"] == 3
+    assert store.info("t", "g") == {"version": 3, "nodes": 2, "edges": 0, "alerts": 0}
+
+    store.delete("t", "g")
+    with pytest.raises(GraphNotFound):
+        store.info("t", "g")
+    with pytest.raises(GraphNotFound):
+        store.delete("t", "g")
+    with pytest.raises(GraphNotFound):
+        store.update("t", "g", {"add_nodes": [NODES[0]]})
+
+
+def test_tenants_are_separate(make_store):
+    store = make_store()
+    store.put("a", "g", NODES[:2], [], [])
+    with pytest.raises(GraphNotFound):
+        store.info("b", "g")
+
+
+def test_version_conflicts(make_store):
+    store = make_store()
+    with pytest.raises(VersionConflict) as e:
+        store.put("t", "g", NODES, [], [], base_version=1)
+    assert e.value.current == 0
+    store.put("t", "g", NODES, [], [], base_version=0)
+    store.update("t", "g", {"add_edges": [edge("N0", "N1")]}, base_version=1)
+
+    with pytest.raises(VersionConflict) as e:
+        store.update("t", "g", {"add_edges": [edge("N1", "N2")]}, base_version=1)
+    assert e.value.current == 2
+    assert store.info("t", "g")["edges"] == 1  # the rejected delta left no trace
+
+    with pytest.raises(VersionConflict):
+        store.page_rank("t", "g", version=1)
+    assert store.info("t", "g", version=2)["version"] == 2
+
+
+def test_remove_edges_with_parallel_copies(make_store):
+    store = make_store()
+    edges = [edge("N0", "N1", 1.0), edge("N0", "N1", 3.0), edge("N0", "N1", 2.0), edge("N1", "N2", 1.0)]
+    store.put("t", "g", NODES[:3], edges, [])
+    assert store.info("t", "g")["edges"] == 4
+    assert store.optimize_route("t", "g", "N0", "N1")["cost"] == 1.0
+    assert_matches_stateless(store, NODES[:3], edges, [])
+
+    # Drops the copy with the same cost: the cheapest one here
+    store.update("t", "g", {"remove_edges": [edge("N0", "N1", 1.0)]})
+    edges.pop(0)
+    assert store.optimize_route("t", "g", "N0", "N1")["cost"] == 2.0
+    assert_matches_stateless(store, NODES[:3], edges, [])
+
+    # No copy at that cost: the latest added goes
+    store.update("t", "g", {"remove_edges": [edge("N0", "N1", 9.0)]})
+    edges.pop(1)
+    assert store.optimize_route("t", "g", "N0", "N1")["cost"] == 3.0
+    assert_matches_stateless(store, NODES[:3], edges, [])
+
+    store.update("t", "g", {"remove_edges": [edge("N0", "N1", 3.0)]})
+    assert store.optimize_route("t", "g", "N0", "N1")["optimized"] is False
+    assert store.info("t", "g")["edges"] == 1
+
+    # Removing a node takes every parallel copy with it
+    store.update("t", "g", {"add_edges": [edge("N0", "N1"), edge("N0", "N1"), edge("N1", "N0")]})
+    store.update("t", "g", {"remove_nodes": ["N0"]})
+    assert store.info("t", "g")["edges"] == 1
+
+
+def test_random_deltas_match_stateless(make_store):
+    rnd = random.Random(7)
+    ids = [nd["id"] for nd in NODES]
+
+    def rand_edge():
+        return edge(rnd.choice(ids), rnd.choice(ids), float(rnd.randint(1, 3)), risk_score=rnd.choice([0, 0.5]))
+
+    edges = [rand_edge() for _ in range(40)]
+    edges += [dict(e, weight=e["weight"] + 1) for e in edges[:8]]
+    alerts = [{"partner_id": rnd.choice(ids)} for _ in range(6)]
+    writer, reader = make_store(), make_store()
+    writer.put("t", "g", NODES, edges, alerts)
+    for _ in range(15):
+        removed = [edges.pop(rnd.randrange(len(edges))) for _ in range(3)]
+        added = [rand_edge() for _ in range(3)]
+        edges += added
+        gone = [alerts.pop()] if alerts else []
+        writer.update("t", "g", {"remove_edges": removed, "add_edges": added, "remove_alerts": gone})
+        assert_matches_stateless(writer, NODES, edges, alerts)
+    if reader._redis is not None:
+        assert_matches_stateless(reader, NODES, edges, alerts)
+
+
+def test_workers_share_the_log(server):
+    a, b = GraphStore(redis_url="redis://test"), GraphStore(redis_url="redis://test")
+    a.put("t", "g", NODES[:3], [edge("N0", "N1")], [])
+    assert b.info("t", "g")["edges"] == 1
+
+    b.update("t", "g", {"add_edges": [edge("N1", "N2")]}, base_version=1)
+    assert a.optimize_route("t", "g", "N0", "N2")["path"] == ["N0", "N1", "N2"]
+    with pytest.raises(VersionConflict):
+        a.update("t", "g", {"add_edges": [edge("N2", "N0")]}, base_version=1)
+
+    # A put from one worker replaces the other's copy
+    b.put("t", "g", NODES[:1], [], [])
+    assert a.info("t", "g") == {"version": 3, "nodes": 1, "edges": 0, "alerts": 0}
+
+    a.delete("t", "g")
+    with pytest.raises(GraphNotFound):
+        b.toxic_nodes("t", "g")
+    assert b.stats()["graphs"] == 0
+
+
+def test_cold_worker_replays_compacted_log(server, monkeypatch):
+    monkeypatch.setenv("GRAPH_STORE_COMPACT_OPS", "4")
+    r = fakeredis.FakeRedis(server=server)
+    writer = GraphStore(redis_url="redis://test")
+    lagging = GraphStore(redis_url="redis://test")
+    edges = [edge("N0", "N1", 2.0), edge("N0", "N1", 5.0), edge("N1", "N2")]
+    alerts = [{"partner_id": "N1"}, {"product_id": "N1"}, {"partner_id": "N2"}]
+    writer.put("t", "g", NODES, edges, alerts)
+    assert lagging.info("t", "g")["version"] == 1
+
+    for i in range(2, 12):
+        e = edge(f"N{i}", f"N{i - 1}", float(i))
+        writer.update("t", "g", {"add_edges": [e]})
+        edges.append(e)
+    writer.update("t", "g", {"remove_edges": [edge("N0", "N1", 2.0)], "remove_alerts": [alerts.pop()]})
+    edges.pop(0)
+
+    # Compacted: the snapshot covers the put and most deltas, the log the rest
+    assert r.exists("graph:t:g:snap")
+    assert int(r.hget("graph:t:g:meta", "base")) > 1
+    assert r.llen("graph:t:g:log") < 4
+    assert r.ttl("graph:t:g:meta") > 0 and r.ttl("graph:t:g:snap") > 0
+
+    cold = GraphStore(redis_url="redis://test")
+    for store in (cold, lagging, writer):  # rebuilt from snapshot, resynced past the trim, live copy
+        assert store.info("t", "g") == {"version": 12, "nodes": len(NODES), "edges": len(edges), "alerts": 2}
+        assert_matches_stateless(store, NODES, edges, alerts)
+    assert cold.optimize_route("t", "g", "N0", "N1")["cost"] == 5.0  # the surviving parallel copy
+
+
+def test_lru_keeps_recently_read_graphs(make_store):
+    store = make_store(max_graphs=2)
+    store.put("t", "a", NODES[:1], [], [])
+    store.put("t", "b", NODES[:1], [], [])
+    store.info("t", "a")
+    store.put("t", "c", NODES[:1], [], [])
+    assert list(store._graphs) == [("t", "a"), ("t", "c")]
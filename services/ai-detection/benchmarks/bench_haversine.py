@@ -0,0 +1,72 @@
+"""
+Haversine Micro-Benchmark
+The previous per-pair math-module haversine loop vs the vectorized geo
+kernels at 1e3–1e7 pairs.
+
+Pairs are consecutive scans of one product: the second point is a small
+random hop from the first, so most pairs sit well under
+GEO_DISTANCE_THRESHOLD — the case the equirectangular pre-check targets.
+
+Usage (from services/ai-detection):
+    python benchmarks/bench_haversine.py [max_exponent]
+"""
+
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines.fraud import GEO_DISTANCE_THRESHOLD  # noqa: E402
+from engines.geo import haversine_km, haversine_km_prefiltered  # noqa: E402
+
+SCALAR_LIMIT = 1_000_000  # the pure-Python loop gets slow past this
+
+
+def _scalar_haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    d_lat = math.radians(lat2 - lat1)
+    d_lon = math.radians(lon2 - lon1)
+    a = math.sin(d_lat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lon / 2) ** 2
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(max_exp: int = 7) -> None:
+    rng = np.random.default_rng(42)
+    print(f"{'pairs':>10} {'scalar':>10} {'numpy':>10} {'prefilter':>10} {'speedup':>9} {'pf_speedup':>10}")
+    for exp in range(3, max_exp + 1):
+        n = 10 ** exp
+        lat1 = rng.uniform(-60, 60, n)
+        lon1 = rng.uniform(-180, 180, n)
+        lat2 = lat1 + rng.normal(0, 2, n)
+        lon2 = lon1 + rng.normal(0, 2, n)
+
+        if n <= SCALAR_LIMIT:
+            pairs = list(zip(lat1.tolist(), lon1.tolist(), lat2.tolist(), lon2.tolist()))
+            t_scalar = _best_of(lambda: [_scalar_haversine(*p) for p in pairs], repeat=1)
+        else:
+            t_scalar = float("nan")
+        t_np = _best_of(lambda: haversine_km(lat1, lon1, lat2, lon2))
+        t_pf = _best_of(lambda: haversine_km_prefiltered(lat1, lon1, lat2, lon2, GEO_DISTANCE_THRESHOLD))
+
+        if t_scalar != t_scalar:  # NaN: scalar loop skipped
+            scalar_col, speedups = f"{'-':>10}", f"{'-':>9} {'-':>10}"
+        else:
+            scalar_col = f"{t_scalar * 1000:>8.1f}ms"
+            speedups = f"{t_scalar / t_np:>8.1f}x {t_scalar / t_pf:>9.1f}x"
+        print(f"{n:>10} {scalar_col} {t_np * 1000:>8.1f}ms {t_pf * 1000:>8.1f}ms {speedups}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
@@ -0,0 +1,114 @@
+"""
+Response Serialization Benchmark
+FastAPI's default rendering (jsonable_encoder walk + json.dumps) vs
+responses.render (orjson, NumPy-aware) on representative engine output
+for each endpoint. Engine time is excluded: each result is computed
+once, then only its serialization is timed.
+
+Usage (from services/ai-detection):
+    python benchmarks/bench_serialization.py [scale]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines import anomaly, fraud, risk_radar  # noqa: E402
+from responses import NumpyJSONResponse  # noqa: E402
+from schemas import FullScanData, RadarData, Scan, records  # noqa: E402
+
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _iso(rng, hours: float) -> str:
+    return (BASE + timedelta(seconds=float(rng.uniform(0, hours * 3600)))).isoformat()
+
+
+def _scans(rng, n: int, products: int) -> list[Scan]:
+    return records(Scan, [{
+        "product_id": f"P{rng.integers(products)}",
+        "scanned_at": _iso(rng, 2),
+        "latitude": float(rng.uniform(-60, 60)),
+        "longitude": float(rng.uniform(-180, 180)),
+    } for _ in range(n)])
+
+
+def _fraud_items(rng, n: int) -> list[dict]:
+    return [{
+        "scan_event": {"latitude": float(rng.uniform(-60, 60)), "longitude": float(rng.uniform(-180, 180)),
+                       "hour": int(rng.integers(24))},
+        "context": {
+            "hourly_scan_count": int(rng.integers(30)), "burst_scan_count": int(rng.integers(8)),
+            "today_scan_count": int(rng.integers(60)), "device_unique_products": int(rng.integers(40)),
+            "daily_scan_counts": rng.integers(0, 40, 14).tolist(),
+            "recent_scan": {"latitude": float(rng.uniform(-60, 60)), "longitude": float(rng.uniform(-180, 180))},
+            "time_diff_hours": float(rng.uniform(0.1, 12)),
+            "qr_status": "revoked" if rng.random() < 0.02 else "active",
+        },
+    } for _ in range(n)]
+
+
+def _radar_data(rng, n: int) -> RadarData:
+    countries = ["VN", "CN", "US", "DE", "IN", "BR", "NG", "RU"]
+    partners = [{"id": f"PT{i}", "country": countries[i % len(countries)], "trust_score": int(rng.integers(20, 100)),
+                 "kyc_status": "verified" if rng.random() < 0.7 else "pending", "status": "active"} for i in range(n)]
+    shipments = [{"id": f"S{i}", "carrier": f"C{rng.integers(20)}", "status": "delivered" if rng.random() < 0.8 else "delayed",
+                  "partner_id": f"PT{rng.integers(n)}", "created_at": _iso(rng, 24 * 30),
+                  "estimated_delivery": _iso(rng, 24 * 40)} for i in range(n * 10)]
+    leaks = [{"listing_price": float(rng.uniform(5, 50)), "authorized_price": 40.0, "region_detected": countries[i % 8],
+              "partner_id": f"PT{rng.integers(n)}"} for i in range(n)]
+    violations = [{"severity": "high", "penalty_amount": float(rng.uniform(100, 5000)), "partner_id": f"PT{rng.integers(n)}"}
+                  for _ in range(n // 2)]
+    return RadarData.model_validate({"partners": partners, "shipments": shipments, "leaks": leaks, "violations": violations,
+            "certifications": [{"status": "active", "expiry_date": _iso(rng, 24 * 400)} for _ in range(n)],
+            "alerts": [{"alert_type": "api_abuse", "severity": "medium"} for _ in range(n)],
+            "inventory": [{"quantity": int(rng.integers(100)), "min_stock": 20} for _ in range(n)]})
+
+
+def cases(scale: float):
+    rng = np.random.default_rng(42)
+    n = lambda k: max(1, int(k * scale))  # noqa: E731
+    scans = _scans(rng, n(20000), n(300))
+    full_scan = FullScanData.model_validate({
+        "scans": scans,
+        "fraudAlerts": [{"product_id": f"P{rng.integers(n(300))}", "created_at": _iso(rng, 24 * 7)} for _ in range(n(5000))],
+        "trustScores": [{"product_id": f"P{rng.integers(n(300))}", "score": float(rng.uniform(0, 100)),
+                         "calculated_at": _iso(rng, 24 * 7)} for _ in range(n(5000))],
+    })
+    radar = _radar_data(rng, n(500))
+    yield "/fraud/analyze-batch", lambda: fraud.analyze_batch(_fraud_items(rng, n(2000)))
+    yield "/anomaly/full-scan", lambda: anomaly.run_full_scan(full_scan)
+    yield "/anomaly/scan-velocity", lambda: anomaly.detect_scan_velocity(scans, 60)
+    yield "/anomaly/geo-dispersion", lambda: anomaly.detect_geo_dispersion(scans, 1)
+    yield "/risk-radar/compute", lambda: risk_radar.compute_radar(radar)
+    yield "/risk-radar/heatmap", lambda: risk_radar.generate_heatmap(radar.partners, radar.shipments, radar.leaks)
+
+
+def main(scale: float = 1.0) -> None:
+    print(f"{'endpoint':<26} {'bytes':>10} {'default':>10} {'orjson':>10} {'speedup':>8}")
+    for endpoint, compute in cases(scale):
+        result = compute()
+        size = len(NumpyJSONResponse(result).body)
+        t_default = _best_of(lambda: JSONResponse(jsonable_encoder(result)).body)
+        t_orjson = _best_of(lambda: NumpyJSONResponse(result).body)
+        print(f"{endpoint:<26} {size:>10} {t_default * 1000:>8.2f}ms {t_orjson * 1000:>8.2f}ms {t_default / t_orjson:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
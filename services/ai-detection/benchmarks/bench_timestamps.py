@@ -0,0 +1,70 @@
+"""
+Timestamp Parsing Benchmark
+Scalar epoch_ms per value vs the vectorized epoch_ms_array on scan-style
+timestamp columns (mostly 'Z' ISO strings, some with offsets, repeats).
+
+Before timing, checks that both paths agree on the awkward inputs the
+Node payloads can carry: epoch numbers, digit-only strings, bare years and
+year-months (NumPy would read these as years), offsets, blanks, garbage.
+
+Usage (from services/ai-detection):
+    python benchmarks/bench_timestamps.py [max_exponent]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines.timestamps import _parse, epoch_ms, epoch_ms_array  # noqa: E402
+
+EDGE_CASES = [
+    1700000000, 1700000000000, 1.7e12, "1700000000", "1700000000000", "20231114",
+    "2023", "2023-11", "2023-11-14", "2023-11-14T10:00:00Z", "2023-11-14T10:00:00.123Z",
+    "2023-11-14T10:00:00+07:00", "2023-11-14 10:00:00", "", None, 0, "garbage",
+    datetime(2023, 1, 1, tzinfo=timezone.utc),
+]
+
+
+def _check() -> None:
+    got = epoch_ms_array(EDGE_CASES).tolist()
+    want = [int(epoch_ms(v)) for v in EDGE_CASES]
+    bad = [(v, g, w) for v, g, w in zip(EDGE_CASES, got, want) if g != w]
+    assert not bad, f"epoch_ms_array disagrees with epoch_ms: {bad}"
+
+
+def _best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(max_exp: int = 6) -> None:
+    _check()
+    rng = np.random.default_rng(42)
+    print(f"{'values':>9} {'scalar':>10} {'array':>10} {'speedup':>8}")
+    for exp in range(3, max_exp + 1):
+        n = 10 ** exp
+        secs = 1_700_000_000 + rng.integers(0, 30 * 86400, n)
+        values = [datetime.fromtimestamp(int(s), timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") for s in secs]
+        for i in range(0, n, 10):
+            values[i] = values[i][:-1] + "+00:00"
+
+        def scalar():
+            _parse.cache_clear()
+            return [epoch_ms(v) for v in values]
+
+        t_scalar = _best_of(scalar, repeat=1)
+        t_array = _best_of(lambda: epoch_ms_array(values))
+        print(f"{n:>9} {t_scalar * 1000:>8.1f}ms {t_array * 1000:>8.1f}ms {t_scalar / t_array:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 6)
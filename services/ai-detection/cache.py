@@ -0,0 +1,173 @@
+"""
+Response Cache
+Content-addressed cache for deterministic endpoints.
+
+The key is sha256 over the route, the engine version and the validated
+request serialized canonically (sorted keys, compact separators), so two
+byte-different payloads that validate to the same request share an entry,
+and bumping an engine's ENGINE_VERSION invalidates everything it served.
+Values are the encoded JSON response body.
+
+Tiers:
+  1. in-process LRU bounded by entry count and total bytes
+  2. optional Redis tier shared by all workers, with a TTL
+Concurrent identical misses are coalesced onto one computation.
+
+Environment:
+  CACHE_MAX_ENTRIES   default 2048
+  CACHE_MAX_BYTES     default 64 MiB
+  CACHE_REDIS_URL     enables the Redis tier (unset = memory only)
+  CACHE_TTL_SECONDS   Redis TTL, default 300
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from fastapi import Response
+from prometheus_client import Counter, Gauge
+from pydantic import BaseModel
+
+from responses import render
+
+log = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Response cache lookups",
+    ["route", "result"],  # result: hit_memory | hit_redis | coalesced | miss
+)
+CACHE_EVICTIONS = Counter("response_cache_evictions_total", "Entries evicted from the in-process tier")
+CACHE_BYTES = Gauge("response_cache_bytes", "Bytes held by the in-process tier")
+
+
+def _encode(result: Any) -> bytes:
+    # Same bytes the uncached route would send
+    return render(result)
+
+
+class ResponseCache:
+    """Two-tier (LRU + optional Redis) cache of encoded JSON responses."""
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+        self.max_entries = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+        self.max_bytes = int(os.getenv("CACHE_MAX_BYTES", str(64 << 20)))
+        self.ttl = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+        self._lru: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._redis = None
+        url = os.getenv("CACHE_REDIS_URL")
+        if url:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(url)
+
+    def key(self, route: str, req: BaseModel, version: str) -> str:
+        canonical = json.dumps(req.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(f"{route}\0{version}\0{canonical}".encode()).hexdigest()
+        return f"cache:{self.namespace}:{digest}"
+
+    # ─── In-process tier ─────────────────────────────────────
+    def _get_local(self, key: str) -> bytes | None:
+        body = self._lru.get(key)
+        if body is not None:
+            self._lru.move_to_end(key)
+        return body
+
+    def _put_local(self, key: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        old = self._lru.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._lru[key] = body
+        self._bytes += len(body)
+        while len(self._lru) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._lru.popitem(last=False)
+            self._bytes -= len(evicted)
+            CACHE_EVICTIONS.inc()
+        CACHE_BYTES.set(self._bytes)
+
+    # ─── Redis tier ──────────────────────────────────────────
+    async def _get_remote(self, key: str) -> bytes | None:
+        if self._redis is None:
+            return None
+        try:
+            return await self._redis.get(key)
+        except Exception as e:  # cache must never fail the request
+            log.warning("response cache: redis get failed: %s", e)
+            return None
+
+    async def _put_remote(self, key: str, body: bytes) -> None:
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(key, body, ex=self.ttl)
+        except Exception as e:
+            log.warning("response cache: redis set failed: %s", e)
+
+    # ─── Lookup ──────────────────────────────────────────────
+    async def fetch(
+        self, route: str, req: BaseModel, version: str,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Response:
+        """Serve ``req`` from cache or run ``compute`` and store its result."""
+        key = self.key(route, req, version)
+
+        body = self._get_local(key)
+        if body is not None:
+            CACHE_REQUESTS.labels(route, "hit_memory").inc()
+            return self._response(body, "hit")
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            CACHE_REQUESTS.labels(route, "coalesced").inc()
+            return self._response(await asyncio.shield(pending), "hit")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            body = await self._get_remote(key)
+            if body is not None:
+                CACHE_REQUESTS.labels(route, "hit_redis").inc()
+                state = "hit"
+            else:
+                CACHE_REQUESTS.labels(route, "miss").inc()
+                body = _encode(await compute())
+                await self._put_remote(key, body)
+                state = "miss"
+            self._put_local(key, body)
+            future.set_result(body)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # waiters re-raise it; don't warn if there are none
+            raise
+        finally:
+            del self._inflight[key]
+        return self._response(body, state)
+
+    @staticmethod
+    def _response(body: bytes, state: str) -> Response:
+        return Response(content=body, media_type="application/json", headers={"X-Cache": state})
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._lru),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "redis": self._redis is not None,
+        }
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
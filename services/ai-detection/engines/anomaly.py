@@ -7,9 +7,13 @@ Ported from server/engines/anomaly.js
 
 from __future__ import annotations
 
-from bisect import bisect_right
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from engines.timestamps import epoch_ms_array
+from schemas import Alert, FullScanData, Scan, TrustScore
 
 
 THRESHOLDS = {
@@ -21,182 +25,275 @@ THRESHOLDS = {
 }
 
 
-def _parse_ts(val) -> float:
-    """Parse an ISO string to epoch ms."""
-    if not val:
-        return 0.0
-    try:
-        return datetime.fromisoformat(str(val).replace("Z", "+00:00")).timestamp() * 1000
-    except Exception:
-        return 0.0
-
-
-def detect_scan_velocity(scan_events: list[dict], window_minutes: int = 60) -> list[dict]:
-    """Detect scan velocity anomalies — too many scans in a short window.
-    Optimized: O(n log n) using bisect instead of O(n²) brute force."""
-    anomalies = []
-    groups: dict[str, list[float]] = {}
-
-    for s in scan_events:
-        key = s.get("product_id", "unknown")
-        groups.setdefault(key, []).append(_parse_ts(s.get("scanned_at") or s.get("created_at")))
-
-    window_ms = window_minutes * 60 * 1000
+class ScanColumns(NamedTuple):
+    """Columnar view of a scan-event payload, built once per request.
+
+    ``codes`` indexes into ``product_ids`` in first-appearance order so that
+    anomalies come out in the same order the dict API produced them.
+    """
+    ts_ms: np.ndarray        # int64 epoch ms (0 when unparseable)
+    codes: np.ndarray        # int64 product code per scan
+    product_ids: list        # code → original product_id
+    lat: np.ndarray          # float64, NaN when missing
+    lng: np.ndarray          # float64, NaN when missing
+
+
+def scan_columns(scan_events: list[Scan]) -> ScanColumns:
+    """Convert scan records to NumPy columns in a single pass."""
+    n = len(scan_events)
+    index: dict[Any, int] = {}
+    codes = np.empty(n, dtype=np.int64)
+    raw_ts = [None] * n
+    lat = np.full(n, np.nan)
+    lng = np.full(n, np.nan)
+
+    for i, s in enumerate(scan_events):
+        codes[i] = index.setdefault(s.product_id, len(index))
+        raw_ts[i] = s.scanned_at or s.created_at
+        la, lo = s.latitude, s.longitude
+        if la and lo:
+            lat[i] = la
+            lng[i] = lo
+
+    return ScanColumns(epoch_ms_array(raw_ts), codes, list(index), lat, lng)
+
+
+def _group_sorted(codes: np.ndarray, ts_ms: np.ndarray, *tiebreak: np.ndarray):
+    """Sort by (product code, time, *tiebreak); return the order, the sorted
+    codes and times, and the start index of each product group."""
+    order = np.lexsort(tuple(reversed(tiebreak)) + (ts_ms, codes))
+    c = codes[order]
+    t = ts_ms[order]
+    starts = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+    return order, c, t, starts
+
+
+def _window_search(c: np.ndarray, t: np.ndarray, starts: np.ndarray, offset_ms: int, side: str) -> np.ndarray:
+    """Per-group ``searchsorted(t, t + offset_ms)`` over the sorted scans.
+
+    Groups are laid out on a composite int64 key ``group * stride + (t - group_min)``
+    with a stride wider than any group span plus the window, so one
+    searchsorted over the whole array never crosses a group boundary.
+    """
+    sizes = np.diff(np.r_[starts, len(t)])
+    rel = t - np.repeat(t[starts], sizes)
+    stride = int(rel.max()) + abs(offset_ms) + 1
+    if stride * len(starts) < 2 ** 62:
+        key = np.repeat(np.arange(len(starts), dtype=np.int64) * stride, sizes) + rel
+        return np.searchsorted(key, key + offset_ms, side=side)
+    # Time span too wide for a composite key — fall back to per-group search
+    out = np.empty(len(t), dtype=np.int64)
+    bounds = np.r_[starts, len(t)]
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        out[a:b] = a + np.searchsorted(t[a:b], t[a:b] + offset_ms, side=side)
+    return out
+
+
+def _velocity_anomaly(product_id, max_count: int, window_minutes: int) -> dict | None:
     crit = THRESHOLDS["scan_velocity"]["critical"]
     warn = THRESHOLDS["scan_velocity"]["warning"]
+    if max_count >= crit:
+        return {
+            "type": "scan_velocity", "severity": "critical",
+            "score": min(1.0, max_count / (crit * 2)),
+            "source_type": "product", "source_id": product_id,
+            "description": f"{max_count} scans in {window_minutes}min window (critical threshold: {crit})",
+            "details": {"count": max_count, "window_minutes": window_minutes, "product_id": product_id},
+        }
+    if max_count >= warn:
+        return {
+            "type": "scan_velocity", "severity": "warning",
+            "score": max_count / (crit * 2),
+            "source_type": "product", "source_id": product_id,
+            "description": f"{max_count} scans in {window_minutes}min — elevated velocity",
+            "details": {"count": max_count, "window_minutes": window_minutes, "product_id": product_id},
+        }
+    return None
+
+
+def scan_velocity_columnar(cols: ScanColumns, window_minutes: int = 60) -> list[dict]:
+    """Vectorized sliding-window max per product: one lexsort, one
+    searchsorted and a segmented max — no per-event Python work."""
+    if len(cols.ts_ms) == 0:
+        return []
+    window_ms = window_minutes * 60 * 1000
+    order, c, t, starts = _group_sorted(cols.codes, cols.ts_ms)
+    # bisect_right(t, t[i] + window) - i == scans in the window opened by scan i
+    counts = _window_search(c, t, starts, window_ms, "right") - np.arange(len(t))
+    max_counts = np.maximum.reduceat(counts, starts)
 
-    for product_id, times in groups.items():
-        times.sort()
-        max_count = 0
-        # Sliding window via binary search: O(n log n)
-        for i, t in enumerate(times):
-            j = bisect_right(times, t + window_ms)
-            count = j - i
-            if count > max_count:
-                max_count = count
-        if max_count >= crit:
-            anomalies.append({
-                "type": "scan_velocity", "severity": "critical",
-                "score": min(1.0, max_count / (crit * 2)),
-                "source_type": "product", "source_id": product_id,
-                "description": f"{max_count} scans in {window_minutes}min window (critical threshold: {crit})",
-                "details": {"count": max_count, "window_minutes": window_minutes, "product_id": product_id},
-            })
-        elif max_count >= warn:
-            anomalies.append({
-                "type": "scan_velocity", "severity": "warning",
-                "score": max_count / (crit * 2),
-                "source_type": "product", "source_id": product_id,
-                "description": f"{max_count} scans in {window_minutes}min — elevated velocity",
-                "details": {"count": max_count, "window_minutes": window_minutes, "product_id": product_id},
-            })
-
+    warn = THRESHOLDS["scan_velocity"]["warning"]
+    anomalies = []
+    # Groups are sorted by code, and codes follow first appearance of products
+    for g in range(len(starts)):
+        max_count = int(max_counts[g])
+        if max_count < warn:
+            continue
+        anomalies.append(_velocity_anomaly(cols.product_ids[c[starts[g]]], max_count, window_minutes))
     return anomalies
 
 
-def detect_fraud_spikes(fraud_alerts: list[dict]) -> list[dict]:
+def detect_scan_velocity(scan_events: list[Scan], window_minutes: int = 60) -> list[dict]:
+    """Detect scan velocity anomalies — too many scans in a short window.
+    Thin adapter over the columnar path."""
+    return scan_velocity_columnar(scan_columns(scan_events), window_minutes)
+
+
+def _fraud_spike_anomaly(product_id, day: str, count: int) -> dict | None:
+    crit = THRESHOLDS["fraud_spike"]["critical"]
+    warn = THRESHOLDS["fraud_spike"]["warning"]
+    if count >= crit:
+        return {
+            "type": "fraud_spike", "severity": "critical",
+            "score": min(1.0, count / 10),
+            "source_type": "product", "source_id": product_id,
+            "description": f"{count} fraud alerts on {day} (critical threshold: {crit})",
+            "details": {"count": count, "day": day},
+        }
+    if count >= warn:
+        return {
+            "type": "fraud_spike", "severity": "warning",
+            "score": count / 10,
+            "source_type": "product", "source_id": product_id,
+            "description": f"{count} fraud alerts on {day} — elevated",
+            "details": {"count": count, "day": day},
+        }
+    return None
+
+
+def detect_fraud_spikes(fraud_alerts: list[Alert]) -> list[dict]:
     """Detect fraud spikes — sudden increase in fraud alerts per product per day."""
-    anomalies = []
     daily: dict[str, dict] = {}
 
     for a in fraud_alerts:
-        day = str(a.get("created_at", ""))[:10]
-        key = f"{a.get('product_id')}_{day}"
+        day = str(a.created_at)[:10] if a.created_at is not None else ""
+        key = f"{a.product_id}_{day}"
         if key not in daily:
-            daily[key] = {"product_id": a.get("product_id"), "day": day, "count": 0}
+            daily[key] = {"product_id": a.product_id, "day": day, "count": 0}
         daily[key]["count"] += 1
 
-    crit = THRESHOLDS["fraud_spike"]["critical"]
-    warn = THRESHOLDS["fraud_spike"]["warning"]
+    anomalies = (_fraud_spike_anomaly(g["product_id"], g["day"], g["count"]) for g in daily.values())
+    return [a for a in anomalies if a]
 
-    for g in daily.values():
-        if g["count"] >= crit:
-            anomalies.append({
-                "type": "fraud_spike", "severity": "critical",
-                "score": min(1.0, g["count"] / 10),
-                "source_type": "product", "source_id": g["product_id"],
-                "description": f"{g['count']} fraud alerts on {g['day']} (critical threshold: {crit})",
-                "details": {"count": g["count"], "day": g["day"]},
-            })
-        elif g["count"] >= warn:
-            anomalies.append({
-                "type": "fraud_spike", "severity": "warning",
-                "score": g["count"] / 10,
-                "source_type": "product", "source_id": g["product_id"],
-                "description": f"{g['count']} fraud alerts on {g['day']} — elevated",
-                "details": {"count": g["count"], "day": g["day"]},
-            })
-
-    return anomalies
 
+def _trust_drop_anomaly(pid, scores: list[dict]) -> dict | None:
+    """Compare the two most recent scores of one product (sorts ``scores`` in place)."""
+    scores.sort(key=lambda s: s.get("date") or "")
+    if len(scores) < 2:
+        return None
+    latest = scores[-1]["score"]
+    previous = scores[-2]["score"]
+    drop = previous - latest
 
-def detect_trust_drops(trust_scores: list[dict]) -> list[dict]:
+    crit = THRESHOLDS["trust_drop"]["critical"]
+    warn = THRESHOLDS["trust_drop"]["warning"]
+    if drop >= crit:
+        return {
+            "type": "trust_drop", "severity": "critical",
+            "score": min(1.0, drop / 50),
+            "source_type": "product", "source_id": pid,
+            "description": f"Trust score dropped {drop} points ({previous} → {latest})",
+            "details": {"previous_score": previous, "current_score": latest, "drop": drop},
+        }
+    if drop >= warn:
+        return {
+            "type": "trust_drop", "severity": "warning",
+            "score": drop / 50,
+            "source_type": "product", "source_id": pid,
+            "description": f"Trust score declined {drop} points",
+            "details": {"previous_score": previous, "current_score": latest, "drop": drop},
+        }
+    return None
+
+
+def detect_trust_drops(trust_scores: list[TrustScore]) -> list[dict]:
     """Detect trust score drops."""
-    anomalies = []
     groups: dict[str, list[dict]] = {}
 
     for ts in trust_scores:
-        groups.setdefault(ts.get("product_id"), []).append({"score": ts.get("score", 0), "date": ts.get("calculated_at")})
+        groups.setdefault(ts.product_id, []).append({"score": ts.score, "date": ts.calculated_at})
 
-    crit = THRESHOLDS["trust_drop"]["critical"]
-    warn = THRESHOLDS["trust_drop"]["warning"]
+    anomalies = (_trust_drop_anomaly(pid, scores) for pid, scores in groups.items())
+    return [a for a in anomalies if a]
 
-    for pid, scores in groups.items():
-        scores.sort(key=lambda s: s.get("date") or "")
-        if len(scores) < 2:
-            continue
-        latest = scores[-1]["score"]
-        previous = scores[-2]["score"]
-        drop = previous - latest
-
-        if drop >= crit:
-            anomalies.append({
-                "type": "trust_drop", "severity": "critical",
-                "score": min(1.0, drop / 50),
-                "source_type": "product", "source_id": pid,
-                "description": f"Trust score dropped {drop} points ({previous} → {latest})",
-                "details": {"previous_score": previous, "current_score": latest, "drop": drop},
-            })
-        elif drop >= warn:
-            anomalies.append({
-                "type": "trust_drop", "severity": "warning",
-                "score": drop / 50,
-                "source_type": "product", "source_id": pid,
-                "description": f"Trust score declined {drop} points",
-                "details": {"previous_score": previous, "current_score": latest, "drop": drop},
-            })
 
-    return anomalies
+def geo_dispersion_columnar(cols: ScanColumns, window_hours: int = 1) -> list[dict]:
+    """Vectorized distinct grid-cell count over each scan's forward window.
 
+    Scan k adds one distinct cell to every window start i in
+    [max(prev_same_cell(k) + 1, first_start_reaching(k)), k], so all window
+    counts fall out of one difference array and a cumulative sum.
+    """
+    has_geo = ~(np.isnan(cols.lat) | np.isnan(cols.lng))
+    if not has_geo.any():
+        return []
+    codes = cols.codes[has_geo]
+    rlat = np.round(cols.lat[has_geo])
+    rlng = np.round(cols.lng[has_geo])
+    window_ms = window_hours * 3600 * 1000
 
-def detect_geo_dispersion(scan_events: list[dict], window_hours: int = 1) -> list[dict]:
-    """Detect geographic dispersion anomalies.
-    Optimized: O(n log n) using bisect instead of O(n²) brute force."""
-    anomalies = []
-    groups: dict[str, list[tuple[float, float, float]]] = {}
+    # Same ordering as sorting (time, lat, lng) tuples within each product
+    order, c, t, starts = _group_sorted(codes, cols.ts_ms[has_geo], cols.lat[has_geo], cols.lng[has_geo])
+    n = len(t)
+    _, lat_cell = np.unique(rlat[order], return_inverse=True)
+    lng_vals, lng_cell = np.unique(rlng[order], return_inverse=True)
+    cell = lat_cell.reshape(-1) * len(lng_vals) + lng_cell.reshape(-1)
 
-    for s in scan_events:
-        if not s.get("latitude") or not s.get("longitude"):
-            continue
-        groups.setdefault(s.get("product_id"), []).append((
-            _parse_ts(s.get("scanned_at") or s.get("created_at")),
-            s["latitude"], s["longitude"],
-        ))
+    # Previous index with the same (product, cell), or -1
+    by_cell = np.lexsort((np.arange(n), cell, c))
+    same = np.r_[False, (c[by_cell][1:] == c[by_cell][:-1]) & (cell[by_cell][1:] == cell[by_cell][:-1])]
+    prev = np.full(n, -1, dtype=np.int64)
+    prev[by_cell[same]] = by_cell[np.flatnonzero(same) - 1]
 
-    window_ms = window_hours * 3600 * 1000
-    crit = THRESHOLDS["geo_dispersion"]["critical"]
+    # First window start whose window still reaches scan k (t[i] >= t[k] - window)
+    first_start = _window_search(c, t, starts, -window_ms, "left")
 
-    for pid, points in groups.items():
-        points.sort()  # Sort by time (first element of tuple)
-        times = [p[0] for p in points]  # Extract sorted times for bisect
-        for i, (t, lat, lng) in enumerate(points):
-            j = bisect_right(times, t + window_ms)
-            in_window = points[i:j]
-            unique = set(f"{round(pp[1])},{round(pp[2])}" for pp in in_window)
-            if len(unique) >= crit:
-                anomalies.append({
-                    "type": "geo_dispersion", "severity": "critical",
-                    "score": min(1.0, len(unique) / 10),
-                    "source_type": "product", "source_id": pid,
-                    "description": f"Scanned from {len(unique)} different locations within {window_hours}h",
-                    "details": {"unique_locations": len(unique), "window_hours": window_hours},
-                })
-                break
+    lo = np.maximum(prev + 1, first_start)
+    # +1 at each contribution start, -1 just past k; the cumulative sum gives
+    # the distinct-cell count of every window start
+    unique_counts = np.cumsum(np.bincount(lo, minlength=n)) - np.arange(n)
 
+    crit = THRESHOLDS["geo_dispersion"]["critical"]
+    hits = unique_counts >= crit
+    # Emit in first-appearance order among scans that carry coordinates
+    first_seen = np.minimum.reduceat(order, starts)
+    anomalies = []
+    for g in np.argsort(first_seen):
+        a = starts[g]
+        b = starts[g + 1] if g + 1 < len(starts) else n
+        idx = np.flatnonzero(hits[a:b])
+        if len(idx) == 0:
+            continue
+        unique = int(unique_counts[a + idx[0]])
+        anomalies.append({
+            "type": "geo_dispersion", "severity": "critical",
+            "score": min(1.0, unique / 10),
+            "source_type": "product", "source_id": cols.product_ids[c[a]],
+            "description": f"Scanned from {unique} different locations within {window_hours}h",
+            "details": {"unique_locations": unique, "window_hours": window_hours},
+        })
     return anomalies
 
 
-def run_full_scan(data: dict[str, Any]) -> dict:
+def detect_geo_dispersion(scan_events: list[Scan], window_hours: int = 1) -> list[dict]:
+    """Detect geographic dispersion anomalies.
+    Thin adapter over the columnar path."""
+    return geo_dispersion_columnar(scan_columns(scan_events), window_hours)
+
+
+def run_full_scan(data: FullScanData) -> dict:
     """Run full anomaly scan across all data sources."""
-    scans = data.get("scans", [])
-    fraud_alerts = data.get("fraudAlerts", [])
-    trust_scores = data.get("trustScores", [])
+    scans = data.scans
+    fraud_alerts = data.fraud_alerts
+    trust_scores = data.trust_scores
 
+    # Columnarize scans once and share them between both scan detectors
+    cols = scan_columns(scans)
     all_anomalies = (
-        detect_scan_velocity(scans)
+        scan_velocity_columnar(cols)
         + detect_fraud_spikes(fraud_alerts)
         + detect_trust_drops(trust_scores)
-        + detect_geo_dispersion(scans)
+        + geo_dispersion_columnar(cols)
     )
 
     sev_order = {"critical": 0, "warning": 1, "info": 2}
@@ -0,0 +1,159 @@
+"""
+Streaming Full-Scan Anomaly Detection
+Incremental counterpart of anomaly.run_full_scan for NDJSON ingest.
+
+Each input record is one line:
+    {"kind": "scan" | "fraudAlert" | "trustScore", "record": {...}}
+    {"kind": "flush", "product_id": "..."}   # optional: product is complete
+
+Each record is validated as the matching schemas record (Scan, Alert,
+TrustScore); a malformed one raises ValueError without touching the
+stream, so the caller can report the line and carry on.
+
+Records are folded into small per-product accumulators (timestamps,
+coordinates, daily fraud counts, trust scores) instead of being kept as
+dicts. A product's anomalies are emitted as soon as its group is final —
+on an explicit flush, on a product change when the stream is declared
+``grouped`` (sorted by product_id), or at end of stream — so peak memory
+is bounded by the number of active products, not the number of events.
+
+Ungrouped streams keep open products in LRU order; past ``max_products``
+the least recently fed one is finalized early. Should that product come
+back, its later records are evaluated as a separate group.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from engines.anomaly import (
+    ScanColumns, _fraud_spike_anomaly, _trust_drop_anomaly,
+    scan_velocity_columnar, geo_dispersion_columnar,
+)
+from engines.timestamps import epoch_ms
+from schemas import Alert, Id, Scan, TrustScore
+
+_NO_PRODUCT = object()
+
+_RECORDS = {"scan": TypeAdapter(Scan), "fraudAlert": TypeAdapter(Alert), "trustScore": TypeAdapter(TrustScore)}
+_PRODUCT_ID = TypeAdapter(Id | None)
+
+
+class _ProductAccumulator:
+    __slots__ = ("ts_ms", "lat", "lng", "fraud_days", "trust")
+
+    def __init__(self) -> None:
+        self.ts_ms: list[int] = []
+        self.lat: list[float] = []
+        self.lng: list[float] = []
+        self.fraud_days: dict[str, int] = {}
+        self.trust: list[dict] = []
+
+
+class FullScanStream:
+    """Incremental full scan: ``feed`` records, then ``close`` and ``summary``."""
+
+    def __init__(self, grouped: bool = False, window_minutes: int = 60, window_hours: int = 1,
+                 max_products: int = 10_000) -> None:
+        self.grouped = grouped
+        self.window_minutes = window_minutes
+        self.window_hours = window_hours
+        self.max_products = max_products
+        self._products: OrderedDict[Any, _ProductAccumulator] = OrderedDict()
+        self._current: Any = _NO_PRODUCT
+        self.records = 0
+        self.early_finalized = 0
+        self.counts = {"total": 0, "critical": 0, "warning": 0}
+
+    # ─── Ingest ──────────────────────────────────────────────
+    def feed(self, line: dict) -> list[dict]:
+        """Fold one NDJSON record in; return anomalies of any product it
+        finalized. Raises ValueError for a malformed record."""
+        kind = line.get("kind")
+        if kind == "flush":
+            return self._finalize(_PRODUCT_ID.validate_python(line.get("product_id")))
+        adapter = _RECORDS.get(kind)
+        if adapter is None:
+            return []
+        rec = adapter.validate_python(line.get("record") or {})
+        pid = rec.product_id
+
+        out: list[dict] = []
+        if self.grouped and pid != self._current and self._current is not _NO_PRODUCT:
+            out = self._finalize(self._current)
+        self._current = pid
+        self.records += 1
+
+        acc = self._products.get(pid)
+        if acc is None:
+            acc = self._products[pid] = _ProductAccumulator()
+            if len(self._products) > self.max_products:
+                self.early_finalized += 1
+                out.extend(self._finalize(next(iter(self._products))))
+        else:
+            self._products.move_to_end(pid)
+
+        if kind == "scan":
+            acc.ts_ms.append(int(epoch_ms(rec.scanned_at or rec.created_at)))
+            la, lo = rec.latitude, rec.longitude
+            ok = bool(la and lo)
+            acc.lat.append(la if ok else np.nan)
+            acc.lng.append(lo if ok else np.nan)
+        elif kind == "fraudAlert":
+            day = str(rec.created_at if rec.created_at is not None else "")[:10]
+            acc.fraud_days[day] = acc.fraud_days.get(day, 0) + 1
+        else:
+            acc.trust.append({"score": rec.score, "date": rec.calculated_at})
+        return out
+
+    def close(self) -> list[dict]:
+        """Finalize every product still open at end of stream."""
+        out: list[dict] = []
+        for pid in list(self._products):
+            out.extend(self._finalize(pid))
+        self._current = _NO_PRODUCT
+        return out
+
+    def summary(self) -> dict:
+        return {
+            **self.counts,
+            "records": self.records,
+            "early_finalized": self.early_finalized,
+            "scanned_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    # ─── Per-product detection ───────────────────────────────
+    def _finalize(self, pid: Any) -> list[dict]:
+        acc = self._products.pop(pid, None)
+        if acc is None:
+            return []
+
+        anomalies: list[dict] = []
+        cols = None
+        if acc.ts_ms:
+            n = len(acc.ts_ms)
+            cols = ScanColumns(
+                np.asarray(acc.ts_ms, dtype=np.int64), np.zeros(n, dtype=np.int64), [pid],
+                np.asarray(acc.lat, dtype=np.float64), np.asarray(acc.lng, dtype=np.float64),
+            )
+            anomalies.extend(scan_velocity_columnar(cols, self.window_minutes))
+        for day, count in acc.fraud_days.items():
+            a = _fraud_spike_anomaly(pid, day, count)
+            if a:
+                anomalies.append(a)
+        a = _trust_drop_anomaly(pid, acc.trust)
+        if a:
+            anomalies.append(a)
+        if cols is not None:
+            anomalies.extend(geo_dispersion_columnar(cols, self.window_hours))
+
+        for a in anomalies:
+            self.counts["total"] += 1
+            if a["severity"] in self.counts:
+                self.counts[a["severity"]] += 1
+        return anomalies
@@ -10,10 +10,16 @@ The Node.js adapter pre-fetches data and sends it to this service.
 
 from __future__ import annotations
 import math
+import time
 import uuid
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any
 
+import numpy as np
+
+from engines.geo import haversine_km, haversine_km_prefiltered
+
 
 # Thresholds
 SCAN_FREQUENCY_THRESHOLD = 10
@@ -24,12 +30,82 @@ ZSCORE_THRESHOLD = 2.5
 
 
 def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Haversine distance in km."""
-    R = 6371
-    d_lat = math.radians(lat2 - lat1)
-    d_lon = math.radians(lon2 - lon1)
-    a = math.sin(d_lat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lon / 2) ** 2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    """Haversine distance in km for one pair (scalar form of geo.haversine_km)."""
+    return float(haversine_km(lat1, lon1, lat2, lon2))
+
+
+# ─── Alert builders (shared by the scalar and batch paths) ───
+
+def _alert_high_frequency(hourly_count) -> dict:
+    return {
+        "type": "HIGH_FREQUENCY_SCAN",
+        "severity": "high",
+        "description": f"QR code scanned {hourly_count} times in the last hour (threshold: {SCAN_FREQUENCY_THRESHOLD})",
+        "details": {"count": hourly_count, "threshold": SCAN_FREQUENCY_THRESHOLD},
+    }
+
+
+def _alert_burst(burst_count) -> dict:
+    return {
+        "type": "SCAN_BURST",
+        "severity": "critical",
+        "description": f"Burst detected: {burst_count} scans in 5 minutes",
+        "details": {"count": burst_count},
+    }
+
+
+def _alert_revoked(qr_status) -> dict:
+    return {
+        "type": "REVOKED_QR",
+        "severity": "critical",
+        "description": "Attempted scan of a revoked QR code",
+        "details": {"qr_status": qr_status},
+    }
+
+
+def _alert_recalled(product_status) -> dict:
+    return {
+        "type": "RECALLED_PRODUCT",
+        "severity": "high",
+        "description": "Scan of a recalled product",
+        "details": {"product_status": product_status},
+    }
+
+
+def _alert_zscore(z_score: float, mean: float, std_dev: float, today_count) -> dict:
+    return {
+        "type": "STATISTICAL_ANOMALY",
+        "severity": "medium",
+        "description": f"Scan frequency z-score {z_score:.2f} exceeds threshold {ZSCORE_THRESHOLD}",
+        "details": {"z_score": round(z_score, 2), "mean": round(mean, 2), "std_dev": round(std_dev, 2), "today_count": today_count},
+    }
+
+
+def _alert_device(unique_products) -> dict:
+    return {
+        "type": "DEVICE_ANOMALY",
+        "severity": "medium",
+        "description": f"Single device scanned {unique_products} different products in 1 hour",
+        "details": {"unique_products": unique_products},
+    }
+
+
+def _alert_geo_velocity(dist: float, time_diff_h: float) -> dict:
+    return {
+        "type": "GEO_VELOCITY_ANOMALY",
+        "severity": "critical",
+        "description": f"QR scanned {dist:.0f}km apart within {time_diff_h * 60:.0f} minutes",
+        "details": {"distance_km": round(dist), "time_hours": round(time_diff_h, 2)},
+    }
+
+
+def _alert_off_hours(hour) -> dict:
+    return {
+        "type": "OFF_HOURS_SCAN",
+        "severity": "low",
+        "description": f"Scan at unusual hour: {hour}:00",
+        "details": {"hour": hour},
+    }
 
 
 def run_rules(scan_event: dict, context: dict) -> dict:
@@ -40,42 +116,22 @@ def run_rules(scan_event: dict, context: dict) -> dict:
     hourly_count = context.get("hourly_scan_count", 0)
     if hourly_count > SCAN_FREQUENCY_THRESHOLD:
         score += 0.4
-        alerts.append({
-            "type": "HIGH_FREQUENCY_SCAN",
-            "severity": "high",
-            "description": f"QR code scanned {hourly_count} times in the last hour (threshold: {SCAN_FREQUENCY_THRESHOLD})",
-            "details": {"count": hourly_count, "threshold": SCAN_FREQUENCY_THRESHOLD},
-        })
+        alerts.append(_alert_high_frequency(hourly_count))
 
     burst_count = context.get("burst_scan_count", 0)
     if burst_count > SCAN_BURST_THRESHOLD:
         score += 0.3
-        alerts.append({
-            "type": "SCAN_BURST",
-            "severity": "critical",
-            "description": f"Burst detected: {burst_count} scans in 5 minutes",
-            "details": {"count": burst_count},
-        })
+        alerts.append(_alert_burst(burst_count))
 
     qr_status = context.get("qr_status")
     if qr_status == "revoked":
         score += 0.8
-        alerts.append({
-            "type": "REVOKED_QR",
-            "severity": "critical",
-            "description": "Attempted scan of a revoked QR code",
-            "details": {"qr_status": qr_status},
-        })
+        alerts.append(_alert_revoked(qr_status))
 
     product_status = context.get("product_status")
     if product_status == "recalled":
         score += 0.6
-        alerts.append({
-            "type": "RECALLED_PRODUCT",
-            "severity": "high",
-            "description": "Scan of a recalled product",
-            "details": {"product_status": product_status},
-        })
+        alerts.append(_alert_recalled(product_status))
 
     return {"score": min(1.0, score), "alerts": alerts}
 
@@ -96,22 +152,12 @@ def run_statistical(scan_event: dict, context: dict) -> dict:
             z_score = (today_count - mean) / std_dev
             if z_score > ZSCORE_THRESHOLD:
                 score += 0.5
-                alerts.append({
-                    "type": "STATISTICAL_ANOMALY",
-                    "severity": "medium",
-                    "description": f"Scan frequency z-score {z_score:.2f} exceeds threshold {ZSCORE_THRESHOLD}",
-                    "details": {"z_score": round(z_score, 2), "mean": round(mean, 2), "std_dev": round(std_dev, 2), "today_count": today_count},
-                })
+                alerts.append(_alert_zscore(z_score, mean, std_dev, today_count))
 
     unique_products = context.get("device_unique_products", 0)
     if unique_products > DUPLICATE_DEVICE_THRESHOLD:
         score += 0.3
-        alerts.append({
-            "type": "DEVICE_ANOMALY",
-            "severity": "medium",
-            "description": f"Single device scanned {unique_products} different products in 1 hour",
-            "details": {"unique_products": unique_products},
-        })
+        alerts.append(_alert_device(unique_products))
 
     return {"score": min(1.0, score), "alerts": alerts}
 
@@ -126,26 +172,17 @@ def run_patterns(scan_event: dict, context: dict) -> dict:
     recent = context.get("recent_scan")
 
     if lat and lon and recent and recent.get("latitude"):
-        dist = haversine(lat, lon, recent["latitude"], recent["longitude"])
         time_diff_h = context.get("time_diff_hours", 999)
+        # Only scans within the hour can be a geo-velocity anomaly — skip the trig otherwise
+        dist = haversine(lat, lon, recent["latitude"], recent["longitude"]) if time_diff_h < 1 else 0.0
         if time_diff_h < 1 and dist > GEO_DISTANCE_THRESHOLD:
             score += 0.7
-            alerts.append({
-                "type": "GEO_VELOCITY_ANOMALY",
-                "severity": "critical",
-                "description": f"QR scanned {dist:.0f}km apart within {time_diff_h * 60:.0f} minutes",
-                "details": {"distance_km": round(dist), "time_hours": round(time_diff_h, 2)},
-            })
+            alerts.append(_alert_geo_velocity(dist, time_diff_h))
 
     hour = scan_event.get("hour", datetime.now(timezone.utc).hour)
     if 2 <= hour <= 5:
         score += 0.1
-        alerts.append({
-            "type": "OFF_HOURS_SCAN",
-            "severity": "low",
-            "description": f"Scan at unusual hour: {hour}:00",
-            "details": {"hour": hour},
-        })
+        alerts.append(_alert_off_hours(hour))
 
     return {"score": min(1.0, score), "alerts": alerts}
 
@@ -199,3 +236,140 @@ def analyze(scan_event: dict, context: dict | None = None) -> dict:
         "processingTimeMs": round(elapsed, 1),
         "explainability": explain(factors, all_alerts),
     }
+
+
+# ─── Batch scoring ───────────────────────────────────────────
+
+@lru_cache(maxsize=1024)
+def _top_factors(rules: float, statistical: float, patterns: float) -> tuple:
+    """Memoized ``explain`` ordering — layer scores take only a few distinct values."""
+    top = sorted((("rules", rules), ("statistical", statistical), ("patterns", patterns)), key=lambda x: x[1], reverse=True)
+    return tuple((k, f"{v * 100:.1f}%") for k, v in top)
+
+
+def _column(contexts: list[dict], key: str, default=0) -> np.ndarray:
+    return np.array([c.get(key, default) for c in contexts], dtype=np.float64)
+
+
+def analyze_batch(items: list[dict]) -> dict:
+    """
+    Score many ``{scan_event, context}`` pairs at once.
+
+    Each layer's thresholds and z-scores are evaluated as array operations
+    over the whole batch — daily_scan_counts become one zero-padded matrix,
+    geo-velocity distances one haversine call — and alert dicts are only
+    built for the rows that triggered them. Results keep input order and
+    match ``analyze`` item by item; ``processingTimeMs`` is the amortized
+    per-item share of the batch.
+    """
+    t0 = time.perf_counter()
+    n = len(items)
+    if n == 0:
+        return {"results": [], "count": 0, "processingTimeMs": 0.0}
+
+    events = [it.get("scan_event") or {} for it in items]
+    contexts = [it.get("context") or {} for it in items]
+
+    # ─── Layer 1: rules ──────────────────────────────────────
+    hourly = _column(contexts, "hourly_scan_count")
+    burst = _column(contexts, "burst_scan_count")
+    revoked = np.array([c.get("qr_status") == "revoked" for c in contexts])
+    recalled = np.array([c.get("product_status") == "recalled" for c in contexts])
+    hi_freq = hourly > SCAN_FREQUENCY_THRESHOLD
+    is_burst = burst > SCAN_BURST_THRESHOLD
+    rule_scores = np.minimum(1.0, hi_freq * 0.4 + is_burst * 0.3 + revoked * 0.8 + recalled * 0.6)
+
+    # ─── Layer 2: statistical ────────────────────────────────
+    daily = [c.get("daily_scan_counts") or [] for c in contexts]
+    lengths = np.array([len(d) for d in daily])
+    width = int(lengths.max()) if n else 0
+    counts = np.zeros((n, max(width, 1)))
+    mask = np.arange(counts.shape[1]) < lengths[:, None]
+    counts[mask] = np.concatenate([np.asarray(d, dtype=np.float64) for d in daily]) if width else []
+    totals = counts.sum(axis=1)
+    safe_len = np.maximum(lengths, 1)
+    means = totals / safe_len
+    std_devs = np.sqrt((((counts - means[:, None]) * mask) ** 2).sum(axis=1) / safe_len)
+    today = _column(contexts, "today_scan_count")
+    eligible = (lengths > 3) & (totals > 5) & (std_devs > 0)
+    z_scores = np.where(eligible, (today - means) / np.where(std_devs > 0, std_devs, 1), 0.0)
+    is_z = eligible & (z_scores > ZSCORE_THRESHOLD)
+    device = _column(contexts, "device_unique_products")
+    is_device = device > DUPLICATE_DEVICE_THRESHOLD
+    stat_scores = np.minimum(1.0, is_z * 0.5 + is_device * 0.3)
+
+    # ─── Layer 3: patterns ───────────────────────────────────
+    geo_rows = [
+        i for i, (e, c) in enumerate(zip(events, contexts))
+        if e.get("latitude") and e.get("longitude") and c.get("recent_scan") and c["recent_scan"].get("latitude")
+        and c.get("time_diff_hours", 999) < 1
+    ]
+    dists = np.zeros(n)
+    if geo_rows:
+        # Exact only where the trig-free bound could exceed the threshold
+        dists[geo_rows] = haversine_km_prefiltered(
+            np.array([events[i]["latitude"] for i in geo_rows], dtype=np.float64),
+            np.array([events[i]["longitude"] for i in geo_rows], dtype=np.float64),
+            np.array([contexts[i]["recent_scan"]["latitude"] for i in geo_rows], dtype=np.float64),
+            np.array([contexts[i]["recent_scan"]["longitude"] for i in geo_rows], dtype=np.float64),
+            GEO_DISTANCE_THRESHOLD,
+        )
+    is_geo = dists > GEO_DISTANCE_THRESHOLD
+    now_hour = datetime.now(timezone.utc).hour
+    hours = [e.get("hour", now_hour) for e in events]
+    off_hours = np.array([2 <= h <= 5 for h in hours])
+    pat_scores = np.minimum(1.0, is_geo * 0.7 + off_hours * 0.1)
+
+    fraud_scores = np.minimum(1.0, rule_scores * 0.4 + stat_scores * 0.35 + pat_scores * 0.25)
+
+    # Severity breakdown straight from the trigger flags
+    sev_critical = (is_burst.astype(int) + revoked + is_geo).tolist()
+    sev_high = (hi_freq.astype(int) + recalled).tolist()
+    sev_medium = (is_z.astype(int) + is_device).tolist()
+    sev_low = off_hours.astype(int).tolist()
+    rule_l, stat_l, pat_l = rule_scores.tolist(), stat_scores.tolist(), pat_scores.tolist()
+    fraud_l = np.round(fraud_scores, 3).tolist()
+    hi_freq, is_burst, revoked, recalled = hi_freq.tolist(), is_burst.tolist(), revoked.tolist(), recalled.tolist()
+    is_z, is_device, is_geo, off_hours = is_z.tolist(), is_device.tolist(), is_geo.tolist(), off_hours.tolist()
+
+    # ─── Assemble per-item results (alerts only where triggered) ─
+    per_item_ms = round((time.perf_counter() - t0) * 1000 / n, 1)
+    results = []
+    for i in range(n):
+        ctx = contexts[i]
+        alerts = []
+        if hi_freq[i]:
+            alerts.append(_alert_high_frequency(ctx.get("hourly_scan_count", 0)))
+        if is_burst[i]:
+            alerts.append(_alert_burst(ctx.get("burst_scan_count", 0)))
+        if revoked[i]:
+            alerts.append(_alert_revoked(ctx.get("qr_status")))
+        if recalled[i]:
+            alerts.append(_alert_recalled(ctx.get("product_status")))
+        if is_z[i]:
+            alerts.append(_alert_zscore(float(z_scores[i]), float(means[i]), float(std_devs[i]), ctx.get("today_scan_count", 0)))
+        if is_device[i]:
+            alerts.append(_alert_device(ctx.get("device_unique_products", 0)))
+        if is_geo[i]:
+            alerts.append(_alert_geo_velocity(float(dists[i]), ctx.get("time_diff_hours", 999)))
+        if off_hours[i]:
+            alerts.append(_alert_off_hours(hours[i]))
+
+        factors = {"rules": rule_l[i], "statistical": stat_l[i], "patterns": pat_l[i]}
+        results.append({
+            "fraudScore": fraud_l[i],
+            "alerts": alerts,
+            "factors": factors,
+            "processingTimeMs": per_item_ms,
+            "explainability": {
+                "top_factors": [{"factor": k, "contribution": c} for k, c in _top_factors(rule_l[i], stat_l[i], pat_l[i])],
+                "alert_count": len(alerts),
+                "severity_breakdown": {"critical": sev_critical[i], "high": sev_high[i], "medium": sev_medium[i], "low": sev_low[i]},
+            },
+        })
+
+    return {
+        "results": results,
+        "count": n,
+        "processingTimeMs": round((time.perf_counter() - t0) * 1000, 1),
+    }
@@ -0,0 +1,45 @@
+"""
+Geo Distance Kernels
+Vectorized great-circle distances over arrays of coordinate pairs.
+
+The equirectangular pre-check uses the fact that on the sphere
+ds² = dφ² + cos²φ·dλ² ≤ dφ² + dλ², so R·sqrt(Δφ² + Δλ²) is an upper bound on
+the great-circle distance that needs no trigonometry. Pairs whose bound
+is already below a threshold can skip the haversine entirely.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Haversine distance in km; inputs are degrees, scalars or arrays (broadcast)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def distance_upper_bound_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Trig-free equirectangular upper bound on the great-circle distance."""
+    d_lat = np.radians(np.asarray(lat2, dtype=np.float64) - np.asarray(lat1, dtype=np.float64))
+    d_lon = np.radians(np.asarray(lon2, dtype=np.float64) - np.asarray(lon1, dtype=np.float64))
+    d_lon = (d_lon + np.pi) % (2 * np.pi) - np.pi  # shortest way round the antimeridian
+    return EARTH_RADIUS_KM * np.sqrt(d_lat * d_lat + d_lon * d_lon)
+
+
+def haversine_km_prefiltered(lat1, lon1, lat2, lon2, threshold_km: float) -> np.ndarray:
+    """Distances for threshold tests: exact where a pair may exceed
+    ``threshold_km``, otherwise the (<= threshold) upper bound.
+
+    ``result > threshold_km`` is therefore exactly ``distance > threshold_km``,
+    while only the pairs that could cross the threshold pay for the trig.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (lat1, lon1, lat2, lon2)))
+    out = distance_upper_bound_km(lat1, lon1, lat2, lon2)
+    need = out > threshold_km
+    if need.any():
+        out[need] = haversine_km(lat1[need], lon1[need], lat2[need], lon2[need])
+    return out
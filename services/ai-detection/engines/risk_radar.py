@@ -7,9 +7,16 @@ Ported from server/engines/risk-radar.js
 from __future__ import annotations
 
 from datetime import datetime, timezone, timedelta
-from typing import Any
 import math
 
+from engines.timestamps import parse_iso
+from schemas import (
+    Alert, Certification, InventoryItem, Leak, Partner, RadarData, Shipment, Sustainability, Violation,
+)
+
+# Bump when results change for the same input (invalidates cached responses)
+ENGINE_VERSION = "1"
+
 
 HIGH_RISK_REGIONS = {"CN": 35, "RU": 45, "IN": 20, "KR": 10, "TH": 15}
 VECTOR_WEIGHTS = {
@@ -25,12 +32,12 @@ def _level(score: float) -> str:
 
 # ─── Vector Assessors ──────────────────────────────────────────
 
-def assess_partner_risk(partners: list, violations: list) -> dict:
+def assess_partner_risk(partners: list[Partner], violations: list[Violation]) -> dict:
     if not partners:
         return {"score": 0, "level": "low", "details": {}}
     n = len(partners)
-    kyc_failed = sum(1 for p in partners if p.get("kyc_status") in ("failed", "pending"))
-    low_trust = sum(1 for p in partners if p.get("trust_score", 50) < 50)
+    kyc_failed = sum(1 for p in partners if p.kyc_status in ("failed", "pending"))
+    low_trust = sum(1 for p in partners if p.trust_score < 50)
     viol = len(violations)
     score = min(100, kyc_failed / n * 40 + low_trust / n * 30 + min(viol, 10) * 3)
     return {
@@ -38,19 +45,19 @@ def assess_partner_risk(partners: list, violations: list) -> dict:
         "details": {
             "total_partners": n, "kyc_incomplete": kyc_failed,
             "low_trust_partners": low_trust, "sla_violations": viol,
-            "avg_trust_score": round(sum(p.get("trust_score", 50) for p in partners) / n),
+            "avg_trust_score": round(sum(p.trust_score for p in partners) / n),
         },
     }
 
 
-def assess_geographic_risk(partners: list, shipments: list) -> dict:
+def assess_geographic_risk(partners: list[Partner], shipments: list[Shipment]) -> dict:
     conc: dict[str, int] = {}
     for p in partners:
-        c = p.get("country", "XX")
+        c = p.country if p.country is not None else "XX"
         conc[c] = conc.get(c, 0) + 1
     total = len(partners) or 1
     hhi = sum((cnt / total) ** 2 for cnt in conc.values()) * 10000
-    country_risk = sum(HIGH_RISK_REGIONS.get(p.get("country", ""), 5) for p in partners) / total if total else 0
+    country_risk = sum(HIGH_RISK_REGIONS.get(p.country, 5) for p in partners) / total if total else 0
     score = min(100, hhi / 100 + country_risk)
     return {
         "score": round(score, 1), "level": _level(score),
@@ -63,31 +70,33 @@ def assess_geographic_risk(partners: list, shipments: list) -> dict:
     }
 
 
-def assess_route_risk(shipments: list) -> dict:
+def assess_route_risk(shipments: list[Shipment]) -> dict:
     if not shipments:
         return {"score": 0, "level": "low", "details": {}}
-    late = [s for s in shipments if s.get("actual_delivery") and s.get("estimated_delivery") and s["actual_delivery"] > s["estimated_delivery"]]
-    late_ids = {s.get("id") for s in late}
-    in_transit = [s for s in shipments if s.get("status") in ("in_transit", "pending")]
+    late = [s for s in shipments if s.actual_delivery and s.estimated_delivery and s.actual_delivery > s.estimated_delivery]
+    late_ids = {s.id for s in late}
+    in_transit = [s for s in shipments if s.status in ("in_transit", "pending")]
     lr = len(late) / len(shipments)
     avg_delay = 0.0
     if late:
         delays = []
         for s in late:
+            d1 = parse_iso(s.actual_delivery)
+            d2 = parse_iso(s.estimated_delivery)
+            if d1 is None or d2 is None:
+                continue
             try:
-                d1 = datetime.fromisoformat(str(s["actual_delivery"]).replace("Z", "+00:00"))
-                d2 = datetime.fromisoformat(str(s["estimated_delivery"]).replace("Z", "+00:00"))
                 delays.append((d1 - d2).total_seconds() / 3600)
-            except Exception:
+            except TypeError:  # naive vs aware
                 pass
         avg_delay = sum(delays) / len(delays) if delays else 0.0
 
     carrier_stats: dict[str, dict] = {}
     for s in shipments:
-        c = s.get("carrier", "Unknown")
+        c = s.carrier if s.carrier is not None else "Unknown"
         carrier_stats.setdefault(c, {"total": 0, "late": 0})
         carrier_stats[c]["total"] += 1
-        if s.get("id") in late_ids:
+        if s.id in late_ids:
             carrier_stats[c]["late"] += 1
 
     score = min(100, lr * 80 + min(avg_delay / 48, 1) * 20)
@@ -105,10 +114,10 @@ def assess_route_risk(shipments: list) -> dict:
     }
 
 
-def assess_financial_risk(leaks: list, violations: list) -> dict:
+def assess_financial_risk(leaks: list[Leak], violations: list[Violation]) -> dict:
     n = len(leaks)
-    price_dev = sum(abs(l["listing_price"] - l["authorized_price"]) / l["authorized_price"] for l in leaks if l.get("authorized_price") and l.get("listing_price"))
-    penalty = sum(v.get("penalty_amount", 0) for v in violations)
+    price_dev = sum(abs(l.listing_price - l.authorized_price) / l.authorized_price for l in leaks if l.authorized_price and l.listing_price)
+    penalty = sum(v.penalty_amount for v in violations)
     score = min(100, min(n * 5, 40) + (price_dev / n * 30 if n else 0) + min(penalty / 1000, 30))
     return {
         "score": round(score, 1), "level": _level(score),
@@ -121,7 +130,7 @@ def assess_financial_risk(leaks: list, violations: list) -> dict:
     }
 
 
-def assess_compliance_risk(certifications: list) -> dict:
+def assess_compliance_risk(certifications: list[Certification]) -> dict:
     if not certifications:
         return {"score": 20, "level": "low", "details": {"message": "No certifications tracked"}}
     now = datetime.now(timezone.utc)
@@ -129,12 +138,8 @@ def assess_compliance_risk(certifications: list) -> dict:
     expiring = 0
     cutoff = now + timedelta(days=30)
     for c in certifications:
-        raw = c.get("expiry_date")
-        if not raw:
-            continue
-        try:
-            dt = datetime.fromisoformat(str(raw).replace("Z", "+00:00"))
-        except Exception:
+        dt = parse_iso(c.expiry_date)
+        if dt is None:
             continue
         if dt < now:
             expired += 1
@@ -148,9 +153,9 @@ def assess_compliance_risk(certifications: list) -> dict:
     }
 
 
-def assess_cyber_risk(partners: list, alerts: list) -> dict:
-    no_api = sum(1 for p in partners if not p.get("api_key"))
-    fraud_a = sum(1 for a in alerts if a.get("alert_type") == "STATISTICAL_ANOMALY" or a.get("severity") == "high")
+def assess_cyber_risk(partners: list[Partner], alerts: list[Alert]) -> dict:
+    no_api = sum(1 for p in partners if not p.api_key)
+    fraud_a = sum(1 for a in alerts if a.alert_type == "STATISTICAL_ANOMALY" or a.severity == "high")
     score = min(100, no_api / max(len(partners), 1) * 30 + min(fraud_a * 8, 40) + 10)
     return {
         "score": round(score, 1), "level": _level(score),
@@ -158,11 +163,11 @@ def assess_cyber_risk(partners: list, alerts: list) -> dict:
     }
 
 
-def assess_environmental_risk(sustainability: list) -> dict:
+def assess_environmental_risk(sustainability: list[Sustainability]) -> dict:
     if not sustainability:
         return {"score": 30, "level": "medium", "details": {"message": "No ESG assessments — risk unmeasured"}}
-    avg = sum(s.get("overall_score", 50) for s in sustainability) / len(sustainability)
-    low = sum(1 for s in sustainability if s.get("overall_score", 50) < 50)
+    avg = sum(s.overall_score for s in sustainability) / len(sustainability)
+    low = sum(1 for s in sustainability if s.overall_score < 50)
     score = round(max(0, 100 - avg))
     return {
         "score": score, "level": _level(score),
@@ -170,20 +175,22 @@ def assess_environmental_risk(sustainability: list) -> dict:
     }
 
 
-def assess_supply_disruption(inventory: list, partners: list, shipments: list) -> dict:
-    suppliers = sum(1 for p in partners if p.get("type") in ("oem", "manufacturer"))
+def assess_supply_disruption(inventory: list[InventoryItem], partners: list[Partner], shipments: list[Shipment]) -> dict:
+    suppliers = sum(1 for p in partners if p.type in ("oem", "manufacturer"))
     ssr = 80 if suppliers <= 1 else (40 if suppliers == 2 else 10)
-    low = sum(1 for i in inventory if i.get("quantity", 0) <= i.get("min_stock", 10))
+    low = sum(1 for i in inventory if i.quantity <= i.min_stock)
     sr = low / len(inventory) if inventory else 0
     now_ts = datetime.now(timezone.utc)
     stuck = 0
     for s in shipments:
-        if s.get("status") == "in_transit" and s.get("created_at"):
+        if s.status == "in_transit" and s.created_at:
+            c = parse_iso(s.created_at)
+            if c is None:
+                continue
             try:
-                c = datetime.fromisoformat(str(s["created_at"]).replace("Z", "+00:00"))
                 if (now_ts - c).days > 14:
                     stuck += 1
-            except Exception:
+            except TypeError:  # naive vs aware
                 pass
     score = min(100, ssr * 0.35 + sr * 100 * 0.35 + min(stuck * 10, 30) * 0.30)
     return {
@@ -194,17 +201,17 @@ def assess_supply_disruption(inventory: list, partners: list, shipments: list) -
 
 # ─── Main Functions ───────────────────────────────────────────
 
-def compute_radar(data: dict[str, Any] | None = None) -> dict:
+def compute_radar(data: RadarData | None = None) -> dict:
     """Compute full risk radar — all 8 vectors."""
-    data = data or {}
-    partners = data.get("partners", [])
-    shipments = data.get("shipments", [])
-    violations = data.get("violations", [])
-    leaks = data.get("leaks", [])
-    alerts = data.get("alerts", [])
-    inventory = data.get("inventory", [])
-    certs = data.get("certifications", [])
-    sust = data.get("sustainability", [])
+    data = data or RadarData()
+    partners = data.partners
+    shipments = data.shipments
+    violations = data.violations
+    leaks = data.leaks
+    alerts = data.alerts
+    inventory = data.inventory
+    certs = data.certifications
+    sust = data.sustainability
 
     vectors = {
         "partner_risk": assess_partner_risk(partners, violations),
@@ -227,20 +234,20 @@ def compute_radar(data: dict[str, Any] | None = None) -> dict:
     }
 
 
-def generate_heatmap(partners: list, shipments: list, leaks: list) -> list[dict]:
+def generate_heatmap(partners: list[Partner], shipments: list[Shipment], leaks: list[Leak]) -> list[dict]:
     """Generate risk heatmap by region."""
     region_map: dict[str, dict] = {}
     for p in partners:
-        r = p.get("country") or p.get("region") or "Unknown"
+        r = p.country or p.region or "Unknown"
         region_map.setdefault(r, {"partners": 0, "risk_score": 0, "leaks": 0, "shipments": 0})
         region_map[r]["partners"] += 1
-        region_map[r]["risk_score"] += 100 - p.get("trust_score", 50)
+        region_map[r]["risk_score"] += 100 - p.trust_score
 
     for l in leaks:
-        r = l.get("region_detected", "Unknown")
+        r = l.region_detected
         region_map.setdefault(r, {"partners": 0, "risk_score": 0, "leaks": 0, "shipments": 0})
         region_map[r]["leaks"] += 1
-        region_map[r]["risk_score"] += (l.get("risk_score", 0.5)) * 20
+        region_map[r]["risk_score"] += l.risk_score * 20
 
     result = []
     for region, d in region_map.items():
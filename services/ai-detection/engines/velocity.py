@@ -0,0 +1,210 @@
+"""
+Incremental Scan-Velocity Detector
+Long-lived counterpart of anomaly.detect_scan_velocity for callers that
+send overlapping windows of scans over and over.
+
+Each product keeps a bounded, time-ordered window of scan timestamps. An
+in-order scan appends to the right and expires the left edge, so the
+window count is the window length — amortized O(1) per event instead of
+re-sorting the whole history on every call.
+
+Two backends, same counts:
+  - Redis (``redis_url``): one sorted set per product (``velocity:{id}``,
+    score = scan time) updated by a Lua script, one call per product per
+    batch. All workers and replicas see the same windows; idle products
+    expire after two windows.
+  - Memory (no URL): per-process lists kept in LRU order, the coldest
+    evicted past ``max_products``. Under gunicorn each worker only sees the
+    scans routed to it, so use this for a single worker or tests.
+
+Env:
+  VELOCITY_REDIS_URL   shared backend (default: REDIS_URL; unset = memory)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from typing import Any
+
+from engines.anomaly import THRESHOLDS, _velocity_anomaly
+from engines.timestamps import epoch_ms
+from schemas import Scan
+
+log = logging.getLogger(__name__)
+
+# KEYS[1] = product zset; ARGV = window_ms, max_events, ttl_ms, member tag,
+# then the product's scan times in arrival order. Mirrors _Window.add.
+_ADD_SCANS = """
+local key = KEYS[1]
+local w, maxn, ttl, tag = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4]
+local peak, late = 0, 0
+for i = 5, #ARGV do
+  local t = tonumber(ARGV[i])
+  local member = tag .. ':' .. i
+  local newest = redis.call('ZRANGE', key, -1, -1, 'WITHSCORES')
+  local count = 0
+  if #newest == 0 or t >= tonumber(newest[2]) then
+    redis.call('ZADD', key, t, member)
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', '(' .. (t - w))
+    redis.call('ZREMRANGEBYRANK', key, 0, -(maxn + 1))
+    count = redis.call('ZCARD', key)
+  elseif t < tonumber(newest[2]) - w then
+    late = late + 1
+  else
+    if redis.call('ZCARD', key) >= maxn then
+      redis.call('ZREMRANGEBYRANK', key, 0, 0)
+    end
+    redis.call('ZADD', key, t, member)
+    local ends = redis.call('ZRANGEBYSCORE', key, t, t + w, 'WITHSCORES')
+    for j = 2, #ends, 2 do
+      local e = tonumber(ends[j])
+      local c = redis.call('ZCOUNT', key, e - w, e)
+      if c > count then count = c end
+    end
+  end
+  if count > peak then peak = count end
+end
+redis.call('PEXPIRE', key, ttl)
+return {peak, late}
+"""
+
+
+class _Window:
+    """Sorted scan times; ``ts[head:]`` is live. Expiry only moves ``head``,
+    and the dead prefix is dropped once it is more than half the list."""
+    __slots__ = ("ts", "head")
+
+    def __init__(self) -> None:
+        self.ts: list[float] = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.ts) - self.head
+
+    def add(self, t: float, window_ms: float, max_events: int) -> int | None:
+        """Insert ``t``; return the largest window count it is part of, or
+        None when it is older than every window still tracked."""
+        ts = self.ts
+        if len(ts) == self.head or t >= ts[-1]:
+            # Fast path: in-order scan — append, expire the left edge
+            ts.append(t)
+            self.head = max(bisect_left(ts, t - window_ms, self.head), len(ts) - max_events)
+            if self.head > 64 and self.head * 2 > len(ts):
+                del ts[:self.head]
+                self.head = 0
+            return len(self)
+
+        if t < ts[-1] - window_ms:
+            return None
+
+        # Late scan inside the live window: insert in order and recount the
+        # windows ending at scans it now falls into (rare, O(k log n))
+        if len(self) >= max_events:
+            self.head += 1
+        insort(ts, t, self.head)
+        best = 0
+        for i in range(bisect_left(ts, t, self.head), bisect_right(ts, t + window_ms, self.head)):
+            best = max(best, i + 1 - bisect_left(ts, ts[i] - window_ms, self.head))
+        return best
+
+
+class VelocityTracker:
+    """Per-product sliding-window scan counter, shared through Redis or
+    held in LRU-bounded process memory."""
+
+    def __init__(self, window_minutes: int = 60, max_products: int = 100_000, max_events_per_product: int = 1000,
+                 redis_url: str | None = None) -> None:
+        self.window_minutes = window_minutes
+        self.window_ms = window_minutes * 60 * 1000
+        self.max_products = max_products
+        self.max_events_per_product = max_events_per_product
+        self._buffers: OrderedDict[Any, _Window] = OrderedDict()
+        self._lock = threading.Lock()
+        self.ingested = 0
+        self.late_dropped = 0
+        self.evictions = 0
+        self.redis_errors = 0
+
+        self._redis = None
+        url = redis_url or os.getenv("VELOCITY_REDIS_URL") or os.getenv("REDIS_URL")
+        if url:
+            import redis
+            self._redis = redis.from_url(url)
+            self._add_scans = self._redis.register_script(_ADD_SCANS)
+
+    def ingest(self, scan_events: list[Scan]) -> list[dict]:
+        """Add scans and return velocity anomalies for products whose window
+        count reached a threshold during this batch."""
+        by_product: dict[Any, list[float]] = {}
+        for s in scan_events:
+            by_product.setdefault(s.product_id, []).append(epoch_ms(s.scanned_at or s.created_at))
+
+        peaks = None
+        if self._redis is not None:
+            try:
+                peaks = self._ingest_redis(by_product)
+            except Exception as e:  # degrade to per-worker counts rather than fail the request
+                self.redis_errors += 1
+                log.warning("velocity tracker: redis ingest failed, counting locally: %s", e)
+        if peaks is None:
+            peaks = self._ingest_local(by_product)
+        self.ingested += len(scan_events)
+
+        warn = THRESHOLDS["scan_velocity"]["warning"]
+        return [
+            _velocity_anomaly(pid, count, self.window_minutes)
+            for pid, count in peaks.items() if count >= warn
+        ]
+
+    def _ingest_redis(self, by_product: dict[Any, list[float]]) -> dict[Any, int]:
+        tag = uuid.uuid4().hex
+        ttl = 2 * self.window_ms
+        with self._redis.pipeline(transaction=False) as pipe:
+            for pid, times in by_product.items():
+                self._add_scans(keys=[f"velocity:{pid}"],
+                                args=[self.window_ms, self.max_events_per_product, ttl, tag, *times], client=pipe)
+            results = pipe.execute()
+        peaks = {}
+        for pid, (peak, late) in zip(by_product, results):
+            peaks[pid] = int(peak)
+            self.late_dropped += int(late)
+        return peaks
+
+    def _ingest_local(self, by_product: dict[Any, list[float]]) -> dict[Any, int]:
+        peaks: dict[Any, int] = {}
+        with self._lock:
+            for pid, times in by_product.items():
+                buf = self._buffers.get(pid)
+                if buf is None:
+                    buf = self._buffers[pid] = _Window()
+                    if len(self._buffers) > self.max_products:
+                        self._buffers.popitem(last=False)
+                        self.evictions += 1
+                else:
+                    self._buffers.move_to_end(pid)
+                peak = 0
+                for t in times:
+                    count = buf.add(t, self.window_ms, self.max_events_per_product)
+                    if count is None:
+                        self.late_dropped += 1
+                    elif count > peak:
+                        peak = count
+                peaks[pid] = peak
+        return peaks
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis" if self._redis is not None else "memory",
+            "window_minutes": self.window_minutes,
+            "tracked_products": len(self._buffers),
+            "max_products": self.max_products,
+            "ingested": self.ingested,
+            "late_dropped": self.late_dropped,
+            "evictions": self.evictions,
+            "redis_errors": self.redis_errors,
+        }
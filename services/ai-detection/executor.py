@@ -0,0 +1,106 @@
+"""
+Engine Execution Layer
+Runs CPU-bound engine calls off the event loop so /health and /metrics
+stay responsive while long computations are in flight.
+
+Every engine is assigned a lane:
+  - "thread":  shared thread pool — for NumPy-heavy engines that release the GIL
+  - "process": shared process pool — for pure-Python engines that hold the GIL
+
+Each lane has its own concurrency limit (an asyncio.Semaphore, which
+wakes waiters in FIFO order). The thread pool is sized to the sum of the
+thread-lane limits, so one lane saturating its quota can never occupy the
+threads another lane needs: a burst of heavy Monte Carlo calls queues
+behind its own limit while fraud scoring keeps its slots.
+
+Environment overrides:
+  ENGINE_LIMITS="monte_carlo=1,fraud=16"   per-lane concurrency
+  ENGINE_PROCESS_WORKERS=4                 process pool size; 0 (default)
+                                           runs process lanes on threads,
+                                           which suits 1-CPU containers
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+
+def _parse_limits(raw: str) -> dict[str, int]:
+    limits = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = max(1, int(value))
+    return limits
+
+
+class _Lane:
+    __slots__ = ("kind", "limit", "semaphore", "running", "waiting")
+
+    def __init__(self, kind: str, limit: int) -> None:
+        self.kind = kind
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.running = 0
+        self.waiting = 0
+
+
+class EngineExecutor:
+    """Per-service thread/process pools with per-engine concurrency limits."""
+
+    def __init__(self, lanes: dict[str, tuple[str, int]]) -> None:
+        overrides = _parse_limits(os.getenv("ENGINE_LIMITS", ""))
+        self.process_workers = int(os.getenv("ENGINE_PROCESS_WORKERS", "0"))
+        self._lanes: dict[str, _Lane] = {}
+        for name, (kind, limit) in lanes.items():
+            if kind == "process" and self.process_workers <= 0:
+                kind = "thread"
+            self._lanes[name] = _Lane(kind, overrides.get(name, limit))
+
+        self.thread_workers = sum(l.limit for l in self._lanes.values() if l.kind == "thread") or 1
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+
+    def _pool(self, kind: str) -> Executor:
+        if kind == "process":
+            if self._processes is None:
+                # forkserver: safe to start from a process that already runs threads
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="engine")
+        return self._threads
+
+    async def run(self, lane: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` in the lane's pool once a lane slot is free.
+        Process lanes need a picklable module-level ``fn`` and arguments."""
+        l = self._lanes[lane]
+        l.waiting += 1
+        async with l.semaphore:
+            l.waiting -= 1
+            l.running += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pool(l.kind), partial(fn, *args, **kwargs))
+            finally:
+                l.running -= 1
+
+    def stats(self) -> dict:
+        return {
+            name: {"kind": l.kind, "limit": l.limit, "running": l.running, "waiting": l.waiting}
+            for name, l in self._lanes.items()
+        }
+
+    def shutdown(self) -> None:
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
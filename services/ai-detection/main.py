@@ -5,20 +5,52 @@ FastAPI microservice for real-time fraud, anomaly, and risk detection.
 Engines: Fraud Detection, Anomaly Detector, Risk Radar
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Any
+import os
 import time
 
+import orjson
 from prometheus_fastapi_instrumentator import Instrumentator
 
-from engines import fraud, anomaly, risk_radar
+from engines import fraud, anomaly, anomaly_stream, velocity, risk_radar
+from executor import EngineExecutor
+from cache import ResponseCache
+from responses import DirectRoute, NumpyJSONResponse, render
+from schemas import Alert, FullScanData, Leak, Partner, RadarData, Scan, Shipment, TrustScore
+
+# Fraud scoring is latency-sensitive and mostly NumPy; the velocity tracker
+# holds in-process state, so anomaly stays on threads.
+engine_pool = EngineExecutor({
+    "fraud": ("thread", 8),
+    "anomaly": ("thread", 2),
+    "risk_radar": ("process", 2),
+})
+
+
+# Opt-in per route: only deterministic engines go through the cache
+response_cache = ResponseCache("ai-detection")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    engine_pool.shutdown()
+    await response_cache.close()
+
 
 app = FastAPI(
     title="TrustChecker AI Detection",
     version="1.0.0",
     description="Real-time fraud, anomaly, and risk detection engines",
+    lifespan=lifespan,
+    default_response_class=NumpyJSONResponse,
 )
+# Render engine output with orjson directly, without the jsonable_encoder pass
+app.router.route_class = DirectRoute
 
 Instrumentator().instrument(app).expose(app, endpoint="/metrics")
 
@@ -30,6 +62,8 @@ async def health():
         "service": "ai-detection",
         "version": "1.0.0",
         "engines": ["fraud", "anomaly", "risk_radar"],
+        "executor": engine_pool.stats(),
+        "cache": response_cache.stats(),
     }
 
 
@@ -38,63 +72,165 @@ class FraudAnalyzeRequest(BaseModel):
     scan_event: dict[str, Any]
     context: dict[str, Any] = Field(default_factory=dict)
 
+class FraudAnalyzeBatchRequest(BaseModel):
+    items: list[FraudAnalyzeRequest] = Field(max_length=10000)
+
 @app.post("/fraud/analyze")
 async def fraud_analyze(req: FraudAnalyzeRequest):
-    return fraud.analyze(req.scan_event, req.context)
+    return await engine_pool.run("fraud", fraud.analyze, req.scan_event, req.context)
+
+@app.post("/fraud/analyze-batch")
+async def fraud_analyze_batch(req: FraudAnalyzeBatchRequest):
+    return await engine_pool.run("fraud", fraud.analyze_batch, [{"scan_event": it.scan_event, "context": it.context} for it in req.items])
 
 
 # ─── Anomaly Detection ───────────────────────────────────────
 class AnomalyScanRequest(BaseModel):
-    data: dict[str, Any]
+    data: FullScanData
 
 class AnomalyVelocityRequest(BaseModel):
-    scan_events: list[dict[str, Any]]
+    scan_events: list[Scan]
     window_minutes: int = 60
 
 class AnomalyFraudSpikesRequest(BaseModel):
-    fraud_alerts: list[dict[str, Any]]
+    fraud_alerts: list[Alert]
 
 class AnomalyTrustDropsRequest(BaseModel):
-    trust_scores: list[dict[str, Any]]
+    trust_scores: list[TrustScore]
 
 class AnomalyGeoRequest(BaseModel):
-    scan_events: list[dict[str, Any]]
+    scan_events: list[Scan]
     window_hours: int = 1
 
+class VelocityIngestRequest(BaseModel):
+    scan_events: list[Scan]
+
+# Long-lived detector fed by /anomaly/velocity/ingest; windows are shared
+# through Redis (VELOCITY_REDIS_URL / REDIS_URL), else per worker
+velocity_tracker = velocity.VelocityTracker(
+    window_minutes=int(os.getenv("VELOCITY_WINDOW_MINUTES", "60")),
+    max_products=int(os.getenv("VELOCITY_MAX_PRODUCTS", "100000")),
+    max_events_per_product=int(os.getenv("VELOCITY_MAX_EVENTS_PER_PRODUCT", "1000")),
+)
+
 @app.post("/anomaly/full-scan")
 async def anomaly_full_scan(req: AnomalyScanRequest):
-    return anomaly.run_full_scan(req.data)
+    return await engine_pool.run("anomaly", anomaly.run_full_scan, req.data)
+
+class NDJSONDuplexResponse(StreamingResponse):
+    """Streaming response whose body iterator also consumes the request stream.
+
+    Starlette's StreamingResponse listens for disconnects on ``receive`` while
+    streaming, which would swallow request body chunks; here a disconnect
+    surfaces as ClientDisconnect from ``request.stream()`` instead.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+async def _ndjson_chunks(request: Request):
+    """Yield [(line_no, raw line)] per received chunk, skipping blank lines."""
+    buf = b""
+    line_no = 0
+    async for chunk in request.stream():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        batch = []
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                batch.append((line_no, line))
+        if batch:
+            yield batch
+    if buf.strip():
+        yield [(line_no + 1, buf)]
+
+
+def _ndjson(kind: str, payload: dict) -> bytes:
+    return render({"kind": kind, **payload}) + b"\n"
+
+
+def _scan_chunk(scan: anomaly_stream.FullScanStream, lines: list[tuple[int, bytes]]) -> bytes:
+    """Parse and fold one chunk of NDJSON lines; return the output lines."""
+    out = []
+    for line_no, raw in lines:
+        try:
+            record = orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            out.append(_ndjson("error", {"line": line_no, "error": str(e)}))
+            continue
+        if not isinstance(record, dict):
+            out.append(_ndjson("error", {"line": line_no, "error": "expected a JSON object"}))
+            continue
+        try:
+            anomalies = scan.feed(record)
+        except ValueError as e:  # pydantic ValidationError included
+            out.append(_ndjson("error", {"line": line_no, "error": str(e)}))
+            continue
+        out.extend(_ndjson("anomaly", a) for a in anomalies)
+    return b"".join(out)
+
+
+def _scan_close(scan: anomaly_stream.FullScanStream) -> bytes:
+    return b"".join(_ndjson("anomaly", a) for a in scan.close()) + _ndjson("summary", scan.summary())
+
+
+@app.post("/anomaly/full-scan/stream")
+async def anomaly_full_scan_stream(request: Request, grouped: bool = False):
+    """NDJSON in, NDJSON out: anomalies are written as products finalize,
+    followed by a single ``{"kind": "summary", ...}`` line. Each received
+    chunk is parsed and folded on the anomaly lane, one at a time."""
+    scan = anomaly_stream.FullScanStream(
+        grouped=grouped, max_products=int(os.getenv("FULL_SCAN_STREAM_MAX_PRODUCTS", "10000")))
+
+    async def body():
+        async for lines in _ndjson_chunks(request):
+            out = await engine_pool.run("anomaly", _scan_chunk, scan, lines)
+            if out:
+                yield out
+        yield await engine_pool.run("anomaly", _scan_close, scan)
+
+    return NDJSONDuplexResponse(body())
 
 @app.post("/anomaly/scan-velocity")
 async def anomaly_scan_velocity(req: AnomalyVelocityRequest):
-    return anomaly.detect_scan_velocity(req.scan_events, req.window_minutes)
+    return await engine_pool.run("anomaly", anomaly.detect_scan_velocity, req.scan_events, req.window_minutes)
+
+@app.post("/anomaly/velocity/ingest")
+async def anomaly_velocity_ingest(req: VelocityIngestRequest):
+    anomalies = await engine_pool.run("anomaly", velocity_tracker.ingest, req.scan_events)
+    return {"anomalies": anomalies, "tracker": velocity_tracker.stats()}
 
 @app.post("/anomaly/fraud-spikes")
 async def anomaly_fraud_spikes(req: AnomalyFraudSpikesRequest):
-    return anomaly.detect_fraud_spikes(req.fraud_alerts)
+    return await engine_pool.run("anomaly", anomaly.detect_fraud_spikes, req.fraud_alerts)
 
 @app.post("/anomaly/trust-drops")
 async def anomaly_trust_drops(req: AnomalyTrustDropsRequest):
-    return anomaly.detect_trust_drops(req.trust_scores)
+    return await engine_pool.run("anomaly", anomaly.detect_trust_drops, req.trust_scores)
 
 @app.post("/anomaly/geo-dispersion")
 async def anomaly_geo(req: AnomalyGeoRequest):
-    return anomaly.detect_geo_dispersion(req.scan_events, req.window_hours)
+    return await engine_pool.run("anomaly", anomaly.detect_geo_dispersion, req.scan_events, req.window_hours)
 
 
 # ─── Risk Radar ──────────────────────────────────────────────
 class RiskRadarRequest(BaseModel):
-    data: dict[str, Any] = Field(default_factory=dict)
+    data: RadarData = Field(default_factory=RadarData)
 
 class RiskHeatmapRequest(BaseModel):
-    partners: list[dict[str, Any]] = []
-    shipments: list[dict[str, Any]] = []
-    leaks: list[dict[str, Any]] = []
+    partners: list[Partner] = []
+    shipments: list[Shipment] = []
+    leaks: list[Leak] = []
 
 @app.post("/risk-radar/compute")
 async def radar_compute(req: RiskRadarRequest):
-    return risk_radar.compute_radar(req.data)
+    return await engine_pool.run("risk_radar", risk_radar.compute_radar, req.data)
 
 @app.post("/risk-radar/heatmap")
 async def radar_heatmap(req: RiskHeatmapRequest):
-    return risk_radar.generate_heatmap(req.partners, req.shipments, req.leaks)
+    async def compute():
+        return await engine_pool.run("risk_radar", risk_radar.generate_heatmap, req.partners, req.shipments, req.leaks)
+    return await response_cache.fetch("risk_heatmap", req, risk_radar.ENGINE_VERSION, compute)
@@ -0,0 +1,639 @@
+"""
+Redis Queue Worker Runtime
+Shared job loop behind each service's worker.py.
+
+  fetch (main thread)  ─ claim ─▶  pool (N threads or processes)
+                                        │ encoded result
+  writer thread  ◀──────────────────────┘  batched SETEX + ack via one pipeline
+
+Jobs come from two kinds of source:
+  - plain lists ``queue:<name>`` (LMOVE / BLMOVE)
+  - Node's priority sorted sets ``pqueue:<name>`` (ZPOPMAX / BZPOPMAX),
+    scored by PRIORITY (critical 100 … free 10) in server/queue.js
+
+When both have work, picks are shared by smooth weighted round robin
+(WORKER_PRIORITY_WEIGHT pqueue picks per list pick), so bulk list jobs
+still progress. Inside the sorted sets, the lowest-priority job is aged:
+once it has waited WORKER_MAX_WAIT_S it is taken with ZPOPMIN ahead of
+higher classes. Queue wait (now - createdAt) is tracked per priority
+class, logged every WORKER_STATS_INTERVAL_S and accumulated in the
+``queue_wait:<service>`` hash (``<class>:count`` / ``<class>:sum_ms``).
+When everything is empty the fetcher blocks on one source at a time for
+WORKER_IDLE_BLOCK_S, rotating between them.
+
+Reliable processing:
+  - claiming a job moves it into this worker's ``processing:<service>:<id>``
+    list in the same step (LMOVE, or a Lua ZPOPMAX + RPUSH for pqueues);
+    the idle BZPOPMAX wake-up is the one claim done in two commands
+  - the worker holds a lease in ``leases:<service>`` (score = deadline),
+    renewed every third of WORKER_VISIBILITY_TIMEOUT_S
+  - success writes the result and removes the job from the processing
+    list (ack) in one MULTI; a failure re-queues it with attempts + 1
+    after WORKER_RETRY_DELAYS_MS (server/queue.js RETRY_DELAYS), waiting
+    in the processing list so a crash meanwhile still recovers it
+  - a batch whose MULTI keeps failing is dead-lettered, and if even that
+    fails its job ids are logged (they stay claimed until recovery)
+  - any worker's heartbeat reaps leases that have expired: the dead
+    worker's jobs are moved into its own processing list, then re-queued
+  - once attempts reach the job's maxRetries (WORKER_MAX_ATTEMPTS when
+    unset) it goes to ``dlq:queue:<name>`` in the entry format of
+    server/events/dead-letter.js; malformed and unknown jobs go straight there
+A worker restarted under the same hostname and pid (pid 1 in a container)
+re-queues whatever its previous incarnation left in its processing list.
+
+The fetcher keeps up to ``concurrency + prefetch`` jobs claimed, so a
+worker that finishes always finds the next job already waiting in the
+pool's queue. Results are encoded in the pool (JSON by default, see
+result_codec for msgpack / zstd) and written in pipelined batches
+instead of one round trip per job.
+
+SIGTERM/SIGINT stop fetching; jobs already claimed (running or
+prefetched) are drained and their results flushed before exit.
+
+Environment:
+  WORKER_CONCURRENCY    jobs run at once (default: CPUs the container may use, from the
+                        cgroup quota and CPU affinity; not the host's core count)
+  WORKER_POOL           thread | process (default per service)
+  WORKER_PREFETCH       extra jobs claimed ahead of the pool (default: concurrency, at most 2)
+  WORKER_RESULT_BATCH   max results per pipeline (default 64)
+  WORKER_FLUSH_MS       max time a result waits for its batch (default 20)
+  WORKER_PRIORITY_WEIGHT  pqueue picks per list pick under contention (default 3)
+  WORKER_MAX_WAIT_S     age after which a low-priority job is served (default 30)
+  WORKER_IDLE_BLOCK_S   blocking pop timeout while idle (default 0.5)
+  WORKER_STATS_INTERVAL_S queue-wait log interval (default 60)
+  WORKER_VISIBILITY_TIMEOUT_S  lease length before a silent worker's jobs are re-queued (default 60)
+  WORKER_MAX_ATTEMPTS   attempts for jobs without maxRetries (default 3, as server/queue.js)
+  WORKER_RETRY_DELAYS_MS  delay before attempt 2, 3, … (default 1000,5000,15000 as server/queue.js)
+
+Process pools fork after the handlers are registered, so handler lambdas
+are inherited rather than pickled.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import queue
+import secrets
+import signal
+import socket
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, NamedTuple
+
+import redis
+
+from result_codec import ResultCodec
+
+RESULT_TTL = 3600
+DLQ_TTL = 30 * 86400  # DLQ_MAX_AGE_DAYS in server/events/dead-letter.js
+
+# server/queue.js PRIORITY weights → class names (default 30 reads as core)
+PRIORITY_CLASSES = {100: "critical", 80: "enterprise", 60: "pro", 30: "core", 10: "free"}
+DEFAULT_PRIORITY = 30
+MAX_DEFAULT_PREFETCH = 2
+
+# Atomically pop the top (or bottom) job across the sorted sets in KEYS[2..]
+# and append it to the processing list KEYS[1]. Returns {key, member, score}.
+_CLAIM_ZSET = """
+local top = ARGV[1] == 'max'
+local best, best_score
+for i = 2, #KEYS do
+  local head = top and redis.call('ZRANGE', KEYS[i], -1, -1, 'WITHSCORES')
+                   or redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+  if head[1] then
+    local s = tonumber(head[2])
+    if not best_score or (top and s > best_score) or (not top and s < best_score) then
+      best, best_score = i, s
+    end
+  end
+end
+if not best then return nil end
+local popped = redis.call(top and 'ZPOPMAX' or 'ZPOPMIN', KEYS[best])
+redis.call('RPUSH', KEYS[1], popped[1])
+return {KEYS[best], popped[1], popped[2]}
+"""
+
+# Set before the pool starts; forked pool processes inherit them
+_HANDLERS: dict[str, Callable[[dict], Any]] = {}
+_CODEC = ResultCodec("json", compress_min_bytes=0)
+
+
+def _run_job(name: str, data: dict) -> tuple[str | bytes, int]:
+    """Run one handler and encode its result (executes inside the pool)."""
+    t0 = time.time()
+    result = _HANDLERS[name](data)
+    return _CODEC.encode(result), round((time.time() - t0) * 1000)
+
+
+def available_cpus() -> int:
+    """CPUs this process may actually use: the affinity mask, further capped
+    by a cgroup CPU quota (v2 cpu.max, v1 cfs_quota_us), rounded up."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        cpus = os.cpu_count() or 1
+    for path, parse in (
+        ("/sys/fs/cgroup/cpu.max", lambda text: text.split()),
+        ("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", lambda text: [text.strip(), _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")]),
+    ):
+        try:
+            quota, period = parse(_read(path))
+            if quota not in ("max", "-1"):
+                return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+        except (OSError, ValueError):
+            continue
+    return max(1, cpus)
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def priority_class(score: float | None) -> str:
+    if score is None:
+        return "list"
+    return PRIORITY_CLASSES.get(int(score), f"p{int(score)}")
+
+
+class Claim(NamedTuple):
+    raw: str                # exact string held in the processing list
+    source: str             # queue:* list or pqueue:* sorted set it came from
+    score: float | None     # priority for pqueue jobs
+
+
+class WaitStats:
+    """Queue-wait samples per priority class since the last report."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque] = {}
+
+    def record(self, cls: str, wait_ms: float) -> None:
+        with self._lock:
+            self._samples.setdefault(cls, deque(maxlen=10_000)).append(wait_ms)
+
+    def drain(self) -> dict[str, list[float]]:
+        with self._lock:
+            out = {c: list(s) for c, s in self._samples.items() if s}
+            self._samples.clear()
+        return out
+
+
+class QueueWorker:
+    """Concurrent consumer of list and priority queues with leased claims,
+    retries and pipelined result writes."""
+
+    def __init__(
+        self, service: str, queues: list[str], handlers: dict[str, Callable[[dict], Any]],
+        redis_url: str, priority_queues: list[str] | None = None, default_pool: str = "thread",
+    ) -> None:
+        self.service = service
+        self.queues = queues
+        self.priority_queues = priority_queues or []
+        self.redis_url = redis_url
+        self.concurrency = max(1, int(os.getenv("WORKER_CONCURRENCY") or available_cpus()))
+        self.pool_kind = os.getenv("WORKER_POOL", default_pool)
+        self.prefetch = max(0, int(os.getenv("WORKER_PREFETCH") or min(self.concurrency, MAX_DEFAULT_PREFETCH)))
+        self.batch_size = max(1, int(os.getenv("WORKER_RESULT_BATCH", "64")))
+        self.flush_s = int(os.getenv("WORKER_FLUSH_MS", "20")) / 1000
+        self.priority_weight = max(1, int(os.getenv("WORKER_PRIORITY_WEIGHT", "3")))
+        self.max_wait_s = float(os.getenv("WORKER_MAX_WAIT_S", "30"))
+        self.idle_block_s = float(os.getenv("WORKER_IDLE_BLOCK_S", "0.5"))
+        self.stats_interval_s = float(os.getenv("WORKER_STATS_INTERVAL_S", "60"))
+        self.visibility_s = float(os.getenv("WORKER_VISIBILITY_TIMEOUT_S", "60"))
+        self.max_attempts = max(1, int(os.getenv("WORKER_MAX_ATTEMPTS", "3")))
+        self.retry_delays_s = [int(d) / 1000 for d in os.getenv("WORKER_RETRY_DELAYS_MS", "1000,5000,15000").split(",")]
+
+        global _CODEC
+        _HANDLERS.clear()
+        _HANDLERS.update(handlers)
+        _CODEC = ResultCodec()
+
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._processing_prefix = f"processing:{service}:"
+        self.processing_key = self._processing_prefix + self.worker_id
+        self.lease_key = f"leases:{service}"
+
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()   # set once results are flushed; ends the heartbeat
+        self._slots = threading.BoundedSemaphore(self.concurrency + self.prefetch)
+        self._results: queue.Queue = queue.Queue()
+        self._delayed: list[tuple[float, int, tuple]] = []   # (due, seq, failed item), writer thread only
+        self._delayed_seq = itertools.count()
+        self.wait_stats = WaitStats()
+        self._stats_key = f"queue_wait:{service}"
+        # Smooth weighted round robin state: "pqueue" vs "list"
+        self._weights = {"pqueue": self.priority_weight if self.priority_queues else 0, "list": 1 if queues else 0}
+        self._current = {k: 0 for k in self._weights}
+        self._idle_sources = list(queues) + (["pqueue"] if self.priority_queues else [])
+        self._idle_turn = 0   # which source to block on when idle
+        self._last_age_check = 0.0
+        self._last_report = time.monotonic()
+        self._claim_zset = None
+
+    # ─── Lifecycle ───────────────────────────────────────────
+    def _make_pool(self) -> Executor:
+        if self.pool_kind == "process":
+            pool = ProcessPoolExecutor(self.concurrency, mp_context=multiprocessing.get_context("fork"))
+            pool.submit(int).result()  # fork the workers now, before any thread starts
+            return pool
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix="job")
+
+    def _on_signal(self, signum, _frame) -> None:
+        print(f"🛑 {signal.Signals(signum).name}: draining in-flight jobs")
+        self._stopping.set()
+
+    def run(self) -> None:
+        print(f"🚀 AI {self.service.title()} Worker {self.worker_id} connecting to {self.redis_url} "
+              f"({self.concurrency} × {self.pool_kind}, prefetch {self.prefetch}, "
+              f"sources {self.queues + self.priority_queues}, results {_CODEC.content_type})")
+        pool = self._make_pool()
+        r = redis.from_url(self.redis_url, decode_responses=True)
+        self._claim_zset = r.register_script(_CLAIM_ZSET)
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+        self._renew_lease(r)
+        self._recover(r, self.processing_key, "worker restarted before finishing the job")
+        heartbeat = threading.Thread(target=self._heartbeat, args=(r,), name="heartbeat", daemon=True)
+        heartbeat.start()
+        writer = threading.Thread(target=self._write_results, args=(r,), name="result-writer")
+        writer.start()
+        try:
+            self._fetch_loop(r, pool)
+        finally:
+            pool.shutdown(wait=True)      # drain running + prefetched jobs
+            self._results.put(None)       # then flush and stop the writer
+            writer.join()
+            self._stopped.set()
+            heartbeat.join()
+            self._report_waits(r)
+            try:
+                r.zrem(self.lease_key, self.worker_id)
+            except Exception as e:
+                print(f"❌ Failed to release lease: {e}")
+            print(f"👋 AI {self.service.title()} Worker stopped")
+
+    # ─── Fetch ───────────────────────────────────────────────
+    def _fetch_loop(self, r: redis.Redis, pool: Executor) -> None:
+        while not self._stopping.is_set():
+            if time.monotonic() - self._last_report >= self.stats_interval_s:
+                self._report_waits(r)
+            if not self._slots.acquire(timeout=1):
+                continue
+            try:
+                claim = self._next_job(r)
+            except Exception as e:
+                self._slots.release()
+                print(f"❌ Worker error: {e}")
+                time.sleep(1)  # Back off on error
+                continue
+            if not claim:
+                self._slots.release()
+                continue
+            if not self._submit(pool, claim):
+                self._slots.release()
+
+    def _next_job(self, r: redis.Redis) -> Claim | None:
+        """Claim the next job: aged low-priority job first, then weighted
+        round robin between pqueues and lists, else block briefly."""
+        aged = self._claim_aged(r)
+        if aged:
+            return aged
+
+        # Smooth weighted round robin: try sources by accumulated credit
+        for kind in self._weights:
+            self._current[kind] += self._weights[kind]
+        order = sorted((k for k in self._weights if self._weights[k]), key=lambda k: -self._current[k])
+        for kind in order:
+            claim = self._claim_priority(r) if kind == "pqueue" else self._claim_list(r)
+            if claim:
+                self._current[kind] -= sum(self._weights.values())
+                return claim
+
+        # Nothing ready anywhere: block on one source, rotating.
+        # Credit isn't banked while idle.
+        self._current = {k: 0 for k in self._weights}
+        if not self._idle_sources:
+            return None
+        self._idle_turn = (self._idle_turn + 1) % len(self._idle_sources)
+        source = self._idle_sources[self._idle_turn]
+        if source == "pqueue":
+            popped = r.bzpopmax(self.priority_queues, timeout=self.idle_block_s)
+            if not popped:
+                return None
+            r.rpush(self.processing_key, popped[1])
+            return Claim(popped[1], popped[0], popped[2])
+        raw = r.blmove(source, self.processing_key, self.idle_block_s, "LEFT", "RIGHT")
+        return Claim(raw, source, None) if raw is not None else None
+
+    def _claim_priority(self, r: redis.Redis, keys: list[str] | None = None, mode: str = "max") -> Claim | None:
+        """Move the highest-priority pqueue job (lowest with mode="min")
+        into the processing list."""
+        claimed = self._claim_zset(keys=[self.processing_key, *(keys or self.priority_queues)], args=[mode])
+        return Claim(claimed[1], claimed[0], float(claimed[2])) if claimed else None
+
+    def _claim_list(self, r: redis.Redis) -> Claim | None:
+        for key in self.queues:
+            raw = r.lmove(key, self.processing_key, "LEFT", "RIGHT")
+            if raw is not None:
+                return Claim(raw, key, None)
+        return None
+
+    def _claim_aged(self, r: redis.Redis) -> Claim | None:
+        """Starvation guard: serve the lowest-priority job (ZPOPMIN) once it
+        has waited ``max_wait_s``. Checked at most once per second."""
+        now = time.monotonic()
+        if not self.priority_queues or now - self._last_age_check < 1:
+            return None
+        self._last_age_check = now
+        for key in self.priority_queues:
+            # Equal scores sort by member; Node job JSON starts with a
+            # Date.now()-prefixed id, so rank 0 is the oldest lowest-class job
+            head = r.zrange(key, 0, 0, withscores=True)
+            if not head:
+                continue
+            try:
+                created = json.loads(head[0][0]).get("createdAt")
+            except ValueError:
+                created = None
+            if created and time.time() * 1000 - created >= self.max_wait_s * 1000:
+                claim = self._claim_priority(r, [key], "min")
+                if claim:
+                    return claim
+        return None
+
+    def _submit(self, pool: Executor, claim: Claim) -> bool:
+        try:
+            job = json.loads(claim.raw)
+        except ValueError as e:
+            print(f"❌ Malformed job: {e}")
+            self._results.put(("dead", claim, f"Malformed job: {e}", None))
+            return False
+        name = job.get("name", "unknown")
+        job_id = job.get("id", "?")
+        created = job.get("createdAt")
+        if isinstance(created, (int, float)):
+            self.wait_stats.record(priority_class(claim.score), max(0.0, time.time() * 1000 - created))
+        if name not in _HANDLERS:
+            print(f"⚠️ Unknown job type: {name}")
+            self._results.put(("dead", claim, f"Unknown job type: {name}", None))
+            return False
+
+        print(f"📋 Processing job {job_id}: {name}")
+        future = pool.submit(_run_job, name, job.get("data", {}))
+        future.add_done_callback(lambda f: self._on_done(claim, job_id, f))
+        return True
+
+    def _on_done(self, claim: Claim, job_id: str, future: Future) -> None:
+        self._slots.release()
+        try:
+            body, elapsed = future.result()
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            stack = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            self._results.put(("failed", claim, str(e) or type(e).__name__, stack))
+            return
+        print(f"✅ Job {job_id} completed in {elapsed}ms ({len(body)} bytes)")
+        self._results.put(("ok", claim, job_id, body))
+
+    # ─── Leases ──────────────────────────────────────────────
+    def _renew_lease(self, r: redis.Redis) -> None:
+        r.zadd(self.lease_key, {self.worker_id: time.time() + self.visibility_s})
+
+    def _heartbeat(self, r: redis.Redis) -> None:
+        """Renew this worker's lease and reap expired ones until stopped."""
+        while not self._stopped.wait(self.visibility_s / 3):
+            try:
+                self._renew_lease(r)
+                self._reap(r)
+            except Exception as e:
+                print(f"❌ Heartbeat error: {e}")
+
+    def _reap(self, r: redis.Redis) -> None:
+        for worker_id in r.zrangebyscore(self.lease_key, "-inf", time.time()):
+            if worker_id == self.worker_id:
+                continue
+            n = self._recover(r, self._processing_prefix + worker_id,
+                              f"visibility timeout: worker {worker_id} stopped heartbeating")
+            r.zrem(self.lease_key, worker_id)
+            if n:
+                print(f"♻️ Re-queued {n} jobs from expired worker {worker_id}")
+
+    def _recover(self, r: redis.Redis, processing_key: str, error: str) -> int:
+        """Move every job in ``processing_key`` into our own processing list
+        (atomic per job, so concurrent reapers never share one), then
+        re-queue or dead-letter them and drop them from our list."""
+        raws = []
+        if processing_key == self.processing_key:
+            raws = r.lrange(processing_key, 0, -1)
+        else:
+            while (raw := r.lmove(processing_key, self.processing_key, "LEFT", "RIGHT")) is not None:
+                raws.append(raw)
+        if not raws:
+            return 0
+        pipe = r.pipeline(transaction=True)
+        for raw in raws:
+            self._retry(pipe, Claim(raw, *self._origin(raw)), error, None)
+        pipe.execute()
+        return len(raws)
+
+    def _origin(self, raw: str) -> tuple[str, float | None]:
+        """Best guess at where an orphaned job came from. Every source of
+        this worker runs the same handlers, so the first list is a safe
+        fallback."""
+        try:
+            job = json.loads(raw)
+        except ValueError:
+            job = {}
+        pkey = f"pqueue:{job.get('queue')}" if isinstance(job, dict) else ""
+        if pkey in self.priority_queues:
+            return pkey, float(job.get("priority") or DEFAULT_PRIORITY)
+        if self.queues:
+            return self.queues[0], None
+        return self.priority_queues[0], float(DEFAULT_PRIORITY)
+
+    # ─── Retry / DLQ ─────────────────────────────────────────
+    def _retry_delay(self, claim: Claim) -> float:
+        """Seconds to hold a failed job before re-queueing it; 0 when this
+        failure sends it to the DLQ."""
+        try:
+            job = json.loads(claim.raw)
+        except ValueError:
+            return 0.0
+        if not isinstance(job, dict):
+            return 0.0
+        attempts = int(job.get("attempts") or 0) + 1
+        if attempts >= int(job.get("maxRetries") or self.max_attempts):
+            return 0.0
+        return self.retry_delays_s[min(attempts, len(self.retry_delays_s)) - 1] if self.retry_delays_s else 0.0
+
+    def _retry(self, pipe, claim: Claim, error: str, stack: str | None) -> None:
+        """Queue ops (on ``pipe``) that re-queue the job with attempts + 1,
+        or dead-letter it once its attempts are used up, and ack its claim."""
+        try:
+            job = json.loads(claim.raw)
+        except ValueError:
+            job = None
+        pipe.lrem(self.processing_key, 1, claim.raw)
+        if not isinstance(job, dict):
+            self._dead_letter(pipe, claim, claim.raw, error, stack, 0)
+            return
+        job["attempts"] = int(job.get("attempts") or 0) + 1
+        if job["attempts"] >= int(job.get("maxRetries") or self.max_attempts):
+            self._dead_letter(pipe, claim, job, error, stack, job["attempts"])
+            return
+        payload = json.dumps(job)
+        if claim.source.startswith("pqueue:"):
+            pipe.zadd(claim.source, {payload: claim.score if claim.score is not None else DEFAULT_PRIORITY})
+        else:
+            pipe.rpush(claim.source, payload)
+        print(f"🔁 Job {job.get('id', '?')} re-queued (attempt {job['attempts']}): {error}")
+
+    def _dead_letter(self, pipe, claim: Claim, event: Any, error: str, stack: str | None, attempts: int) -> None:
+        """Same entry shape and key as dead-letter.js push(`queue:${job.queue}`, ...)."""
+        queue_name = event.get("queue") if isinstance(event, dict) else None
+        if not queue_name:
+            queue_name = claim.source.split(":", 1)[1]
+        group = f"queue:{queue_name}"
+        entry = {
+            "id": f"dlq-{int(time.time() * 1000)}-{secrets.token_hex(4)}",
+            "consumerGroup": group,
+            "event": event,
+            "error": error,
+            "stack": stack,
+            "attempts": attempts,
+            "originalQueue": queue_name,
+            "pushedAt": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "replayed": False,
+        }
+        pipe.lpush(f"dlq:{group}", json.dumps(entry))
+        pipe.expire(f"dlq:{group}", DLQ_TTL)
+        print(f"💀 [DLQ] {group}: {error}")
+
+    # ─── Results ─────────────────────────────────────────────
+    def _write_results(self, r: redis.Redis) -> None:
+        done = False
+        while not done:
+            batch = []
+            try:
+                item = self._results.get(timeout=self._next_retry_in())
+            except queue.Empty:
+                item = False  # woke up for a due retry
+            if item is None:
+                done = True
+            elif item:
+                batch.append(item)
+                deadline = time.monotonic() + self.flush_s
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._results.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        done = True
+                        break
+                    batch.append(item)
+            # Failures wait out their retry delay; on shutdown they go now
+            now = time.monotonic()
+            ready = []
+            for item in batch:
+                delay = self._retry_delay(item[1]) if item[0] == "failed" and not done else 0.0
+                if delay > 0:
+                    heapq.heappush(self._delayed, (now + delay, next(self._delayed_seq), item))
+                else:
+                    ready.append(item)
+            while self._delayed and (done or self._delayed[0][0] <= now):
+                ready.append(heapq.heappop(self._delayed)[2])
+            if ready:
+                self._flush(r, ready)
+
+    def _next_retry_in(self) -> float | None:
+        if not self._delayed:
+            return None
+        return max(0.0, self._delayed[0][0] - time.monotonic())
+
+    def _report_waits(self, r: redis.Redis) -> None:
+        """Log queue-wait percentiles per class and add counts/sums to Redis."""
+        self._last_report = time.monotonic()
+        samples = self.wait_stats.drain()
+        if not samples:
+            return
+        pipe = r.pipeline(transaction=False)
+        parts = []
+        for cls, waits in sorted(samples.items()):
+            waits.sort()
+            p50 = waits[len(waits) // 2]
+            p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+            parts.append(f"{cls}: n={len(waits)} p50={p50:.0f}ms p95={p95:.0f}ms max={waits[-1]:.0f}ms")
+            pipe.hincrby(self._stats_key, f"{cls}:count", len(waits))
+            pipe.hincrbyfloat(self._stats_key, f"{cls}:sum_ms", sum(waits))
+        print("⏱️ Queue wait — " + "; ".join(parts))
+        try:
+            pipe.execute()
+        except Exception as e:
+            print(f"❌ Failed to store queue-wait stats: {e}")
+
+    def _flush(self, r: redis.Redis, batch: list[tuple]) -> None:
+        """Write results and acks (or retries) for a batch in one MULTI, so a
+        job leaves the processing list exactly when its outcome is stored.
+        A failed execute() resets the pipeline, so each attempt rebuilds it."""
+        error: Exception | None = None
+        for attempt in range(3):
+            pipe = r.pipeline(transaction=True)
+            self._queue_batch(pipe, batch)
+            try:
+                pipe.execute()
+                return
+            except Exception as e:
+                error = e
+                print(f"❌ Failed to store {len(batch)} results (attempt {attempt + 1}): {e}")
+                if attempt < 2:
+                    time.sleep(2 ** attempt)
+        self._abandon(r, batch, f"Failed to store result: {error}")
+
+    def _queue_batch(self, pipe, batch: list[tuple]) -> None:
+        for kind, claim, a, b in batch:
+            if kind == "ok":
+                pipe.setex(f"result:{a}", RESULT_TTL, b)
+                pipe.lrem(self.processing_key, 1, claim.raw)
+            elif kind == "failed":
+                self._retry(pipe, claim, a, b)
+            else:  # dead: malformed or unknown, retrying can't help
+                pipe.lrem(self.processing_key, 1, claim.raw)
+                self._dead_letter(pipe, claim, self._event(claim), a, b, 0)
+
+    @staticmethod
+    def _event(claim: Claim) -> Any:
+        try:
+            return json.loads(claim.raw)
+        except ValueError:
+            return claim.raw
+
+    def _abandon(self, r: redis.Redis, batch: list[tuple], error: str) -> None:
+        """Last resort for a batch that could not be written: dead-letter
+        every job (replayable from the DLQ), else log what is left behind."""
+        pipe = r.pipeline(transaction=True)
+        for _, claim, _, _ in batch:
+            event = self._event(claim)
+            attempts = int(event.get("attempts") or 0) if isinstance(event, dict) else 0
+            pipe.lrem(self.processing_key, 1, claim.raw)
+            self._dead_letter(pipe, claim, event, error, None, attempts)
+        try:
+            pipe.execute()
+        except Exception as e:
+            events = [self._event(claim) for _, claim, _, _ in batch]
+            ids = [str(ev.get("id", "?")) if isinstance(ev, dict) else "?" for ev in events]
+            # Still in the processing list: a restart under the same id (or a
+            # lapsed lease) re-queues them
+            print(f"❌ Could not store or dead-letter jobs {', '.join(ids)}: {e}")
@@ -0,0 +1,193 @@
+"""
+Payload Schemas
+Typed records for the entity lists the Node server posts (scans,
+shipments, partners, events, inventory, …).
+
+Records are slotted Pydantic dataclasses: each payload is validated once
+at the edge (request model or queue job) into compact objects with
+fixed attributes, and engines read ``s.status`` instead of repeated
+``s.get("status")`` dict lookups. Keys a record doesn't declare are
+dropped during validation, so a large payload no longer keeps every
+unused column alive for the length of the request.
+
+Field defaults follow the engines' historic ``.get(key, default)`` calls;
+an explicit null stays None, as it did with dicts. Where engines disagree
+on a default the field defaults to None and each engine applies its own.
+
+The same file is shipped in every service so a Shipment means the same
+thing everywhere.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Union
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from pydantic.dataclasses import dataclass
+
+Id = Union[str, int]
+Number = Union[int, float]          # smart union keeps ints as ints in responses
+Timestamp = Union[str, int, float]  # ISO string as sent by Node; epochs tolerated
+
+record = dataclass(slots=True, config=ConfigDict(extra="ignore"))
+
+
+# ─── Records ─────────────────────────────────────────────────────
+@record
+class Scan:
+    product_id: Id | None = "unknown"
+    scanned_at: Timestamp | None = None
+    created_at: Timestamp | None = None
+    latitude: Number | None = None
+    longitude: Number | None = None
+
+
+@record
+class Alert:
+    id: Id | None = None
+    product_id: Id | None = None
+    partner_id: Id | None = None
+    alert_type: str | None = None
+    severity: str | None = None
+    created_at: Timestamp | None = None
+
+
+@record
+class TrustScore:
+    product_id: Id | None = None
+    score: Number | None = 0
+    calculated_at: Timestamp | None = None
+
+
+@record
+class Partner:
+    id: Id | None = None
+    name: str | None = None
+    type: str | None = None
+    country: str | None = None
+    region: str | None = None
+    trust_score: Number | None = 50
+    kyc_status: str | None = None
+    status: str | None = None
+    api_key: str | None = None
+    created_at: Timestamp | None = None
+
+
+@record
+class Shipment:
+    id: Id | None = None
+    batch_id: Id | None = None
+    from_partner_id: Id | None = None
+    to_partner_id: Id | None = None
+    carrier: str | None = None
+    status: str | None = None
+    created_at: Timestamp | None = None
+    estimated_delivery: Timestamp | None = None
+    actual_delivery: Timestamp | None = None
+    current_lat: Number | None = None
+    current_lng: Number | None = None
+
+
+@record
+class Event:
+    id: Id | None = None
+    product_id: Id | None = None
+    batch_id: Id | None = None
+    partner_id: Id | None = None
+    location: str | None = None
+    event_type: str | None = "other"
+    blockchain_seal_id: Id | None = None
+    created_at: Timestamp | None = None
+
+
+@record
+class InventoryItem:
+    id: Id | None = None
+    product_id: Id | None = None
+    partner_id: Id | None = None
+    quantity: Number | None = 0
+    min_stock: Number | None = 10
+    max_stock: Number | None = None
+    date: Timestamp | None = None
+
+
+@record
+class Product:
+    id: Id | None = None
+    name: str | None = None
+    category: str | None = None
+
+
+@record
+class Batch:
+    id: Id | None = None
+    status: str | None = None
+
+
+@record
+class Leak:
+    region_detected: str | None = "Unknown"
+    risk_score: Number | None = 0.5
+    listing_price: Number | None = None
+    authorized_price: Number | None = None
+
+
+@record
+class Violation:
+    partner_id: Id | None = None
+    severity: str | None = None
+    penalty_amount: Number | None = 0
+
+
+@record
+class Certification:
+    expiry_date: Timestamp | None = None
+
+
+@record
+class Sustainability:
+    overall_score: Number | None = 50
+
+
+# ─── Payload groups ──────────────────────────────────────────────
+class _Payload(BaseModel):
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
+
+class FullScanData(_Payload):
+    scans: list[Scan] = []
+    fraud_alerts: list[Alert] = Field(default_factory=list, alias="fraudAlerts")
+    trust_scores: list[TrustScore] = Field(default_factory=list, alias="trustScores")
+
+
+class RadarData(_Payload):
+    partners: list[Partner] = []
+    shipments: list[Shipment] = []
+    violations: list[Violation] = []
+    leaks: list[Leak] = []
+    alerts: list[Alert] = []
+    inventory: list[InventoryItem] = []
+    certifications: list[Certification] = []
+    sustainability: list[Sustainability] = []
+
+
+class TwinData(_Payload):
+    partners: list[Partner] = []
+    products: list[Product] = []
+    batches: list[Batch] = []
+    shipments: list[Shipment] = []
+    inventory: list[InventoryItem] = []
+    events: list[Event] = []
+    seals: list[Any] = []
+
+
+# ─── Queue jobs ──────────────────────────────────────────────────
+_ADAPTERS: dict[type, TypeAdapter] = {}
+
+
+def records(cls: type, items: list | None) -> list:
+    """Validate a raw list (e.g. from a queue job) into ``cls`` records."""
+    adapter = _ADAPTERS.get(cls)
+    if adapter is None:
+        adapter = _ADAPTERS[cls] = TypeAdapter(list[cls])
+    return adapter.validate_python(items or [])
@@ -0,0 +1,170 @@
+"""
+Admission Control
+Per-request cost estimates checked against a per-worker in-flight budget.
+
+Each endpoint has an estimator that turns the request into a Cost — peak
+bytes the engine will allocate and CPU-seconds it will burn. A request is
+admitted only while the sum over admitted, unfinished requests stays
+within both budgets; otherwise it is shed with 429 + Retry-After before
+any work is done. A request that alone exceeds a budget can never be
+admitted and gets 413.
+
+Budgets are per gunicorn worker (each worker is its own process and
+memory space), so size them as container memory / worker count:
+  ADMISSION_MAX_BYTES        default 1 GiB
+  ADMISSION_MAX_CPU_SECONDS  default 8
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from contextlib import asynccontextmanager
+from typing import Any, NamedTuple
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+
+from engines import holt_winters, monte_carlo
+from schemas import TwinData
+
+MAX_BYTES = int(os.getenv("ADMISSION_MAX_BYTES", str(1 << 30)))
+MAX_CPU_SECONDS = float(os.getenv("ADMISSION_MAX_CPU_SECONDS", "8"))
+
+# Monte Carlo peak per (simulation, shipment) cell: delays, costs, one f8
+# random/temporary buffer and three bool masks, rounded up.
+MC_BYTES_PER_CELL = 40
+# Sobol adds the (n, 4 × shipments) point matrix and its integer state
+MC_SOBOL_BYTES_PER_CELL = 48
+MC_CPU_SECONDS_PER_CELL = 25e-9
+
+REJECTED = Counter(
+    "admission_rejected_total", "Requests shed by admission control",
+    ["endpoint", "reason"],
+)
+IN_FLIGHT_BYTES = Gauge("admission_in_flight_bytes", "Estimated bytes of admitted requests")
+IN_FLIGHT_CPU = Gauge("admission_in_flight_cpu_seconds", "Estimated CPU-seconds of admitted requests")
+
+
+class Cost(NamedTuple):
+    bytes: int
+    cpu_seconds: float
+
+
+# ─── Estimators ──────────────────────────────────────────────────
+def _int_param(params: dict, key: str, default: int) -> int:
+    try:
+        return max(int(params.get(key, default)), 1)
+    except (TypeError, ValueError):
+        return default
+
+
+def estimate_monte_carlo(params: dict[str, Any], simulations: int) -> Cost:
+    simulations = max(simulations, 1)
+    shipments = _int_param(params, "shipments_per_month", 100)
+    block_cells = _int_param(params, "block_cells", monte_carlo.BLOCK_CELLS)
+    # Memory: one block per worker in flight, plus the per-simulation cost/delay vectors
+    # unless quantiles come from the sketch
+    block = min(simulations, monte_carlo.block_size(shipments, block_cells))
+    workers = min(monte_carlo.resolve_workers(params), -(-simulations // block))
+    per_cell = MC_BYTES_PER_CELL
+    if params.get("variance_reduction") == "sobol":
+        per_cell += MC_SOBOL_BYTES_PER_CELL
+    peak = workers * block * shipments * per_cell
+    if params.get("exact_percentiles", True):
+        peak += simulations * 24
+    cells = simulations * shipments
+    return Cost(peak, cells * MC_CPU_SECONDS_PER_CELL)
+
+
+def estimate_monte_carlo_sweep(params: dict[str, Any], simulations: int, scenarios: int) -> Cost:
+    # Draws are shared; each scenario re-evaluates the block (~40% of a run's
+    # per-cell CPU) and keeps its own per-simulation vectors
+    base = estimate_monte_carlo(params, simulations)
+    vectors = simulations * 24 if params.get("exact_percentiles", True) else 0
+    return Cost(
+        base.bytes + (scenarios - 1) * vectors,
+        base.cpu_seconds * (0.6 + 0.4 * scenarios),
+    )
+
+
+def estimate_holt_winters(n_points: int, periods_ahead: int, season_length: int = 7, optimize: bool = False) -> Cost:
+    # Pure-Python loop over the series: ~1µs and a few boxed floats per point
+    n = n_points + periods_ahead
+    cost = Cost(64 * 1024 + n * 200, 1e-3 + n * 1e-6)
+    if optimize:
+        # Grid pass holds a (sets, season_length) seasonal matrix plus a dozen
+        # per-set vectors; grid + L-BFGS-B run ~0.6ms of array ops per point
+        sets = len(holt_winters.GRID_ALPHA) * len(holt_winters.GRID_BETA) * len(holt_winters.GRID_GAMMA)
+        cost = Cost(cost.bytes + sets * (max(season_length, 1) + 16) * 8, cost.cpu_seconds + n_points * 600e-6)
+    return cost
+
+
+def estimate_digital_twin(data: dict[str, Any] | TwinData) -> Cost:
+    # dict() also unpacks a validated TwinData into its field lists
+    items = sum(len(v) for v in dict(data).values() if isinstance(v, (list, dict)))
+    return Cost(64 * 1024 + items * 2048, 1e-3 + items * 20e-6)
+
+
+WHAT_IF_COST = Cost(64 * 1024, 1e-3)
+
+
+# ─── Budget ──────────────────────────────────────────────────────
+class AdmissionController:
+    """In-flight byte/CPU budget. All bookkeeping runs on the event loop,
+    so no locking is needed."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES, max_cpu_seconds: float = MAX_CPU_SECONDS) -> None:
+        self.max_bytes = max_bytes
+        self.max_cpu_seconds = max_cpu_seconds
+        self.bytes = 0
+        self.cpu_seconds = 0.0
+        self.in_flight = 0
+
+    def _check(self, endpoint: str, cost: Cost) -> None:
+        if cost.bytes > self.max_bytes or cost.cpu_seconds > self.max_cpu_seconds:
+            REJECTED.labels(endpoint, "too_large").inc()
+            raise HTTPException(413, detail={
+                "error": "request exceeds the per-worker budget",
+                "estimated_bytes": cost.bytes,
+                "estimated_cpu_seconds": round(cost.cpu_seconds, 3),
+                "max_bytes": self.max_bytes,
+                "max_cpu_seconds": self.max_cpu_seconds,
+            })
+        if self.bytes + cost.bytes > self.max_bytes or self.cpu_seconds + cost.cpu_seconds > self.max_cpu_seconds:
+            reason = "bytes" if self.bytes + cost.bytes > self.max_bytes else "cpu"
+            REJECTED.labels(endpoint, reason).inc()
+            # Work already admitted drains in roughly its CPU estimate
+            retry_after = max(1, math.ceil(self.cpu_seconds))
+            raise HTTPException(
+                429,
+                detail={"error": "simulation capacity exhausted", "retry_after_s": retry_after},
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    @asynccontextmanager
+    async def admit(self, endpoint: str, cost: Cost):
+        """Reserve ``cost`` for the body of the block or raise 429/413."""
+        self._check(endpoint, cost)
+        self.bytes += cost.bytes
+        self.cpu_seconds += cost.cpu_seconds
+        self.in_flight += 1
+        IN_FLIGHT_BYTES.set(self.bytes)
+        IN_FLIGHT_CPU.set(self.cpu_seconds)
+        try:
+            yield
+        finally:
+            self.bytes -= cost.bytes
+            self.cpu_seconds -= cost.cpu_seconds
+            self.in_flight -= 1
+            IN_FLIGHT_BYTES.set(self.bytes)
+            IN_FLIGHT_CPU.set(self.cpu_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "max_cpu_seconds": self.max_cpu_seconds,
+        }
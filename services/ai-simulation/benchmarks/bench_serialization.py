@@ -0,0 +1,79 @@
+"""
+Response Serialization Benchmark
+FastAPI's default rendering (jsonable_encoder walk + json.dumps) vs
+responses.render (orjson, NumPy-aware) on representative engine output
+for each endpoint. Engine time is excluded: each result is computed
+once, then only its serialization is timed.
+
+Usage (from services/ai-simulation):
+    python benchmarks/bench_serialization.py [scale]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines import digital_twin, holt_winters, monte_carlo, what_if  # noqa: E402
+from responses import NumpyJSONResponse  # noqa: E402
+from schemas import TwinData  # noqa: E402
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _twin_data(rng, n: int) -> TwinData:
+    return TwinData.model_validate({
+        "partners": [{"id": f"PT{i}", "name": f"Partner {i}", "type": "supplier", "trust_score": int(rng.integers(20, 100)),
+                      "country": "VN"} for i in range(n)],
+        "products": [{"id": f"P{i}", "name": f"Product {i}", "category": "tea"} for i in range(n * 4)],
+        "batches": [{"id": f"B{i}", "product_id": f"P{rng.integers(n * 4)}", "quantity": int(rng.integers(10, 500)),
+                     "status": "active"} for i in range(n * 4)],
+        "shipments": [{"id": f"S{i}", "from_partner_id": f"PT{rng.integers(n)}", "to_partner_id": f"PT{rng.integers(n)}",
+                       "status": "delivered" if rng.random() < 0.8 else "in_transit",
+                       "estimated_delivery": "2026-01-10", "actual_delivery": "2026-01-11"} for i in range(n * 10)],
+        "inventory": [{"product_id": f"P{i}", "partner_id": f"PT{rng.integers(n)}", "quantity": int(rng.integers(500)),
+                       "min_stock": 50, "max_stock": 400} for i in range(n * 4)],
+        "events": [{"event_type": "scan", "partner_id": f"PT{rng.integers(n)}"} for _ in range(n * 20)],
+    })
+
+
+def cases(scale: float):
+    rng = np.random.default_rng(42)
+    n = lambda k: max(1, int(k * scale))  # noqa: E731
+    series = (100 + 20 * np.sin(np.arange(n(730)) * 2 * np.pi / 7) + rng.normal(0, 5, n(730))).tolist()
+    twin = _twin_data(rng, n(200))
+    mc_params = {"shipments_per_month": 200, "seed": 1}
+    yield "/monte-carlo/run", lambda: monte_carlo.run(mc_params, n(20000))
+    yield "/monte-carlo/sweep", lambda: monte_carlo.sweep(
+        mc_params, {"disruption_prob": [0.02, 0.05, 0.1, 0.2], "avg_delay": [1, 3, 5]}, n(5000), "factorial")
+    yield "/digital-twin/build", lambda: digital_twin.build_model(twin)
+    yield "/digital-twin/kpis", lambda: digital_twin.compute_kpis(twin)
+    yield "/digital-twin/anomalies", lambda: digital_twin.detect_anomalies(twin)
+    yield "/holt-winters/forecast", lambda: holt_winters.forecast(series, 7, n(90), {})
+    yield "/what-if/simulate", lambda: what_if.simulate({"type": "demand_surge", "demand_spike_pct": 40}, {})
+
+
+def main(scale: float = 1.0) -> None:
+    print(f"{'endpoint':<26} {'bytes':>10} {'default':>10} {'orjson':>10} {'speedup':>8}")
+    for endpoint, compute in cases(scale):
+        result = compute()
+        size = len(NumpyJSONResponse(result).body)
+        t_default = _best_of(lambda: JSONResponse(jsonable_encoder(result)).body)
+        t_orjson = _best_of(lambda: NumpyJSONResponse(result).body)
+        print(f"{endpoint:<26} {size:>10} {t_default * 1000:>8.2f}ms {t_orjson * 1000:>8.2f}ms {t_default / t_orjson:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
@@ -9,51 +9,53 @@ from __future__ import annotations
 
 from datetime import datetime, timezone, timedelta
 from collections import defaultdict
-from typing import Any
 import copy
 import json
 
+from engines.timestamps import parse_iso
+from schemas import TwinData
 
-def build_model(data: dict[str, Any] | None = None) -> dict:
+
+def build_model(data: TwinData | None = None) -> dict:
     """Build supply chain digital twin from live data."""
-    data = data or {}
-    partners = data.get("partners", [])
-    products = data.get("products", [])
-    batches = data.get("batches", [])
-    shipments = data.get("shipments", [])
-    inventory = data.get("inventory", [])
-    events = data.get("events", [])
-    seals = data.get("seals", [])
+    data = data or TwinData()
+    partners = data.partners
+    products = data.products
+    batches = data.batches
+    shipments = data.shipments
+    inventory = data.inventory
+    events = data.events
+    seals = data.seals
 
     # Pre-build inventory lookup by partner_id: O(partners + inventory) vs O(partners × inventory)
     inv_by_partner: dict[str, int] = defaultdict(int)
     for i in inventory:
-        pid = i.get("partner_id")
+        pid = i.partner_id
         if pid:
-            inv_by_partner[pid] += i.get("quantity", 0)
+            inv_by_partner[pid] += i.quantity
 
     # Node layer
     nodes = []
     for p in partners:
         nodes.append({
-            "id": p.get("id"),
-            "name": p.get("name"),
-            "type": p.get("type", "partner"),
-            "country": p.get("country"),
-            "trust_score": p.get("trust_score", 50),
-            "status": p.get("status", "active"),
-            "inventory_level": inv_by_partner[p.get("id")],
+            "id": p.id,
+            "name": p.name,
+            "type": p.type if p.type is not None else "partner",
+            "country": p.country,
+            "trust_score": p.trust_score,
+            "status": p.status if p.status is not None else "active",
+            "inventory_level": inv_by_partner[p.id],
         })
 
     # Edge layer
     flow_map: dict[str, dict] = {}
     for s in shipments:
-        key = f"{s.get('from_partner_id')}→{s.get('to_partner_id')}"
+        key = f"{s.from_partner_id}→{s.to_partner_id}"
         if key not in flow_map:
             flow_map[key] = {"count": 0, "volume": 0, "delays": 0}
         flow_map[key]["count"] += 1
-        if s.get("status") == "delivered" and s.get("actual_delivery") and s.get("estimated_delivery"):
-            if s["actual_delivery"] > s["estimated_delivery"]:
+        if s.status == "delivered" and s.actual_delivery and s.estimated_delivery:
+            if s.actual_delivery > s.estimated_delivery:
                 flow_map[key]["delays"] += 1
 
     edges = []
@@ -68,9 +70,9 @@ def build_model(data: dict[str, Any] | None = None) -> dict:
             "reliability": round((1 - stats["delays"] / cnt) * 100) if cnt else 100,
         })
 
-    in_transit = [s for s in shipments if s.get("status") == "in_transit"]
-    total_inv = sum(i.get("quantity", 0) for i in inventory)
-    low_stock = sum(1 for i in inventory if i.get("quantity", 0) <= i.get("min_stock", 10))
+    in_transit = [s for s in shipments if s.status == "in_transit"]
+    total_inv = sum(i.quantity for i in inventory)
+    low_stock = sum(1 for i in inventory if i.quantity <= i.min_stock)
 
     overall = "healthy" if low_stock == 0 and len(in_transit) < 20 else ("critical" if low_stock > 5 else "warning")
     inv_health = "optimal" if low_stock == 0 else ("stress" if low_stock <= 3 else "critical")
@@ -88,7 +90,7 @@ def build_model(data: dict[str, Any] | None = None) -> dict:
         },
         "state": {
             "products_tracked": len(products),
-            "batches_active": sum(1 for b in batches if b.get("status") != "completed"),
+            "batches_active": sum(1 for b in batches if b.status != "completed"),
             "batches_total": len(batches),
             "shipments_in_transit": len(in_transit),
             "total_inventory_units": total_inv,
@@ -105,41 +107,43 @@ def build_model(data: dict[str, Any] | None = None) -> dict:
     }
 
 
-def compute_kpis(data: dict[str, Any] | None = None) -> dict:
+def compute_kpis(data: TwinData | None = None) -> dict:
     """Compute Key Performance Indicators for the supply chain."""
-    data = data or {}
-    shipments = data.get("shipments", [])
-    inventory = data.get("inventory", [])
-    events = data.get("events", [])
-    batches = data.get("batches", [])
+    data = data or TwinData()
+    shipments = data.shipments
+    inventory = data.inventory
+    events = data.events
+    batches = data.batches
 
-    delivered = [s for s in shipments if s.get("status") == "delivered"]
+    delivered = [s for s in shipments if s.status == "delivered"]
     on_time = [
         s for s in delivered
-        if s.get("actual_delivery") and s.get("estimated_delivery")
-        and s["actual_delivery"] <= s["estimated_delivery"]
+        if s.actual_delivery and s.estimated_delivery
+        and s.actual_delivery <= s.estimated_delivery
     ]
     perfect_order_rate = round(len(on_time) / len(delivered) * 100) if delivered else 0
 
-    total_demand = sum(i.get("max_stock", 100) for i in inventory)
-    total_stock = sum(i.get("quantity", 0) for i in inventory)
+    total_demand = sum((i.max_stock if i.max_stock is not None else 100) for i in inventory)
+    total_stock = sum(i.quantity for i in inventory)
     fill_rate = min(100, round(total_stock / total_demand * 100)) if total_demand else 0
 
     avg_cycle = 0.0
     if delivered:
         cycles = []
         for s in delivered:
-            if s.get("actual_delivery") and s.get("created_at"):
+            if s.actual_delivery and s.created_at:
+                d1 = parse_iso(s.actual_delivery)
+                d2 = parse_iso(s.created_at)
+                if d1 is None or d2 is None:
+                    continue
                 try:
-                    d1 = datetime.fromisoformat(s["actual_delivery"].replace("Z", "+00:00"))
-                    d2 = datetime.fromisoformat(s["created_at"].replace("Z", "+00:00"))
                     cycles.append((d1 - d2).total_seconds() / 86400)
-                except Exception:
+                except TypeError:  # naive vs aware
                     pass
         if cycles:
             avg_cycle = round(sum(cycles) / len(cycles), 1)
 
-    sell_ship = [e for e in events if e.get("event_type") in ("sell", "ship")]
+    sell_ship = [e for e in events if e.event_type in ("sell", "ship")]
     avg_inv = total_stock / max(len(inventory), 1)
     turnover = round(len(sell_ship) / avg_inv, 2) if avg_inv else 0
 
@@ -151,12 +155,12 @@ def compute_kpis(data: dict[str, Any] | None = None) -> dict:
     # Single-pass: parse datetime once per event, count recent
     recent_events = 0
     for e in events:
-        dt = _parse_dt(e.get("created_at"))
+        dt = parse_iso(e.created_at)
         if dt and dt > cutoff:
             recent_events += 1
     velocity = round(recent_events / 7, 1)
 
-    sealed = sum(1 for e in events if e.get("blockchain_seal_id"))
+    sealed = sum(1 for e in events if e.blockchain_seal_id)
     integrity = round(sealed / len(events) * 100) if events else 0
 
     def _status(val, bench, higher_better=True):
@@ -180,25 +184,25 @@ def compute_kpis(data: dict[str, Any] | None = None) -> dict:
     }
 
 
-def detect_anomalies(data: dict[str, Any] | None = None) -> dict:
+def detect_anomalies(data: TwinData | None = None) -> dict:
     """Detect discrepancies between twin model and reality."""
-    data = data or {}
-    inventory = data.get("inventory", [])
-    shipments = data.get("shipments", [])
-    events = data.get("events", [])
+    data = data or TwinData()
+    inventory = data.inventory
+    shipments = data.shipments
+    events = data.events
     anomalies = []
 
     # Single pass: check both understock and overstock in one loop
     for i in inventory:
-        qty = i.get("quantity", 0)
-        min_s = i.get("min_stock", 10)
-        max_s = i.get("max_stock", 1000)
+        qty = i.quantity
+        min_s = i.min_stock
+        max_s = i.max_stock if i.max_stock is not None else 1000
         if qty <= min_s:
             anomalies.append({
                 "type": "inventory_critical",
                 "severity": "critical" if qty == 0 else "high",
                 "entity_type": "inventory",
-                "entity_id": i.get("id"),
+                "entity_id": i.id,
                 "message": f"Stock level ({qty}) at or below minimum ({min_s})",
                 "recommended_action": "Trigger emergency replenishment order",
             })
@@ -207,15 +211,15 @@ def detect_anomalies(data: dict[str, Any] | None = None) -> dict:
                 "type": "overstock",
                 "severity": "medium",
                 "entity_type": "inventory",
-                "entity_id": i.get("id"),
+                "entity_id": i.id,
                 "message": f"Stock level ({qty}) exceeds maximum ({max_s})",
                 "recommended_action": "Review demand forecast and adjust procurement plan",
             })
 
     now = datetime.now(timezone.utc)
     for s in shipments:
-        if s.get("status") == "in_transit" and s.get("created_at"):
-            created = _parse_dt(s["created_at"])
+        if s.status == "in_transit" and s.created_at:
+            created = parse_iso(s.created_at)
             if created:
                 days = (now - created).total_seconds() / 86400
                 if days > 14:
@@ -223,7 +227,7 @@ def detect_anomalies(data: dict[str, Any] | None = None) -> dict:
                         "type": "shipment_stuck",
                         "severity": "critical" if days > 30 else "high",
                         "entity_type": "shipment",
-                        "entity_id": s.get("id"),
+                        "entity_id": s.id,
                         "message": f"Shipment stuck in transit for {round(days)} days",
                         "recommended_action": "Contact carrier and activate contingency plan",
                     })
@@ -232,7 +236,7 @@ def detect_anomalies(data: dict[str, Any] | None = None) -> dict:
     cutoff_24h = now - timedelta(hours=24)
     recent = 0
     for e in events:
-        dt = _parse_dt(e.get("created_at"))
+        dt = parse_iso(e.created_at)
         if dt and dt > cutoff_24h:
             recent += 1
     if events and recent == 0:
@@ -300,12 +304,3 @@ def simulate_disruption(model: dict, scenario: dict) -> dict:
         }
 
     return {"error": "Unknown disruption type", "supported": ["node_offline", "capacity_reduction"]}
-
-
-def _parse_dt(val) -> datetime | None:
-    if not val:
-        return None
-    try:
-        return datetime.fromisoformat(str(val).replace("Z", "+00:00"))
-    except Exception:
-        return None
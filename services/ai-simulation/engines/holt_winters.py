@@ -1,18 +1,33 @@
 """
 Holt-Winters Triple Exponential Smoothing
-Seasonal decomposition for demand forecasting.
+Seasonal decomposition for demand forecasting, with optional least-squares
+fitting of the smoothing parameters.
 Ported from server/engines/advanced-scm-ai.js → holtWintersTriple()
 """
 
 import math
 from typing import Any
 
+import numpy as np
+
+# Bump when results change for the same input (invalidates cached responses)
+ENGINE_VERSION = "1"
+
+# optimize=True: coarse grid scored in one vectorized pass (10 × 6 × 10 = 600
+# parameter sets), then L-BFGS-B from the best point with a forward-difference
+# gradient (4 sets per evaluation)
+GRID_ALPHA = GRID_GAMMA = tuple(round(0.05 + 0.1 * i, 2) for i in range(10))
+GRID_BETA = (0.0, 0.05, 0.1, 0.2, 0.3, 0.5)
+REFINE_MAX_ITER = 50
+_FD_STEP = 1e-4
+
 
 def forecast(
     data: list[float],
     season_length: int = 7,
     periods_ahead: int = 14,
     params: dict[str, float] | None = None,
+    optimize: bool = False,
 ) -> dict:
     """
     Holt-Winters Triple Exponential Smoothing.
@@ -22,6 +37,8 @@ def forecast(
         season_length: Seasonality period (7 for weekly, 12 for monthly)
         periods_ahead: Number of periods to forecast
         params: Optional {alpha, beta, gamma} smoothing parameters
+        optimize: Fit alpha/beta/gamma by minimizing the one-step SSE
+            (``params`` is then ignored) and report them as ``fitted_params``
     """
     params = params or {}
     alpha = params.get("alpha", 0.3)
@@ -32,20 +49,11 @@ def forecast(
         return {"forecast": [], "trend": "insufficient_data", "confidence": 0.3}
 
     n = len(data)
-
-    # Initialize seasonal indices
-    num_complete = n // season_length
-    seasons = [0.0] * season_length
-    for i in range(season_length):
-        total = sum(data[j * season_length + i] for j in range(num_complete))
-        seasons[i] = total / num_complete
-
-    avg_season = sum(seasons) / season_length
-    seasons = [s / avg_season if avg_season > 0 else 1.0 for s in seasons]
-
-    # Initialize level and trend
-    level = data[0]
-    trend = (data[season_length] - data[0]) / season_length if n > season_length else 0.0
+    seasons, level, trend = _initial_state(data, season_length)
+    fitted_params = None
+    if optimize:
+        fitted_params = fit(data, season_length)
+        alpha, beta, gamma = fitted_params["alpha"], fitted_params["beta"], fitted_params["gamma"]
     seasonal = list(seasons)
 
     # Fitted values
@@ -83,7 +91,7 @@ def forecast(
     trend_dir = "increasing" if trend > 0.5 else ("decreasing" if trend < -0.5 else "stable")
     confidence = max(0.3, min(0.95, 1 - mape / 100))
 
-    return {
+    result = {
         "forecast": fc,
         "trend": trend_dir,
         "trend_value": round(trend, 2),
@@ -93,3 +101,87 @@ def forecast(
         "data_points": n,
         "season_length": season_length,
     }
+    if fitted_params is not None:
+        result["fitted_params"] = fitted_params
+    return result
+
+
+def _initial_state(data: list[float], season_length: int) -> tuple[list[float], float, float]:
+    """Normalized seasonal indices from the complete seasons, first level and trend."""
+    n = len(data)
+    num_complete = n // season_length
+    seasons = [0.0] * season_length
+    for i in range(season_length):
+        total = sum(data[j * season_length + i] for j in range(num_complete))
+        seasons[i] = total / num_complete
+
+    avg_season = sum(seasons) / season_length
+    seasons = [s / avg_season if avg_season > 0 else 1.0 for s in seasons]
+
+    level = data[0]
+    trend = (data[season_length] - data[0]) / season_length if n > season_length else 0.0
+    return seasons, level, trend
+
+
+def sse(data: list[float], season_length: int, alpha, beta, gamma) -> np.ndarray:
+    """One-step-ahead SSE of the forecast() recursion for P parameter sets at
+    once: the time loop stays in Python, every step is a length-P array op.
+    Each point is predicted from the state before it is seen; forecast()'s
+    fitted values use the already-updated trend, which alpha = beta = 1 turns
+    into an exact echo of the data, so they can't serve as the objective.
+    Diverging sets (overflow or 0/0) score inf."""
+    seasons, level0, trend0 = _initial_state(data, season_length)
+    alpha, beta, gamma = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (alpha, beta, gamma)))
+    alpha, beta, gamma = alpha.ravel(), beta.ravel(), gamma.ravel()
+    a1, b1, g1 = 1 - alpha, 1 - beta, 1 - gamma
+    level = np.full(alpha.shape, float(level0))
+    trend = np.full(alpha.shape, float(trend0))
+    seasonal = np.tile(np.asarray(seasons, dtype=np.float64), (len(alpha), 1))
+    total = np.zeros(alpha.shape)
+
+    with np.errstate(all="ignore"):
+        for i, x in enumerate(np.asarray(data, dtype=np.float64).tolist()):
+            j = i % season_length
+            s = seasonal[:, j].copy()
+            prev_level = level
+            base = prev_level + trend
+            err = x - np.maximum(base * s, 0.0)
+            total += err * err
+            level = alpha * (x / np.where(s == 0, 1.0, s)) + a1 * base
+            trend = beta * (level - prev_level) + b1 * trend
+            seasonal[:, j] = gamma * (x / np.where(level == 0, 1.0, level)) + g1 * s
+    return np.where(np.isfinite(total), total, np.inf)
+
+
+def fit(data: list[float], season_length: int) -> dict:
+    """Least-squares alpha/beta/gamma in [0, 1]: best point of a coarse grid,
+    refined with L-BFGS-B."""
+    from scipy.optimize import minimize
+
+    grid = np.array(np.meshgrid(GRID_ALPHA, GRID_BETA, GRID_GAMMA, indexing="ij")).reshape(3, -1)
+    scores = sse(data, season_length, *grid)
+    best = int(np.argmin(scores))
+    x0, f0 = grid[:, best], float(scores[best])
+    if not math.isfinite(f0):
+        return {"alpha": 0.3, "beta": 0.1, "gamma": 0.3, "sse": None,
+                "grid_points": grid.shape[1], "evaluations": grid.shape[1], "converged": False}
+
+    def objective(x: np.ndarray) -> tuple[float, np.ndarray]:
+        # f(x) and the three forward (backward at the upper bound) differences in one pass
+        steps = np.where(x + _FD_STEP <= 1, _FD_STEP, -_FD_STEP)
+        points = np.repeat(x[:, None], 4, axis=1)
+        points[[0, 1, 2], [1, 2, 3]] += steps
+        f = sse(data, season_length, *points)
+        if not np.isfinite(f).all():
+            return float(np.nan_to_num(f[0], posinf=1e300)), np.zeros(3)
+        return float(f[0]), (f[1:] - f[0]) / steps
+
+    res = minimize(objective, x0, jac=True, method="L-BFGS-B", bounds=[(0, 1)] * 3,
+                   options={"maxiter": REFINE_MAX_ITER})
+    x, f = (res.x, float(res.fun)) if res.fun < f0 else (x0, f0)
+    alpha, beta, gamma = (round(float(v), 4) for v in np.clip(x, 0, 1))
+    return {
+        "alpha": alpha, "beta": beta, "gamma": gamma,
+        "sse": round(f, 4), "grid_points": grid.shape[1], "evaluations": grid.shape[1] + int(res.nfev) * 4,
+        "converged": bool(res.success),
+    }
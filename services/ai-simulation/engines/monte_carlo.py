@@ -8,28 +8,64 @@ Key optimizations:
   - Fully vectorized: zero Python loops in hot path
   - Batch probability sampling (binomial, normal)
   - Vectorized percentile via np.percentile
-  - Optional SciPy for advanced distributions
+  - Blocked generation: peak memory bounded by MC_BLOCK_CELLS, not by
+    simulations × shipments
+  - One SeedSequence child stream per block, blocks run on a thread pool
+    (NumPy releases the GIL) — seeded runs are reproducible for any
+    worker count
+  - Opt-in variance reduction (antithetic, importance, Sobol QMC) with
+    standard errors for every estimate; SciPy only for Sobol
 """
 
+import math
+import os
 import time
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple
 
 import numpy as np
 
+from engines.quantile_sketch import QuantileSketch
+
+# Cells (simulations × shipments) generated per block: ~40 bytes each at peak
+BLOCK_CELLS = int(os.getenv("MC_BLOCK_CELLS", "2000000"))
+MAX_SIMULATIONS = int(os.getenv("MC_MAX_SIMULATIONS", "200000"))
+# Default threads per run; capped by the machine's core count
+DEFAULT_WORKERS = int(os.getenv("MC_WORKERS", "1"))
+
+VARIANCE_REDUCTION_MODES = ("none", "antithetic", "importance", "sobol")
+# Sections used for quantile standard errors (batch quantiles)
+SE_SECTIONS = 10
+# Scrambled Sobol replicates targeted when the simulation budget allows
+SOBOL_REPLICATES = 8
+SOBOL_MAX_DIM = 21201
+# Sweeps: parameters that can vary while the random draws stay common
+SWEEP_PARAMS = (
+    "avg_delay", "delay_stddev", "disruption_prob", "cost_per_delay_hour",
+    "partner_failure_prob", "quality_reject_rate",
+)
+MAX_SWEEP_SCENARIOS = int(os.getenv("MC_MAX_SWEEP_SCENARIOS", "256"))
+# Adaptive mode: simulations per block, and first round before any check
+ADAPTIVE_BLOCK = 1024
+ADAPTIVE_FIRST_ROUND = 4096
+
 
 def _histogram(values: np.ndarray, buckets: int = 10) -> list[dict]:
     """Create histogram buckets from numpy array."""
     if len(values) == 0:
         return []
     counts, edges = np.histogram(values, bins=buckets)
-    n = len(values)
+    return _buckets(counts, edges, len(values))
+
+
+def _buckets(counts: np.ndarray, edges: np.ndarray, n: float) -> list[dict]:
     return [
         {
             "range": f"{round(edges[i])} - {round(edges[i + 1])}",
-            "count": int(counts[i]),
-            "pct": round(int(counts[i]) / n * 100),
+            "count": int(round(counts[i])),
+            "pct": round(float(counts[i]) / n * 100),
         }
-        for i in range(buckets)
+        for i in range(len(counts))
     ]
 
 
@@ -48,13 +84,353 @@ def _recommendations(disruption_rate: float, quality_rate: float, avg_delay: flo
     return recs
 
 
+def block_size(shipments_per_month: int, block_cells: int = BLOCK_CELLS) -> int:
+    """Simulations per block so one block holds about ``block_cells`` cells."""
+    return max(1, block_cells // max(shipments_per_month, 1))
+
+
+def resolve_workers(params: dict[str, Any]) -> int:
+    try:
+        workers = int(params.get("workers", DEFAULT_WORKERS))
+    except (TypeError, ValueError):
+        workers = DEFAULT_WORKERS
+    return max(1, min(workers, os.cpu_count() or 1))
+
+
+def _params(params: dict[str, Any]) -> dict:
+    return {
+        "avg_delay": params.get("avg_delay", 12),
+        "delay_stddev": params.get("delay_stddev", 8),
+        "disruption_prob": params.get("disruption_prob", 0.05),
+        "cost_per_delay_hour": params.get("cost_per_delay_hour", 50),
+        "shipments_per_month": params.get("shipments_per_month", 100),
+        "partner_failure_prob": params.get("partner_failure_prob", 0.02),
+        "quality_reject_rate": params.get("quality_reject_rate", 0.03),
+    }
+
+
+# ─── Random inputs ──────────────────────────────────────────────────
+class BlockDraws(NamedTuple):
+    """Random inputs for a block, each of shape (n, shipments_per_month):
+    standard-normal delay shocks and uniforms for the three Bernoullis."""
+    z: np.ndarray
+    u_disruption: np.ndarray
+    u_partner: np.ndarray
+    u_quality: np.ndarray
+
+
+def _draw_block(rng: np.random.Generator, n: int, shipments: int, method: str = "none") -> BlockDraws:
+    if method == "antithetic":
+        # Pair every draw with its mirror (z ↔ -z, u ↔ 1-u) in adjacent rows
+        h = (n + 1) // 2
+        z = rng.standard_normal((h, shipments))
+        us = [rng.random((h, shipments)) for _ in range(3)]
+
+        def mirror(a, flip):
+            out = np.empty((2 * h, shipments))
+            out[0::2], out[1::2] = a, flip(a)
+            return out[:n]
+        return BlockDraws(mirror(z, np.negative), *(mirror(u, lambda a: 1.0 - a) for u in us))
+
+    if method == "sobol":
+        from scipy.special import ndtri
+        from scipy.stats import qmc
+
+        # One scrambled replicate per block: n is a power of two
+        pts = qmc.Sobol(4 * shipments, scramble=True, seed=rng).random(n).reshape(n, 4, shipments)
+        z = ndtri(np.clip(pts[:, 0], 1e-12, 1 - 1e-12))
+        return BlockDraws(z, pts[:, 1], pts[:, 2], pts[:, 3])
+
+    return BlockDraws(
+        rng.standard_normal((n, shipments)),
+        rng.random((n, shipments)), rng.random((n, shipments)), rng.random((n, shipments)),
+    )
+
+
+# ─── Model ──────────────────────────────────────────────────────────
+class BlockResult(NamedTuple):
+    costs: np.ndarray           # (n,)
+    delays: np.ndarray          # (n,)
+    disrupted: np.ndarray       # (n,) bool
+    quality_failures: int
+    weights: np.ndarray | None  # likelihood ratios (importance sampling)
+
+
+def _tilted(prob: float, trials: int, shift: float) -> float:
+    """Importance-sampling proposal for a rare Bernoulli: move the expected
+    monthly event count ``shift`` standard deviations into the tail."""
+    if not 0 < prob < 0.5:
+        return prob
+    return min(prob + shift * math.sqrt(prob * (1 - prob) / trials), 0.5)
+
+
+def _log_likelihood_ratio(events: np.ndarray, trials: int, p: float, q: float) -> np.ndarray:
+    if p == q:
+        return np.zeros(len(events))
+    return events * math.log(p / q) + (trials - events) * math.log((1 - p) / (1 - q))
+
+
+def _evaluate_block(d: BlockDraws, p: dict, method: str = "none", shift: float = 1.5) -> BlockResult:
+    """
+    Push a block's random inputs through the cost model.
+
+    Under importance sampling the disruption and partner-failure
+    Bernoullis are drawn at tilted probabilities and each simulation
+    carries the likelihood ratio P/Q as its weight.
+    """
+    shipments = p["shipments_per_month"]
+    p_dis, p_par = p["disruption_prob"], p["partner_failure_prob"]
+    q_dis, q_par = p_dis, p_par
+    if method == "importance":
+        q_dis, q_par = _tilted(p_dis, shipments, shift), _tilted(p_par, shipments, shift)
+
+    # 1. Delays: normal distribution, clamp ≥ 0
+    delays = np.maximum(0.0, p["avg_delay"] + p["delay_stddev"] * d.z)
+
+    # 2. Disruption events: Bernoulli per shipment
+    disruptions = d.u_disruption < q_dis
+    partner_failures = d.u_partner < q_par
+    quality_failures = d.u_quality < p["quality_reject_rate"]
+
+    # 3. Compute costs per shipment (vectorized arithmetic)
+    costs = delays * p["cost_per_delay_hour"]                # Base delay cost
+    costs += disruptions * 10_000                             # Disruption penalty
+    costs += partner_failures * 25_000                        # Partner failure penalty
+    costs += quality_failures * 5_000                         # Quality reject cost
+
+    # 4. Additional delays from disruptions and partner failures
+    delays += disruptions * 72                                # 72h disruption delay
+    delays += partner_failures * 120                          # 120h partner failure delay
+
+    weights = None
+    if method == "importance":
+        log_w = _log_likelihood_ratio(disruptions.sum(axis=1), shipments, p_dis, q_dis)
+        log_w += _log_likelihood_ratio(partner_failures.sum(axis=1), shipments, p_par, q_par)
+        weights = np.exp(log_w)
+
+    # 5. Aggregate per simulation (sum across shipments axis)
+    return BlockResult(
+        costs.sum(axis=1),                                    # shape: (n,)
+        delays.sum(axis=1),                                   # shape: (n,)
+        disruptions.any(axis=1),                              # shape: (n,) bool
+        int(np.count_nonzero(quality_failures)),
+        weights,
+    )
+
+
+def _simulate_block(rng: np.random.Generator, n: int, p: dict, method: str = "none", shift: float = 1.5) -> BlockResult:
+    """
+    Simulate ``n`` months of ``shipments_per_month`` shipments.
+    Peak memory is O(n × shipments_per_month).
+    """
+    return _evaluate_block(_draw_block(rng, n, p["shipments_per_month"], method), p, method, shift)
+
+
+# ─── Weighted statistics ────────────────────────────────────────────
+def _weighted_percentile(values: np.ndarray, weights: np.ndarray | None, qs) -> list[float]:
+    if weights is None:
+        return [float(v) for v in np.percentile(values, qs)]
+    order = np.argsort(values)
+    cum = np.cumsum(weights[order])
+    idx = np.searchsorted(cum, np.asarray(qs) / 100 * cum[-1])
+    return [float(v) for v in values[order][np.minimum(idx, len(values) - 1)]]
+
+
+def _tail_mean(values: np.ndarray, weights: np.ndarray | None, threshold: float) -> float:
+    tail = values >= threshold
+    if weights is None:
+        return float(np.mean(values[tail]))
+    return float(values[tail] @ weights[tail] / weights[tail].sum())
+
+
+class _MeanSE:
+    """Streaming weighted mean and its standard error over independent units
+    (simulations, antithetic pairs or Sobol replicates)."""
+
+    __slots__ = ("units", "sw", "swx", "sw2", "sw2x", "sw2x2")
+
+    def __init__(self) -> None:
+        self.units = 0
+        self.sw = self.swx = self.sw2 = self.sw2x = self.sw2x2 = 0.0
+
+    def add(self, x: np.ndarray, w: np.ndarray | None = None) -> None:
+        w = np.ones(len(x)) if w is None else w
+        w2 = w * w
+        self.units += len(x)
+        self.sw += float(w.sum())
+        self.swx += float(w @ x)
+        self.sw2 += float(w2.sum())
+        self.sw2x += float(w2 @ x)
+        self.sw2x2 += float(w2 @ (x * x))
+
+    @property
+    def mean(self) -> float:
+        return self.swx / self.sw if self.sw else 0.0
+
+    @property
+    def standard_error(self) -> float | None:
+        if self.units < 2 or not self.sw:
+            return None
+        mu = self.mean
+        ss = max(self.sw2x2 - 2 * mu * self.sw2x + mu * mu * self.sw2, 0.0)
+        return math.sqrt(ss * self.units / (self.units - 1)) / self.sw
+
+
+def _add_units(acc: _MeanSE, values: np.ndarray, weights: np.ndarray | None, method: str) -> None:
+    """Feed a block into ``acc`` as independent units: antithetic pair
+    means, one Sobol replicate mean, or (weighted) simulations."""
+    if method == "antithetic":
+        pairs = len(values) // 2 * 2
+        acc.add(values[:pairs].reshape(-1, 2).mean(axis=1))
+        if len(values) > pairs:
+            acc.add(values[pairs:])
+    elif method == "sobol":
+        acc.add(np.array([values.mean()]))
+    else:
+        acc.add(values, weights)
+
+
+def _sectioned_se(values: np.ndarray, weights: np.ndarray | None, bounds: list[int]) -> dict:
+    """Standard errors of p95/p99/CVaR from the spread of per-section estimates."""
+    est = []
+    for a, b in zip(bounds, bounds[1:]):
+        v, w = values[a:b], None if weights is None else weights[a:b]
+        p95, p99 = _weighted_percentile(v, w, [95, 99])
+        est.append((p95, p99, _tail_mean(v, w, p95)))
+    if len(est) < 2:
+        return {"p95_cost": None, "p99_cost": None, "cvar_95": None}
+    se = np.std(np.asarray(est), axis=0, ddof=1) / math.sqrt(len(est))
+    return {"p95_cost": float(se[0]), "p99_cost": float(se[1]), "cvar_95": float(se[2])}
+
+
+def _layout(simulations: int, block: int, method: str) -> tuple[int, int]:
+    """(simulations, block) adjusted to the method: antithetic blocks hold
+    whole pairs; Sobol blocks are power-of-two replicates and the budget is
+    rounded down to whole replicates."""
+    if method == "antithetic" and block > 1:
+        block -= block % 2
+    if method == "sobol":
+        target = max(simulations // SOBOL_REPLICATES, 1)
+        block = 1 << int(math.log2(max(min(block, target), 1)))
+        simulations = max(simulations // block, 1) * block
+    return simulations, block
+
+
+class _Accumulator:
+    """Merges block results in order: streaming means/SEs plus either the
+    per-simulation vectors (exact) or quantile sketches."""
+
+    def __init__(self, capacity: int, exact: bool, method: str) -> None:
+        self.exact = exact
+        self.method = method
+        self.weighted = method == "importance"
+        self.n = 0
+        self.blocks = 0
+        self.block_bounds = [0]
+        self.quality_failures = 0
+        self.cost = _MeanSE()
+        self.delay = _MeanSE()
+        self.disrupted = _MeanSE()
+        if exact:
+            self.costs = np.empty(capacity)
+            self.delays = np.empty(capacity)
+            self.weights = np.empty(capacity) if self.weighted else None
+        else:
+            self.cost_sketch, self.delay_sketch = QuantileSketch(), QuantileSketch()
+
+    def add(self, r: BlockResult) -> None:
+        n = len(r.costs)
+        _add_units(self.cost, r.costs, r.weights, self.method)
+        self.delay.add(r.delays, r.weights)
+        self.disrupted.add(r.disrupted.astype(np.float64), r.weights)
+        self.quality_failures += r.quality_failures
+        if self.exact:
+            a, b = self.n, self.n + n
+            self.costs[a:b] = r.costs
+            self.delays[a:b] = r.delays
+            if self.weighted:
+                self.weights[a:b] = r.weights
+        else:
+            self.cost_sketch.add(r.costs, r.weights)
+            self.delay_sketch.add(r.delays, r.weights)
+        self.n += n
+        self.blocks += 1
+        self.block_bounds.append(self.n)
+
+    def _views(self) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+        w = self.weights[:self.n] if self.weighted else None
+        return self.costs[:self.n], self.delays[:self.n], w
+
+    def tail_estimates(self) -> tuple[float, float, float, float]:
+        """(p50, p95, p99, cvar_95) of the monthly cost."""
+        if self.exact:
+            costs, _, w = self._views()
+            p50, p95, p99 = _weighted_percentile(costs, w, [50, 95, 99])
+            return p50, p95, p99, _tail_mean(costs, w, p95)
+        p50, p95, p99 = self.cost_sketch.quantiles([50, 95, 99])
+        return p50, p95, p99, self.cost_sketch.tail_mean(p95)
+
+    def standard_errors(self) -> dict:
+        tail = {"p95_cost": None, "p99_cost": None, "cvar_95": None}
+        if self.exact:
+            costs, _, w = self._views()
+            if self.method == "sobol":
+                bounds = self.block_bounds
+            else:
+                step = max(self.n // SE_SECTIONS // 2 * 2, 2)
+                bounds = list(range(0, self.n - step + 1, step))[:SE_SECTIONS] + [self.n]
+            tail = _sectioned_se(costs, w, bounds)
+        return {"avg_monthly_cost": self.cost.standard_error, **tail}
+
+
 def run(params: dict[str, Any] | None = None, simulations: int = 1000) -> dict:
     """
     Run Monte Carlo risk simulation using vectorized NumPy operations.
 
     Parameters:
         params: Simulation parameters (avg_delay, delay_stddev, disruption_prob, etc.)
-        simulations: Number of iterations (capped at 200_000)
+            plus execution options:
+              block_cells:        cells (simulations × shipments) per block
+              exact_percentiles:  False → quantiles/histograms from a streaming
+                                  sketch (±1% relative) instead of keeping
+                                  per-simulation vectors
+              seed:               makes the run reproducible
+              workers:            threads generating blocks in parallel
+              variance_reduction: "antithetic" | "importance" | "sobol"
+              importance_shift:   how far (in standard deviations of the
+                                  monthly event count) importance sampling
+                                  pushes the rare Bernoullis into the tail (1.5)
+              adaptive:           stop early once converged (see below)
+              rel_tol:            adaptive target relative CI half-width (0.01)
+              confidence:         adaptive CI level (0.95)
+              time_budget_ms:     adaptive wall-clock budget (2000)
+        simulations: Number of iterations (capped at MC_MAX_SIMULATIONS);
+            the upper bound in adaptive mode
+
+    Simulations are generated and reduced in blocks, so peak memory is
+    O(block × shipments_per_month) regardless of the total; each block is
+    an independent draw from the same model, so the result is statistically
+    the same as simulating everything at once. Block i always draws from
+    child i of SeedSequence(seed), so the output depends only on the seed
+    and the block layout, never on how blocks are spread over workers.
+
+    Variance reduction:
+      - antithetic:  each draw is paired with its mirror image (z ↔ -z,
+                     u ↔ 1-u); errors are computed over pair means
+      - importance:  disruption / partner-failure Bernoullis are sampled at
+                     tilted probabilities and reweighted by the likelihood
+                     ratio — more tail scenarios per draw, so p99/CVaR
+                     tighten at the cost of a noisier mean
+      - sobol:       scrambled Sobol points (SciPy); each block is one
+                     independent replicate, errors come from their spread
+    ``estimator.standard_errors`` reports the mean's standard error and,
+    with exact percentiles, batch standard errors of p95/p99/CVaR.
+
+    Adaptive mode runs small blocks in rounds that double the simulation
+    count, and stops as soon as the confidence intervals of
+    avg_monthly_cost, p95_cost and cvar_95 are all within ``rel_tol`` of
+    their estimates, the time budget is spent, or ``simulations`` is
+    reached. It always keeps exact per-simulation vectors.
 
     Performance:
         - 1K sims:   ~1ms
@@ -65,60 +441,147 @@ def run(params: dict[str, Any] | None = None, simulations: int = 1000) -> dict:
     """
     t0 = time.perf_counter()
     params = params or {}
-    simulations = min(max(simulations, 1), 200_000)  # Raised cap from 50K → 200K
+    simulations = min(max(simulations, 1), MAX_SIMULATIONS)
+
+    p = _params(params)
+    shipments_per_month = p["shipments_per_month"]
+    method = params.get("variance_reduction") or "none"
+    error = _check_method(method, shipments_per_month)
+    if error:
+        return error
+    shift = float(params.get("importance_shift", 1.5))
+    adaptive = bool(params.get("adaptive", False))
+    exact = adaptive or params.get("exact_percentiles", True)
+
+    block = block_size(shipments_per_month, int(params.get("block_cells", BLOCK_CELLS)))
+    if adaptive:
+        block = min(block, ADAPTIVE_BLOCK)
+    simulations, block = _layout(simulations, block, method)
+    starts = range(0, simulations, block)
+    workers = min(resolve_workers(params), len(starts))
 
-    # Extract parameters
-    avg_delay = params.get("avg_delay", 12)
-    delay_stddev = params.get("delay_stddev", 8)
-    disruption_prob = params.get("disruption_prob", 0.05)
-    cost_per_delay_hour = params.get("cost_per_delay_hour", 50)
-    shipments_per_month = params.get("shipments_per_month", 100)
-    partner_failure_prob = params.get("partner_failure_prob", 0.02)
-    quality_reject_rate = params.get("quality_reject_rate", 0.03)
+    # Modern PRNG (PCG64) — one independent child stream per block
+    seeds = np.random.SeedSequence(params.get("seed")).spawn(len(starts))
 
-    # Modern PRNG — thread-safe, statistically superior to Mersenne Twister
-    rng = np.random.default_rng()
+    def simulate(i: int) -> BlockResult:
+        n = min(block, simulations - starts[i])
+        return _simulate_block(np.random.default_rng(seeds[i]), n, p, method, shift)
 
     # ───────────────────────────────────────────────────────────────────
-    # VECTORIZED SIMULATION — shape: (simulations, shipments_per_month)
+    # BLOCKED SIMULATION — each block: (block, shipments_per_month)
     # ───────────────────────────────────────────────────────────────────
+    acc = _Accumulator(simulations, exact, method)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="monte-carlo") if workers > 1 else None
+    run_map = pool.map if pool is not None else map
 
-    # 1. Generate all delays at once: normal distribution, clamp ≥ 0
-    delays = np.maximum(0.0, rng.normal(avg_delay, delay_stddev, (simulations, shipments_per_month)))
+    if not adaptive:
+        # Merge in block order so float sums are identical for any worker count
+        for r in run_map(simulate, range(len(starts))):
+            acc.add(r)
+    else:
+        rel_tol = float(params.get("rel_tol", 0.01))
+        z = _z_score(float(params.get("confidence", 0.95)))
+        budget_s = float(params.get("time_budget_ms", 2000)) / 1000
+        target, done = ADAPTIVE_FIRST_ROUND, 0
+        stopped_by = "max_simulations"
+        while done < len(starts):
+            upto = min(max(-(-target // block), done + 1), len(starts))
+            if done:
+                # Don't start more blocks than the remaining budget can pay for
+                per_block = (time.perf_counter() - t0) / done
+                upto = min(upto, done + max(1, int((budget_s - (time.perf_counter() - t0)) / per_block)))
+            for r in run_map(simulate, range(done, upto)):
+                acc.add(r)
+            done = upto
+            rel_errors = _relative_errors(acc, z)
+            if all(e is not None and e <= rel_tol for e in rel_errors.values()):
+                stopped_by = "tolerance"
+                break
+            if time.perf_counter() - t0 >= budget_s:
+                stopped_by = "time_budget"
+                break
+            target *= 2
+    if pool is not None:
+        pool.shutdown()
 
-    # 2. Generate all disruption events: Bernoulli per shipment
-    disruptions = rng.random((simulations, shipments_per_month)) < disruption_prob
-    partner_failures = rng.random((simulations, shipments_per_month)) < partner_failure_prob
-    quality_failures = rng.random((simulations, shipments_per_month)) < quality_reject_rate
+    result = _summarize(acc, shipments_per_month, t0, workers)
+    if adaptive:
+        result["adaptive"] = {
+            "converged": stopped_by == "tolerance",
+            "stopped_by": stopped_by,
+            "simulations_used": acc.n,
+            "max_simulations": simulations,
+            "rel_tol": rel_tol,
+            "confidence": float(params.get("confidence", 0.95)),
+            "relative_errors": {k: _round_opt(v, 5) for k, v in rel_errors.items()},
+        }
+    return result
 
-    # 3. Compute costs per shipment (vectorized arithmetic)
-    costs = delays * cost_per_delay_hour                     # Base delay cost
-    costs += disruptions * 10_000                             # Disruption penalty
-    costs += partner_failures * 25_000                        # Partner failure penalty
-    costs += quality_failures * 5_000                         # Quality reject cost
 
-    # 4. Additional delays from disruptions and partner failures
-    delays += disruptions * 72                                # 72h disruption delay
-    delays += partner_failures * 120                          # 120h partner failure delay
+def _check_method(method: str, shipments_per_month: int) -> dict | None:
+    if method not in VARIANCE_REDUCTION_MODES:
+        return {"error": "Unknown variance reduction mode", "supported": list(VARIANCE_REDUCTION_MODES)}
+    if method == "sobol" and 4 * shipments_per_month > SOBOL_MAX_DIM:
+        return {"error": "Sobol mode supports up to 5300 shipments_per_month"}
+    return None
 
-    # 5. Aggregate per simulation (sum across shipments axis)
-    sim_costs = costs.sum(axis=1)                             # shape: (simulations,)
-    sim_delays = delays.sum(axis=1)                           # shape: (simulations,)
-    sim_disrupted = disruptions.any(axis=1)                   # shape: (simulations,) bool
+
+def _z_score(confidence: float) -> float:
+    """Two-sided normal critical value, e.g. 0.95 → 1.96."""
+    from statistics import NormalDist
+    return NormalDist().inv_cdf(0.5 + min(max(confidence, 0.5), 0.9999) / 2)
+
+
+def _relative_errors(acc: _Accumulator, z: float) -> dict:
+    """CI half-width / |estimate| for the adaptive stopping metrics."""
+    se = acc.standard_errors()
+    _, p95, _, cvar = acc.tail_estimates()
+    est = {"avg_monthly_cost": acc.cost.mean, "p95_cost": p95, "cvar_95": cvar}
+    return {
+        k: (None if se[k] is None or not v else z * se[k] / abs(v))
+        for k, v in est.items()
+    }
+
+
+def _summarize(acc: _Accumulator, shipments_per_month: int, t0: float, workers: int) -> dict:
+    """Turn merged block results into the engine's response."""
+    simulations = acc.n
 
     # ───────────────────────────────────────────────────────────────────
-    # STATISTICS — all vectorized via NumPy
+    # STATISTICS — accumulated sums + exact vectors or sketch
     # ───────────────────────────────────────────────────────────────────
 
-    avg_cost = float(np.mean(sim_costs))
-    disruption_rate = float(np.mean(sim_disrupted))
-    total_quality_failures = int(np.sum(quality_failures))
-    quality_rate = total_quality_failures / (simulations * shipments_per_month)
-    avg_delay_per_ship = float(np.mean(sim_delays)) / shipments_per_month
+    avg_cost = acc.cost.mean
+    disruption_rate = acc.disrupted.mean
+    quality_rate = acc.quality_failures / (simulations * shipments_per_month)
+    avg_delay_per_ship = acc.delay.mean / shipments_per_month
 
-    # Percentiles via np.percentile (no sorting needed)
-    p50_cost, p95_cost, p99_cost = np.percentile(sim_costs, [50, 95, 99])
-    p50_delay, p95_delay, p99_delay = np.percentile(sim_delays, [50, 95, 99])
+    # Percentiles via np.percentile (no sorting needed); weighted under IS
+    p50_cost, p95_cost, p99_cost, cvar_95 = acc.tail_estimates()
+    if acc.exact:
+        sim_costs, sim_delays, sim_weights = acc._views()
+        p50_delay, p95_delay, p99_delay = _weighted_percentile(sim_delays, sim_weights, [50, 95, 99])
+        if acc.weighted:
+            norm = sim_weights * (simulations / sim_weights.sum())
+            cost_buckets = _buckets(*np.histogram(sim_costs, bins=10, weights=norm), simulations)
+            delay_buckets = _buckets(*np.histogram(sim_delays, bins=10, weights=norm), simulations)
+        else:
+            cost_buckets = _histogram(sim_costs, 10)
+            delay_buckets = _histogram(sim_delays, 10)
+    else:
+        p50_delay, p95_delay, p99_delay = acc.delay_sketch.quantiles([50, 95, 99])
+        scale = simulations / acc.cost_sketch.count
+        cost_counts, cost_edges = acc.cost_sketch.histogram(10)
+        delay_counts, delay_edges = acc.delay_sketch.histogram(10)
+        cost_buckets = _buckets(cost_counts * scale, cost_edges, simulations)
+        delay_buckets = _buckets(delay_counts * scale, delay_edges, simulations)
+
+    estimator: dict[str, Any] = {
+        "method": acc.method,
+        "standard_errors": {k: _round_opt(v) for k, v in acc.standard_errors().items()},
+    }
+    if acc.weighted:
+        estimator["effective_sample_size"] = round(acc.cost.sw ** 2 / acc.cost.sw2) if acc.cost.sw2 else 0
 
     elapsed_ms = max(round((time.perf_counter() - t0) * 1000), 1)
 
@@ -138,13 +601,170 @@ def run(params: dict[str, Any] | None = None, simulations: int = 1000) -> dict:
             "p95_delay": round(float(p95_delay), 1),
             "p99_delay": round(float(p99_delay), 1),
             "var_95": round(float(p95_cost) - avg_cost),
-            "cvar_95": round(float(np.mean(sim_costs[sim_costs >= p95_cost]))),
+            "cvar_95": round(cvar_95),
         },
         "distribution": {
-            "cost_buckets": _histogram(sim_costs, 10),
-            "delay_buckets": _histogram(sim_delays, 10),
+            "cost_buckets": cost_buckets,
+            "delay_buckets": delay_buckets,
         },
+        "estimator": estimator,
         "recommendations": _recommendations(disruption_rate, quality_rate, avg_delay_per_ship),
         "_computed_in": "python_numpy",
+        "_quantiles": "exact" if acc.exact else f"sketch(alpha={acc.cost_sketch.alpha})",
+        "_blocks": acc.blocks,
+        "_workers": workers,
         "_engine_ms": elapsed_ms,
     }
+
+
+def _round_opt(v: float | None, digits: int = 2) -> float | None:
+    return None if v is None else round(v, digits)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SCENARIO SWEEPS — common random numbers across grid points
+# ═══════════════════════════════════════════════════════════════════
+
+SWEEP_METRICS = ("avg_monthly_cost", "p95_cost", "cvar_95")
+
+
+def scenario_count(grid: dict[str, list], mode: str = "one_at_a_time") -> int:
+    """Number of scenarios (baseline included) without building them."""
+    if mode == "factorial":
+        return 1 + math.prod(len(v) for v in grid.values())
+    return 1 + sum(len(v) for v in grid.values())
+
+
+def sweep_scenarios(grid: dict[str, list], mode: str = "one_at_a_time") -> list[dict]:
+    """Parameter overrides for each scenario, baseline ({}) first.
+
+    one_at_a_time: each grid value with every other parameter at baseline
+    factorial:     the full cartesian product of the grid
+    """
+    if mode == "factorial":
+        combos = [{}]
+        for name, values in grid.items():
+            combos = [{**c, name: v} for c in combos for v in values]
+        return [{}] + combos
+    return [{}] + [{name: v} for name, values in grid.items() for v in values]
+
+
+def sweep(params: dict[str, Any] | None = None, grid: dict[str, list] | None = None,
+          simulations: int = 1000, mode: str = "one_at_a_time") -> dict:
+    """
+    Sensitivity sweep: run every grid scenario on the same random draws.
+
+    Each block's normal shocks and uniforms are drawn once and pushed
+    through the cost model for every scenario (common random numbers), so
+    differences between scenarios reflect the parameter change rather than
+    sampling noise, and the RNG — most of a run's CPU — is paid once.
+    Accepts the execution options of ``run`` except ``adaptive``.
+
+    Returns per-scenario summaries with deltas against the baseline, and a
+    tornado table ranking parameters by the swing they cause in each
+    metric (for factorial grids, swings of the main effects).
+    """
+    t0 = time.perf_counter()
+    params = params or {}
+    grid = {k: list(v) for k, v in (grid or {}).items() if v}
+    simulations = min(max(simulations, 1), MAX_SIMULATIONS)
+
+    unknown = [k for k in grid if k not in SWEEP_PARAMS]
+    if unknown:
+        return {"error": f"Cannot sweep {', '.join(unknown)}", "supported": list(SWEEP_PARAMS)}
+    if mode not in ("one_at_a_time", "factorial"):
+        return {"error": "Unknown sweep mode", "supported": ["one_at_a_time", "factorial"]}
+    count = scenario_count(grid, mode)
+    if count > MAX_SWEEP_SCENARIOS:
+        return {"error": f"Sweep has {count} scenarios; the limit is {MAX_SWEEP_SCENARIOS}"}
+    overrides = sweep_scenarios(grid, mode)
+
+    base = _params(params)
+    shipments_per_month = base["shipments_per_month"]
+    method = params.get("variance_reduction") or "none"
+    error = _check_method(method, shipments_per_month)
+    if error:
+        return error
+    shift = float(params.get("importance_shift", 1.5))
+    exact = params.get("exact_percentiles", True)
+    scenarios = [{**base, **o} for o in overrides]
+
+    simulations, block = _layout(
+        simulations, block_size(shipments_per_month, int(params.get("block_cells", BLOCK_CELLS))), method,
+    )
+    starts = range(0, simulations, block)
+    workers = min(resolve_workers(params), len(starts))
+    seeds = np.random.SeedSequence(params.get("seed")).spawn(len(starts))
+
+    def simulate(i: int) -> list[BlockResult]:
+        n = min(block, simulations - starts[i])
+        draws = _draw_block(np.random.default_rng(seeds[i]), n, shipments_per_month, method)
+        return [_evaluate_block(draws, sp, method, shift) for sp in scenarios]
+
+    accs = [_Accumulator(simulations, exact, method) for _ in scenarios]
+    # Paired baseline differences: the CRN standard error of each delta
+    diffs = [_MeanSE() for _ in scenarios]
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="monte-carlo") if workers > 1 else None
+    for results in (pool.map if pool is not None else map)(simulate, range(len(starts))):
+        for acc, diff, r in zip(accs, diffs, results):
+            acc.add(r)
+            if method != "importance":
+                _add_units(diff, r.costs - results[0].costs, None, method)
+    if pool is not None:
+        pool.shutdown()
+
+    def metrics(acc: _Accumulator) -> dict:
+        _, p95, _, cvar = acc.tail_estimates()
+        return {"avg_monthly_cost": acc.cost.mean, "p95_cost": p95, "cvar_95": cvar}
+
+    values = [metrics(acc) for acc in accs]
+    baseline = values[0]
+    out_scenarios = []
+    for o, acc, diff, v in zip(overrides, accs, diffs, values):
+        summary = _summarize(acc, shipments_per_month, t0, workers)
+        out_scenarios.append({
+            "params": o,
+            "summary": summary["summary"],
+            "risk_quantiles": summary["risk_quantiles"],
+            "delta": {m: round(v[m] - baseline[m]) for m in SWEEP_METRICS},
+            "delta_standard_error": _round_opt(diff.standard_error) if o else None,
+        })
+
+    return {
+        "mode": mode,
+        "simulations": simulations,
+        "scenario_count": len(scenarios),
+        "baseline": out_scenarios[0],
+        "scenarios": out_scenarios[1:],
+        "tornado": _tornado(grid, overrides, values),
+        "estimator": {"method": method, "common_random_numbers": True},
+        "_computed_in": "python_numpy",
+        "_workers": workers,
+        "_engine_ms": max(round((time.perf_counter() - t0) * 1000), 1),
+    }
+
+
+def _tornado(grid: dict[str, list], overrides: list[dict], values: list[dict]) -> list[dict]:
+    """Per-parameter low/high metric values, ranked by avg-cost swing.
+
+    One-at-a-time scenarios are used directly (the baseline stands in for
+    the parameter's baseline value); factorial grids use main effects —
+    the mean over all scenarios sharing a value.
+    """
+    rows = []
+    for name, grid_values in grid.items():
+        points = []
+        for gv in grid_values:
+            matched = [v for o, v in zip(overrides, values) if o.get(name) == gv]
+            if matched:
+                points.append((gv, {m: sum(v[m] for v in matched) / len(matched) for m in SWEEP_METRICS}))
+        if not points:
+            continue
+        row = {"param": name, "low": min(gv for gv, _ in points), "high": max(gv for gv, _ in points)}
+        for m in SWEEP_METRICS:
+            lo = next(pv[m] for gv, pv in points if gv == row["low"])
+            hi = next(pv[m] for gv, pv in points if gv == row["high"])
+            row[m] = {"at_low": round(lo), "at_high": round(hi), "swing": round(abs(hi - lo))}
+        rows.append(row)
+    rows.sort(key=lambda r: r["avg_monthly_cost"]["swing"], reverse=True)
+    return rows
@@ -0,0 +1,111 @@
+"""
+Streaming Quantile Sketch
+Mergeable log-bucket sketch (DDSketch-style) for non-negative values.
+
+Values are counted in buckets whose bounds grow geometrically by
+gamma = (1 + α) / (1 - α), so any quantile is returned within relative
+error α of the true value while memory is O(log(max/min) / α) buckets —
+about a thousand for costs spanning nine orders of magnitude at α = 1%.
+Blocks are added as NumPy arrays (optionally weighted) with one bincount
+each; zeros are kept in a separate bucket.
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch over non-negative values."""
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.alpha = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._ln_gamma = math.log(self.gamma)
+        self._counts = np.zeros(0, dtype=np.float64)
+        self._offset = 0          # bucket key of _counts[0]
+        self.zero_count = 0.0
+        self.count = 0.0
+        self.total = 0.0          # weighted sum of inserted values
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values: np.ndarray, weights: np.ndarray | None = None) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        w = np.ones_like(values) if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+        self.count += float(w.sum())
+        self.total += float(values @ w)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        pos = values > 0
+        self.zero_count += float(w[~pos].sum())
+        if not pos.any():
+            return
+        keys = np.ceil(np.log(values[pos]) / self._ln_gamma).astype(np.int64)
+        lo, hi = int(keys.min()), int(keys.max())
+        self._extend(lo, hi)
+        self._counts[lo - self._offset:hi - self._offset + 1] += np.bincount(keys - lo, weights=w[pos], minlength=hi - lo + 1)
+
+    def _extend(self, lo: int, hi: int) -> None:
+        if self._counts.size == 0:
+            self._offset = lo
+            self._counts = np.zeros(hi - lo + 1)
+            return
+        end = self._offset + self._counts.size - 1
+        if lo < self._offset or hi > end:
+            new_lo, new_hi = min(lo, self._offset), max(hi, end)
+            grown = np.zeros(new_hi - new_lo + 1)
+            grown[self._offset - new_lo:self._offset - new_lo + self._counts.size] = self._counts
+            self._counts, self._offset = grown, new_lo
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other._counts.size:
+            self._extend(other._offset, other._offset + other._counts.size - 1)
+            start = other._offset - self._offset
+            self._counts[start:start + other._counts.size] += other._counts
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _bucket_values(self) -> np.ndarray:
+        """Representative value of each bucket (relative error ≤ α)."""
+        keys = np.arange(self._offset, self._offset + self._counts.size, dtype=np.float64)
+        return 2 * self.gamma ** keys / (self.gamma + 1)
+
+    def quantiles(self, qs) -> list[float]:
+        if self.count <= 0:
+            return [0.0 for _ in qs]
+        cum = self.zero_count + np.cumsum(self._counts)
+        reps = self._bucket_values()
+        out = []
+        for q in qs:
+            rank = q / 100 * self.count
+            if rank <= self.zero_count and self.zero_count > 0:
+                out.append(0.0)
+                continue
+            i = min(int(np.searchsorted(cum, rank)), len(reps) - 1)
+            out.append(float(min(max(reps[i], self.min), self.max)))
+        return out
+
+    def tail_mean(self, threshold: float) -> float:
+        """Mean of the values at or above ``threshold`` (bucket-level)."""
+        if self._counts.size == 0:
+            return 0.0
+        reps = self._bucket_values()
+        sel = reps >= threshold * (1 - self.alpha)
+        weight = float(self._counts[sel].sum())
+        return float(reps[sel] @ self._counts[sel]) / weight if weight else float(threshold)
+
+    def histogram(self, buckets: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Equal-width histogram over [min, max] rebuilt from the buckets."""
+        vals = np.concatenate(([0.0], self._bucket_values()))
+        weights = np.concatenate(([self.zero_count], self._counts))
+        vals = np.clip(vals, self.min, self.max)
+        return np.histogram(vals, bins=buckets, range=(self.min, self.max), weights=weights)
@@ -5,20 +5,58 @@ FastAPI microservice for CPU-intensive supply chain simulations.
 Engines: Monte Carlo, Digital Twin, Holt-Winters, What-If
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import Any
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Literal
 import time
 
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from engines import monte_carlo, digital_twin, holt_winters, what_if
+from executor import EngineExecutor
+from cache import ResponseCache
+from responses import DirectRoute, NumpyJSONResponse
+from admission import (
+    AdmissionController, WHAT_IF_COST,
+    estimate_monte_carlo, estimate_monte_carlo_sweep, estimate_digital_twin, estimate_holt_winters,
+)
+from schemas import TwinData
+
+# Monte Carlo is vectorized NumPy (releases the GIL); the other engines are
+# pure-Python loops. A small Monte Carlo limit keeps 200k-simulation runs
+# from crowding out everything else.
+engine_pool = EngineExecutor({
+    "monte_carlo": ("thread", 2),
+    "digital_twin": ("process", 2),
+    "holt_winters": ("process", 2),
+    "what_if": ("thread", 4),
+})
+
+# Sheds load (429/413) before a request can allocate past the worker's budget
+admission = AdmissionController()
+
+
+# Opt-in per route: only deterministic engines go through the cache
+response_cache = ResponseCache("ai-simulation")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    engine_pool.shutdown()
+    await response_cache.close()
+
 
 app = FastAPI(
     title="TrustChecker AI Simulation",
     version="1.0.0",
     description="CPU-intensive supply chain simulation engines",
+    lifespan=lifespan,
+    default_response_class=NumpyJSONResponse,
 )
+# Render engine output with orjson directly, without the jsonable_encoder pass
+app.router.route_class = DirectRoute
 
 Instrumentator().instrument(app).expose(app, endpoint="/metrics")
 
@@ -31,31 +69,62 @@ async def health():
         "service": "ai-simulation",
         "version": "1.0.0",
         "engines": ["monte_carlo", "digital_twin", "holt_winters", "what_if"],
+        "executor": engine_pool.stats(),
+        "cache": response_cache.stats(),
+        "admission": admission.stats(),
     }
 
 
 # ─── Monte Carlo ─────────────────────────────────────────────────
+def _check_seed(params: dict[str, Any]) -> dict[str, Any]:
+    # params.seed feeds np.random.SeedSequence, which only takes non-negative ints
+    seed = params.get("seed")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError("params.seed must be a non-negative integer or null")
+    return params
+
 class MonteCarloRequest(BaseModel):
     params: dict[str, Any] = Field(default_factory=dict)
-    simulations: int = Field(default=1000, ge=1, le=200000)
+    simulations: int = Field(default=1000, ge=1, le=monte_carlo.MAX_SIMULATIONS)
+
+    _seed = field_validator("params")(_check_seed)
 
 @app.post("/monte-carlo/run")
 async def run_monte_carlo(req: MonteCarloRequest):
     t0 = time.time()
-    result = monte_carlo.run(req.params, req.simulations)
+    async with admission.admit("monte_carlo", estimate_monte_carlo(req.params, req.simulations)):
+        result = await engine_pool.run("monte_carlo", monte_carlo.run, req.params, req.simulations)
+    result["_latency_ms"] = round((time.time() - t0) * 1000)
+    return result
+
+
+class MonteCarloSweepRequest(BaseModel):
+    params: dict[str, Any] = Field(default_factory=dict)
+    grid: dict[str, list[float]]
+    simulations: int = Field(default=1000, ge=1, le=monte_carlo.MAX_SIMULATIONS)
+    mode: Literal["one_at_a_time", "factorial"] = "one_at_a_time"
+
+    _seed = field_validator("params")(_check_seed)
+
+@app.post("/monte-carlo/sweep")
+async def sweep_monte_carlo(req: MonteCarloSweepRequest):
+    scenarios = min(monte_carlo.scenario_count(req.grid, req.mode), monte_carlo.MAX_SWEEP_SCENARIOS)
+    t0 = time.time()
+    async with admission.admit("monte_carlo_sweep", estimate_monte_carlo_sweep(req.params, req.simulations, scenarios)):
+        result = await engine_pool.run("monte_carlo", monte_carlo.sweep, req.params, req.grid, req.simulations, req.mode)
     result["_latency_ms"] = round((time.time() - t0) * 1000)
     return result
 
 
 # ─── Digital Twin ─────────────────────────────────────────────────
 class DigitalTwinBuildRequest(BaseModel):
-    data: dict[str, Any] = Field(default_factory=dict)
+    data: TwinData = Field(default_factory=TwinData)
 
 class DigitalTwinKPIRequest(BaseModel):
-    data: dict[str, Any] = Field(default_factory=dict)
+    data: TwinData = Field(default_factory=TwinData)
 
 class DigitalTwinAnomalyRequest(BaseModel):
-    data: dict[str, Any] = Field(default_factory=dict)
+    data: TwinData = Field(default_factory=TwinData)
 
 class DigitalTwinDisruptionRequest(BaseModel):
     model: dict[str, Any]
@@ -63,19 +132,23 @@ class DigitalTwinDisruptionRequest(BaseModel):
 
 @app.post("/digital-twin/build")
 async def build_twin(req: DigitalTwinBuildRequest):
-    return digital_twin.build_model(req.data)
+    async with admission.admit("digital_twin", estimate_digital_twin(req.data)):
+        return await engine_pool.run("digital_twin", digital_twin.build_model, req.data)
 
 @app.post("/digital-twin/kpis")
 async def compute_kpis(req: DigitalTwinKPIRequest):
-    return digital_twin.compute_kpis(req.data)
+    async with admission.admit("digital_twin", estimate_digital_twin(req.data)):
+        return await engine_pool.run("digital_twin", digital_twin.compute_kpis, req.data)
 
 @app.post("/digital-twin/anomalies")
 async def detect_anomalies(req: DigitalTwinAnomalyRequest):
-    return digital_twin.detect_anomalies(req.data)
+    async with admission.admit("digital_twin", estimate_digital_twin(req.data)):
+        return await engine_pool.run("digital_twin", digital_twin.detect_anomalies, req.data)
 
 @app.post("/digital-twin/simulate")
 async def simulate_disruption(req: DigitalTwinDisruptionRequest):
-    return digital_twin.simulate_disruption(req.model, req.scenario)
+    async with admission.admit("digital_twin", estimate_digital_twin(req.model)):
+        return await engine_pool.run("digital_twin", digital_twin.simulate_disruption, req.model, req.scenario)
 
 
 # ─── Holt-Winters ─────────────────────────────────────────────────
@@ -84,10 +157,15 @@ class HoltWintersRequest(BaseModel):
     season_length: int = 7
     periods_ahead: int = 14
     params: dict[str, float] = Field(default_factory=dict)
+    # Fit alpha/beta/gamma by SSE instead of taking them from params
+    optimize: bool = False
 
 @app.post("/holt-winters/forecast")
 async def hw_forecast(req: HoltWintersRequest):
-    return holt_winters.forecast(req.data, req.season_length, req.periods_ahead, req.params)
+    async def compute():
+        async with admission.admit("holt_winters", estimate_holt_winters(len(req.data), req.periods_ahead, req.season_length, req.optimize)):
+            return await engine_pool.run("holt_winters", holt_winters.forecast, req.data, req.season_length, req.periods_ahead, req.params, req.optimize)
+    return await response_cache.fetch("holt_winters", req, holt_winters.ENGINE_VERSION, compute)
 
 
 # ─── What-If ──────────────────────────────────────────────────────
@@ -97,4 +175,5 @@ class WhatIfRequest(BaseModel):
 
 @app.post("/what-if/simulate")
 async def what_if_simulate(req: WhatIfRequest):
-    return what_if.simulate(req.scenario, req.current_state)
+    async with admission.admit("what_if", WHAT_IF_COST):
+        return await engine_pool.run("what_if", what_if.simulate, req.scenario, req.current_state)
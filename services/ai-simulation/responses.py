@@ -0,0 +1,95 @@
+"""
+Response Rendering
+orjson-backed JSON responses that take engine output as-is.
+
+FastAPI normally runs every returned dict through jsonable_encoder (a
+Python-level walk of the whole tree) and then json.dumps. Engines return
+large nested dicts of floats, lists and NumPy values, so both passes show
+up in latency. Here:
+
+  - NumpyJSONResponse renders with orjson, which serializes NumPy arrays
+    and scalars natively (OPT_SERIALIZE_NUMPY) and non-string dict keys;
+    NaN/Inf are written as null so the body stays valid JSON
+  - DirectRoute hands an endpoint's return value straight to the route's
+    response class when the route has no response_model, skipping the
+    jsonable_encoder walk
+
+Install both on the app before declaring routes:
+
+    app = FastAPI(..., default_response_class=NumpyJSONResponse)
+    app.router.route_class = DirectRoute
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+from typing import Any, Callable
+
+import numpy as np
+import orjson
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    # Whatever orjson doesn't take natively: non-contiguous or object arrays,
+    # pydantic models, sets and the like
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def render(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class NumpyJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return render(content)
+
+
+class DirectRoute(APIRoute):
+    """APIRoute that renders plain return values with its response class
+    directly when there's no response_model to validate against."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        response_model = kwargs.get("response_model")
+        explicit = response_model is not None and not isinstance(response_model, DefaultPlaceholder)
+        returns = inspect.signature(endpoint).return_annotation
+        if not explicit and returns is inspect.Signature.empty:
+            endpoint = self._direct(endpoint, kwargs)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _direct(endpoint: Callable[..., Any], kwargs: dict[str, Any]) -> Callable[..., Any]:
+        response_class = kwargs.get("response_class")
+        status_code = kwargs.get("status_code")
+
+        def wrap(result: Any) -> Any:
+            if isinstance(result, Response):
+                return result
+            cls = response_class.value if isinstance(response_class, DefaultPlaceholder) else response_class
+            cls = cls or NumpyJSONResponse
+            return cls(result, status_code=status_code or 200)
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def direct(*args: Any, **kw: Any) -> Any:
+                return wrap(await endpoint(*args, **kw))
+        else:
+            @functools.wraps(endpoint)
+            def direct(*args: Any, **kw: Any) -> Any:
+                return wrap(endpoint(*args, **kw))
+        return direct
@@ -0,0 +1,155 @@
+"""
+Result Codec
+Encoding of worker results stored under ``result:{job_id}``.
+
+  json     plain JSON, no header (default; what consumers read today)
+  msgpack  MessagePack; lists of 16+ numbers become typed arrays
+
+Anything other than plain JSON starts with a one-line header naming how
+to decode it:
+
+  TCR1;<content-type>[;zstd]\\n<payload>
+
+e.g. ``TCR1;application/msgpack;zstd``. Compression is opt-in: with
+RESULT_COMPRESS_MIN_BYTES set, payloads at least that large are
+zstd-compressed (JSON included, which then gets the header too), so only
+set it once every consumer decodes the header. A value that doesn't start
+with ``TCR1;`` is plain JSON, so old results and the default
+configuration decode the same way — with ``JSON.parse`` in Node.
+
+Typed arrays are MessagePack ext type 1: one dtype byte (``d`` float64,
+``q`` int64) followed by the little-endian values. A Node consumer
+registers an ext decoder for type 1 that wraps the bytes in a
+Float64Array / BigInt64Array.
+
+msgpack and zstandard are optional imports; without them the codec falls
+back to JSON / no compression and says so once at startup.
+
+Environment:
+  RESULT_CODEC                 json | msgpack (default json)
+  RESULT_COMPRESS_MIN_BYTES    zstd threshold, e.g. 16384 (default 0: never compress)
+  RESULT_COMPRESS_LEVEL        zstd level (default 3)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+MAGIC = b"TCR1;"
+ARRAY_EXT = 1
+MIN_ARRAY_LEN = 16
+CONTENT_TYPES = {"json": "application/json", "msgpack": "application/msgpack"}
+
+
+def _typed(values: list) -> msgpack.ExtType | None:
+    """Pack a homogeneous numeric list as a typed array, else None."""
+    if len(values) < MIN_ARRAY_LEN:
+        return None
+    if all(type(v) is float for v in values):
+        return msgpack.ExtType(ARRAY_EXT, b"d" + np.asarray(values, dtype="<f8").tobytes())
+    if all(type(v) is int for v in values):
+        try:
+            return msgpack.ExtType(ARRAY_EXT, b"q" + np.asarray(values, dtype="<i8").tobytes())
+        except OverflowError:
+            return None
+    return None
+
+
+def _pack_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "f":
+            return msgpack.ExtType(ARRAY_EXT, b"d" + obj.astype("<f8").tobytes())
+        if obj.dtype.kind in "iu":
+            return msgpack.ExtType(ARRAY_EXT, b"q" + obj.astype("<i8").tobytes())
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)  # same fallback as json.dumps(default=str)
+
+
+def _arrays(obj: Any) -> Any:
+    """Swap long numeric lists for typed arrays, recursively."""
+    if isinstance(obj, dict):
+        return {k: _arrays(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        typed = _typed(obj) if isinstance(obj, list) else None
+        return typed if typed is not None else [_arrays(v) for v in obj]
+    return obj
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == ARRAY_EXT:
+        dtype = {b"d": "<f8", b"q": "<i8"}[data[:1]]
+        return np.frombuffer(data[1:], dtype=dtype).tolist()
+    return msgpack.ExtType(code, data)
+
+
+class ResultCodec:
+    """Encodes job results for Redis; ``decode`` reads any of its formats."""
+
+    def __init__(self, codec: str | None = None, compress_min_bytes: int | None = None) -> None:
+        codec = codec or os.getenv("RESULT_CODEC", "json")
+        if codec not in CONTENT_TYPES:
+            raise ValueError(f"RESULT_CODEC must be one of {sorted(CONTENT_TYPES)}, got {codec!r}")
+        if codec == "msgpack" and msgpack is None:
+            print("⚠️ RESULT_CODEC=msgpack but msgpack is not installed; using json")
+            codec = "json"
+        self.codec = codec
+        self.compress_min_bytes = (
+            int(os.getenv("RESULT_COMPRESS_MIN_BYTES", "0"))
+            if compress_min_bytes is None else compress_min_bytes
+        )
+        if self.compress_min_bytes and zstandard is None:
+            if os.getenv("RESULT_COMPRESS_MIN_BYTES"):
+                print("⚠️ RESULT_COMPRESS_MIN_BYTES set but zstandard is not installed; not compressing")
+            self.compress_min_bytes = 0
+        self._level = int(os.getenv("RESULT_COMPRESS_LEVEL", "3"))
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.codec]
+
+    def encode(self, result: Any) -> str | bytes:
+        """Plain JSON text for the default codec, else header + bytes."""
+        if self.codec == "msgpack":
+            payload = msgpack.packb(_arrays(result), default=_pack_default, use_bin_type=True)
+        else:
+            payload = json.dumps(result, default=str)
+        if not self.compress_min_bytes or len(payload) < self.compress_min_bytes:
+            if isinstance(payload, str):
+                return payload
+            return MAGIC + f"{self.content_type}\n".encode() + payload
+        if isinstance(payload, str):
+            payload = payload.encode()
+        # zstandard contexts aren't thread-safe; one per call is cheap at level 3
+        payload = zstandard.ZstdCompressor(level=self._level).compress(payload)
+        return MAGIC + f"{self.content_type};zstd\n".encode() + payload
+
+
+def decode(raw: str | bytes) -> Any:
+    """Decode a stored result written by any codec configuration."""
+    if isinstance(raw, str):
+        raw = raw.encode()
+    if not raw.startswith(MAGIC):
+        return json.loads(raw)
+    header, _, payload = raw.partition(b"\n")
+    content_type, *encodings = header[len(MAGIC):].decode().split(";")
+    if "zstd" in encodings:
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    if content_type == CONTENT_TYPES["msgpack"]:
+        return msgpack.unpackb(payload, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+    return json.loads(payload)